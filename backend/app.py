@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, session, make_response
+from flask import Flask, request, jsonify, session, make_response, Response, send_file
 from flask_pymongo import PyMongo
 import os
 from flask_cors import CORS
@@ -7,30 +7,43 @@ from models.user import (
     verify_password, get_user_by_email, get_user_by_id,
     update_profile, update_profile_image, remove_profile_image,
     save_reset_token, validate_reset_token, reset_password,
-    update_user_by_admin
+    update_user_by_admin, migrate_profile_images, delete_unverified_user
 )
-from models.history import create_history_schema, save_analysis, get_user_history, get_history_by_id, delete_history
-from models.log import create_logs_schema, add_log, get_logs, clear_old_logs
+from models.history import create_history_schema, save_analysis, get_user_history, get_history_by_id, delete_history, HISTORY_PAGE_SIZE
+from models.log import create_logs_schema, add_log, get_logs, clear_old_logs, backfill_search_tokens, forget_user_name
+from utils.log_buffer import log_buffer
+from utils.image_store import image_store, THUMBNAIL_SIZES
+from utils.principal_cache import principal_cache
+from utils.pdf_report import render_analysis_pdf
+from utils.pdf_cache import pdf_cache
+from utils.history_export import history_exporter, EXPORT_FORMATS
+from models.stats import get_dashboard_stats, ensure_stats, increment_stats
 from werkzeug.security import generate_password_hash
 from utils.email_sender import send_otp_email, send_password_reset_email, send_contact_email
-from utils.twitch_chat import TwitchChatBot, extract_channel_name
+from utils.mail_queue import mail_queue
+from utils.twitch_chat import extract_channel_name
+from utils.chat_pipeline import chat_pipeline
+from utils.sentiment_analyzer import sentiment_analyzer, sentiment_cache
+from utils.socket_emitter import CoalescingEmitter, channel_room
+from utils.chat_aggregator import chat_aggregators
+from utils.chat_sink import chat_sink
+from utils.summary_worker import summary_worker
+from utils.summary_cache import summary_cache
+from utils.gemini_analyzer import gemini_clients
 from utils.password_validator import validate_password
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 from dotenv import load_dotenv
 from datetime import timedelta
+from functools import wraps
 import threading
 import secrets
+import json
+import time
 from pymongo import MongoClient
 from bson import ObjectId
 import bcrypt
 import base64
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from io import BytesIO
 
 load_dotenv()
 
@@ -78,21 +91,162 @@ socketio = SocketIO(app,
 client = MongoClient('mongodb://localhost:27017/')
 db = client['twitch_sentiment']
 
-active_bots = {}
+# TWITCH_CHAT_MODE=asyncio runs every channel on one asyncio event loop instead of the irc reactor
+if os.getenv('TWITCH_CHAT_MODE', 'irc') == 'asyncio':
+    from utils.async_twitch_chat import async_twitch_client as twitch_client
+else:
+    from utils.twitch_chat import twitch_pool as twitch_client
+
 user_bots = {}
 
+chat_emitter = CoalescingEmitter(
+    socketio,
+    default_flush_ms=int(os.getenv('CHAT_FLUSH_MS', 250)),
+    max_messages=int(os.getenv('CHAT_BATCH_MAX_MESSAGES', 100))
+)
+
 def broadcast_message(message_data):
-    socketio.emit('chat_message', message_data)
+    chat_aggregators.record(message_data)
+    chat_sink.record(message_data)
+    # Only clients watching this channel receive its chat, coalesced into batches
+    chat_emitter.emit(message_data)
+
+def publish_channel_stats():
+    published_versions = {}
+    series_cursors = {}
+    while True:
+        socketio.sleep(1)
+        for channel in chat_aggregators.channels():
+            if not twitch_client.is_joined(channel):
+                continue
+            snapshot = chat_aggregators.snapshot(channel)
+            if snapshot and snapshot['version'] != published_versions.get(channel):
+                published_versions[channel] = snapshot['version']
+                socketio.emit('channel_stats', snapshot, to=channel_room(channel))
+
+            # Incremental per-second window: everything since the last bucket sent,
+            # which is re-sent because it was still filling up
+            series = chat_aggregators.series(channel, 1, since=series_cursors.get(channel))
+            if series and series['positive']:
+                series_cursors[channel] = series['start'] + len(series['positive']) - 1
+                socketio.emit('channel_timeseries', series, to=channel_room(channel))
+
+def subscribe_to_channel(channel, flush_ms=None, encoding='json'):
+    # The plain channel room carries control events such as disconnect_notification
+    join_room(channel_room(channel))
+    join_room(chat_emitter.subscribe(request.sid, channel, flush_ms, encoding))
+
+def profile_image_url(user, size=None):
+    image_hash = user.get('profile_image')
+    if not image_hash:
+        return None
+    base_url = os.getenv('PUBLIC_API_URL', request.host_url).rstrip('/')
+    return f"{base_url}/api/images/{image_hash}" + (f"?size={size}" if size else '')
+
+def session_user_name():
+    # Logged-in sessions carry the name, so activity logs don't need a users lookup
+    if session.get('first_name') or session.get('last_name'):
+        return f"{session.get('first_name', '')} {session.get('last_name', '')}".strip()
+    return None
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+def notify_summary_ready(user_id, payload):
+    socketio.emit('summary_ready', payload, to=user_room(user_id))
+
+summary_worker.set_notifier(notify_summary_ready)
+
+def role_required(*roles):
+    # Role checks read the cached principal, so admin pages don't hit users on every request
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if 'user_id' not in session:
+                return jsonify({'error': 'Authentication required'}), 401
+
+            current_user = principal_cache.get(mongo, session['user_id'])
+            if not current_user or current_user.get('role') not in roles:
+                return jsonify({'error': 'Admin privileges required'}), 403
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+@socketio.on('connect')
+def handle_socket_connect():
+    # Signed-in clients get their own room for background job notifications such as summary_ready
+    if 'user_id' in session:
+        join_room(user_room(session['user_id']))
+    channel = request.args.get('channel')
+    if channel:
+        subscribe_to_channel(channel, request.args.get('flush_ms'), request.args.get('encoding', 'json'))
+
+@socketio.on('join_channel')
+def handle_join_channel(data):
+    data = data or {}
+    channel = data.get('channel')
+    if channel:
+        subscribe_to_channel(channel, data.get('flush_ms'), data.get('encoding', 'json'))
+
+@socketio.on('leave_channel')
+def handle_leave_channel(data):
+    channel = (data or {}).get('channel')
+    if channel:
+        for room in chat_emitter.unsubscribe(request.sid, channel):
+            leave_room(room)
+        leave_room(channel_room(channel))
+
+@socketio.on('disconnect')
+def handle_socket_disconnect():
+    chat_emitter.unsubscribe(request.sid)
+
+def prepare_database():
+    try:
+        with app.app_context():
+            create_user_schema(mongo)
+            create_history_schema(mongo)
+            create_logs_schema(mongo)
+            summary_cache.create_schema(mongo)
+            ensure_stats(mongo)
+            image_store.create_schema(mongo)
+            threading.Thread(target=migrate_profile_images, args=(mongo,), name='profile-image-migration', daemon=True).start()
+            threading.Thread(target=backfill_search_tokens, args=(mongo,), name='log-token-backfill', daemon=True).start()
+            # CHAT_SINK_ENABLED=true also stores every analyzed message in the chat_messages time-series collection
+            if os.getenv('CHAT_SINK_ENABLED', 'false').lower() == 'true':
+                chat_sink.start(mongo)
+            resumed = summary_worker.resume(mongo)
+            if resumed:
+                print(f"Resumed {resumed} pending analysis summaries")
+    except Exception as e:
+        print(f"Database startup failed: {e}")
+
+def start_background_services():
+    # Index creation, the stats check and resuming summaries talk to Mongo, so
+    # they run off the import path and the server accepts requests straight away
+    threading.Thread(target=prepare_database, name='database-startup', daemon=True).start()
+
+    socketio.start_background_task(publish_channel_stats)
 
-with app.app_context():
-    create_user_schema(mongo)
-    create_history_schema(mongo)
-    create_logs_schema(mongo)
+    # Load the sentiment model in the background so the web tier starts immediately
+    if os.getenv('SENTIMENT_WARMUP', 'true').lower() == 'true':
+        sentiment_analyzer.warm_up()
+
+# Process-pool workers started with spawn re-import this file as __mp_main__;
+# they must not repeat the startup work, start the stats publisher or load the
+# model themselves. Their task functions live in utils and never import app.
+if __name__ != '__mp_main__':
+    start_background_services()
 
 @app.route('/')
 def index():
     return jsonify({"message": "Welcome to Flask MongoDB API", "status": "running"})
 
+@app.route('/api/ready')
+def readiness():
+    model = sentiment_analyzer.status()
+    ready = model['state'] == 'ready'
+    return jsonify({'status': 'ready' if ready else 'starting', 'model': model}), 200 if ready else 503
+
 @app.route('/api/register', methods=['POST'])
 def register():
     try:
@@ -125,11 +279,14 @@ def register():
         # Create new user and get OTP
         result, otp = create_user(mongo, user_data)
         
-        # Send OTP via email
-        email_sent = send_otp_email(data['email'], otp)
+        # Send OTP via email. The mail queue only refuses a message when it is full;
+        # if delivery later fails for good (bad address, SMTP auth) the pending
+        # registration is rolled back from the mail worker instead
+        user_id = result.inserted_id
+        email_sent = send_otp_email(data['email'], otp, on_failure=lambda error: delete_unverified_user(mongo, user_id))
         
         if not email_sent:
-            mongo.db.users.delete_one({'_id': result.inserted_id})
+            delete_unverified_user(mongo, user_id)
             return jsonify({'error': 'Failed to send verification email'}), 500
             
         return jsonify({
@@ -171,7 +328,7 @@ def login():
         session['role'] = user['role']
         
         # Log user login activity
-        add_log(mongo, str(user['_id']), 'Logged in')
+        add_log(mongo, str(user['_id']), 'Logged in', user_name=f"{user['first_name']} {user['last_name']}")
         
         return jsonify({
             'user': {
@@ -180,7 +337,7 @@ def login():
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
                 'role': user['role'],
-                'profile_image': user.get('profile_image')
+                'profile_image': profile_image_url(user)
             }
         }), 200
 
@@ -193,7 +350,7 @@ def authenticate():
         if 'user_id' not in session:
             return jsonify({'error': 'Not authenticated'}), 401
             
-        user = get_user_by_id(mongo, session['user_id'])
+        user = principal_cache.get(mongo, session['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
@@ -204,7 +361,7 @@ def authenticate():
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
                 'role': user['role'],
-                'profile_image': user.get('profile_image')
+                'profile_image': profile_image_url(user)
             }
         }), 200
     except Exception as e:
@@ -218,17 +375,15 @@ def logout():
         if user_id and user_id in user_bots:
             channels = list(user_bots[user_id])
             for channel in channels:
-                if channel in active_bots:
+                if twitch_client.is_joined(channel):
                     try:
-                        bot, thread = active_bots[channel]
-                        bot.disconnect()
-                        bot.die()
+                        twitch_client.part(channel)
                     except Exception as e:
                         print(f"Error during bot disconnection on logout: {e}")
                     finally:
-                        active_bots.pop(channel, None)
+                        chat_sink.flush(channel)
                         # Optionally emit disconnect notification
-                        socketio.emit('disconnect_notification', {'channel': channel})
+                        socketio.emit('disconnect_notification', {'channel': channel}, to=channel_room(channel))
             user_bots.pop(user_id, None)
         session.clear()
         return jsonify({"message": "Successfully logged out"}), 200
@@ -248,35 +403,28 @@ def connect_to_twitch():
         if not channel:
             return jsonify({'error': 'Invalid Twitch URL'}), 400
             
-        # Check if a bot is already active for this channel
-        if channel in active_bots:
+        channel = channel.lower()
+        user_id = session.get('user_id')
 
+        # Check if the channel is already joined on the shared connection pool
+        if twitch_client.is_joined(channel):
+            # Someone else opened the connection; this user's save starts counting now
+            if user_id:
+                chat_aggregators.start_session(user_id, channel)
             return jsonify({'message': f'Already connected to {channel}\'s chat', 'channel': channel}), 200
             
-        import random
-        bot_username = f"justinfan{random.randint(1000, 999999)}"
-        
         try:
-            bot = TwitchChatBot(
-                token="SCHMOOPIIE",
-                username=bot_username,
-                channel=channel,
-                socket_handler=broadcast_message
-            )
-
-            thread = threading.Thread(target=bot.start)
-            thread.daemon = True
-            thread.start()
-            
-            active_bots[channel] = (bot, thread)
+            chat_aggregators.reset(channel)
+            if user_id:
+                chat_aggregators.start_session(user_id, channel)
+            twitch_client.join(channel, broadcast_message)
             
-            user_id = session.get('user_id')
             if user_id:
                 user_bots.setdefault(user_id, set()).add(channel)
             
             return jsonify({'message': f'Connected to {channel}\'s chat', 'channel': channel}), 200
         except Exception as e:
-            print(f"Error creating Twitch bot: {e}")
+            print(f"Error joining Twitch channel: {e}")
             return jsonify({'error': f'Failed to connect to Twitch chat: {str(e)}'}), 500
         
     except Exception as e:
@@ -292,16 +440,16 @@ def disconnect_from_twitch():
         if not channel:
             return jsonify({'error': 'Channel name is required'}), 400
         
-        if channel in active_bots:
+        channel = channel.lower()
+
+        if twitch_client.is_joined(channel):
             try:
-                bot, thread = active_bots[channel]
-                bot.disconnect()
-                bot.die()
+                twitch_client.part(channel)
             except Exception as e:
                 print(f"Error during bot disconnection: {e}")
             finally:
-                active_bots.pop(channel, None)
-                socketio.emit('disconnect_notification', {'channel': channel})
+                chat_sink.flush(channel)
+                socketio.emit('disconnect_notification', {'channel': channel}, to=channel_room(channel))
         else:
             return jsonify({'message': 'Already disconnected'}), 200
         
@@ -311,12 +459,117 @@ def disconnect_from_twitch():
         print(f"Error in disconnect_from_twitch: {e}")
         return jsonify({'message': 'Attempted to disconnect from chat'}), 200
 
+@app.route('/api/twitch/metrics', methods=['GET'])
+@role_required('admin')
+def get_twitch_metrics():
+    try:
+        return jsonify({
+            'connections': twitch_client.stats(),
+            'pipeline': chat_pipeline.metrics(),
+            'sentiment_cache': sentiment_cache.stats(),
+            'emitter': chat_emitter.stats(),
+            'log_buffer': log_buffer.stats(),
+            'principals': principal_cache.stats(),
+            'pdf_cache': pdf_cache.stats(),
+            'exports': history_exporter.stats(),
+            'mail': mail_queue.stats(),
+            'chat_sink': chat_sink.stats(),
+            'summaries': summary_worker.stats(),
+            'summary_cache': summary_cache.stats(),
+            'gemini_clients': gemini_clients.stats()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/twitch/stats/<channel>', methods=['GET'])
+def get_channel_stats(channel):
+    try:
+        snapshot = chat_aggregators.snapshot(channel)
+        if not snapshot:
+            return jsonify({'error': 'No analysis found for this channel'}), 404
+
+        return jsonify(snapshot), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_series_args(args):
+    resolution = int(args.get('resolution', 1))
+    since = args.get('since')
+    return resolution, float(since) if since else None
+
+@app.route('/api/twitch/timeseries/<channel>', methods=['GET'])
+def get_channel_timeseries(channel):
+    try:
+        resolution, since = parse_series_args(request.args)
+        series = chat_aggregators.series(channel, resolution, since)
+        if not series:
+            return jsonify({'error': 'No analysis found for this channel'}), 404
+
+        return jsonify(series), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/twitch/timeseries/<channel>/stream', methods=['GET'])
+def stream_channel_timeseries(channel):
+    # Server-sent events carrying the same incremental windows as the channel_timeseries socket event
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        resolution, since = parse_series_args(request.args)
+        if not chat_aggregators.series(channel, resolution, since):
+            return jsonify({'error': 'No analysis found for this channel'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    max_seconds = float(os.getenv('SSE_MAX_SECONDS', 3600))
+    heartbeat_seconds = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+
+    def events(since):
+        # Streams end once the channel is parted or after max_seconds (EventSource
+        # reconnects with a fresh request). Heartbeats make a closed client fail
+        # the next write, which ends the generator instead of sleeping forever.
+        deadline = time.monotonic() + max_seconds
+        last_write = time.monotonic()
+        while True:
+            series = chat_aggregators.series(channel, resolution, since)
+            if not series:
+                break
+            if series['positive']:
+                since = series['start'] + (len(series['positive']) - 1) * resolution
+                yield f"event: timeseries\ndata: {json.dumps(series)}\n\n"
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= heartbeat_seconds:
+                yield ": heartbeat\n\n"
+                last_write = time.monotonic()
+            if time.monotonic() >= deadline or not twitch_client.is_joined(channel.lower()):
+                break
+            time.sleep(resolution)
+        yield "event: end\ndata: {}\n\n"
+
+    return Response(events(since), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/history/save', methods=['POST'])
 def save_analysis_history():
     try:
         current_user_id = session['user_id']
         data = request.get_json()
         
+        # Prefer this user's server-side session aggregate over anything the client re-derived
+        aggregate = chat_aggregators.session(current_user_id, data.get('streamer_name') or '')
+        if aggregate:
+            snapshot = aggregate.snapshot()
+            for field in ['total_chats', 'sentiment_count', 'top_positive', 'top_negative', 'top_neutral']:
+                data[field] = snapshot[field]
+            data.setdefault('duration', snapshot['duration'])
+            data['timeseries'] = aggregate.series(60)
+        elif 'total_chats' not in data:
+            return jsonify({'error': 'No live analysis found for this channel. It may have expired or the server restarted; reconnect to start a new one.'}), 404
+        
         required_fields = ['streamer_name', 'total_chats', 'sentiment_count', 
                          'top_positive', 'top_negative', 'top_neutral']
         
@@ -334,13 +587,16 @@ def save_analysis_history():
         
         # Save the analysis
         history_id = save_analysis(mongo, data)
+        if aggregate:
+            chat_aggregators.end_session(current_user_id, data['streamer_name'])
         
         # Log the analysis activity
         add_log(
             mongo, 
             current_user_id, 
             'Saved an Analysis', 
-            f"Channel: {data['streamer_name']}, Messages: {data['total_chats']}"
+            f"Channel: {data['streamer_name']}, Messages: {data['total_chats']}",
+            user_name=session_user_name()
         )
         
         return jsonify({
@@ -355,14 +611,21 @@ def save_analysis_history():
 def get_user_analysis_history():
     try:
         current_user_id = session['user_id']
-        history = get_user_history(mongo, current_user_id)
+        history, next_cursor = get_user_history(
+            mongo,
+            current_user_id,
+            limit=request.args.get('limit', HISTORY_PAGE_SIZE),
+            cursor=request.args.get('cursor')
+        )
 
         for item in history:
             item['_id'] = str(item['_id'])
             item['user_id'] = str(item['user_id'])
         
-        return jsonify(history), 200
+        return jsonify({'items': history, 'next_cursor': next_cursor}), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -383,7 +646,8 @@ def handle_history_by_id(history_id):
                     mongo, 
                     session['user_id'], 
                     'Viewed analysis', 
-                    f"Channel: {history.get('streamer_name', 'Unknown')}"
+                    f"Channel: {history.get('streamer_name', 'Unknown')}",
+                    user_name=session_user_name()
                 )
             
             return jsonify(history), 200
@@ -402,6 +666,25 @@ def handle_history_by_id(history_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/history/<history_id>/summary', methods=['GET'])
+def get_history_summary(history_id):
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        history = get_history_by_id(mongo, history_id)
+        if not history or str(history['user_id']) != session['user_id']:
+            return jsonify({'error': 'History not found'}), 404
+
+        return jsonify({
+            'history_id': history_id,
+            'summary_status': history.get('summary_status', 'completed'),
+            'summary': history.get('summary')
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/verify-otp', methods=['POST'])
 def verify_otp_route():
     try:
@@ -450,7 +733,7 @@ def update_user_profile():
             return jsonify({'error': str(e)}), 400
             
         # Get updated user data
-        user = get_user_by_id(mongo, session['user_id'])
+        user = principal_cache.get(mongo, session['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
@@ -458,6 +741,7 @@ def update_user_profile():
         session['first_name'] = user['first_name']
         session['last_name'] = user['last_name']
         session['email'] = user['email']
+        forget_user_name(session['user_id'])
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -467,7 +751,7 @@ def update_user_profile():
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
                 'role': user['role'],
-                'profile_image': user.get('profile_image')
+                'profile_image': profile_image_url(user)
             }
         }), 200
         
@@ -487,7 +771,7 @@ def handle_profile_image():
                 return jsonify({'error': 'Failed to remove profile image'}), 500
                 
             # Get updated user data
-            user = get_user_by_id(mongo, session['user_id'])
+            user = principal_cache.get(mongo, session['user_id'])
             if not user:
                 return jsonify({'error': 'User not found'}), 404
                 
@@ -499,7 +783,7 @@ def handle_profile_image():
                     'first_name': user['first_name'],
                     'last_name': user['last_name'],
                     'role': user['role'],
-                    'profile_image': user.get('profile_image')
+                    'profile_image': profile_image_url(user)
                 }
             }), 200
         
@@ -508,12 +792,15 @@ def handle_profile_image():
             return jsonify({'error': 'No image data provided'}), 400
             
         # Update profile image
-        success = update_profile_image(mongo, session['user_id'], data['image'])
+        try:
+            success = update_profile_image(mongo, session['user_id'], data['image'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         if not success:
             return jsonify({'error': 'Failed to update profile image'}), 500
             
         # Get updated user data
-        user = get_user_by_id(mongo, session['user_id'])
+        user = principal_cache.get(mongo, session['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
@@ -525,13 +812,40 @@ def handle_profile_image():
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
                 'role': user['role'],
-                'profile_image': user.get('profile_image')
+                'profile_image': profile_image_url(user)
             }
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Images are addressed by the hash of their content, so a URL never changes meaning and can be cached forever
+@app.route('/api/images/<image_hash>', methods=['GET'])
+def serve_profile_image(image_hash):
+    try:
+        size = request.args.get('size', type=int)
+        if size and size not in THUMBNAIL_SIZES:
+            return jsonify({'error': f"size must be one of: {', '.join(str(s) for s in THUMBNAIL_SIZES)}"}), 400
+
+        etag = f"{image_hash}-{size}" if size else image_hash
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            image = image_store.get(mongo, image_hash, size)
+            if image is None:
+                return jsonify({'error': 'Image not found'}), 404
+            data, content_type = image
+            response = make_response(data)
+            response.headers['Content-Type'] = content_type or 'application/octet-stream'
+            response.headers['X-Content-Type-Options'] = 'nosniff'
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/forgot-password', methods=['POST'])
 def forgot_password():
     try:
@@ -546,6 +860,7 @@ def forgot_password():
         
         if user and token:
             # Send password reset email
+            # Only refused when the mail queue is full; later delivery failures are logged by the queue
             email_sent = send_password_reset_email(email, str(user['_id']), token)
             
             if not email_sent:
@@ -604,19 +919,14 @@ def reset_password_route():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/users', methods=['GET'])
+@role_required('admin')
 def get_all_users():
     try:
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        current_user = get_user_by_id(mongo, session['user_id'])
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-        
         users = list(mongo.db.users.find({}))
         
         for user in users:
             user['_id'] = str(user['_id'])
+            user['profile_image'] = profile_image_url(user)
             # Remove sensitive information
             if 'password_hash' in user:
                 del user['password_hash']
@@ -634,79 +944,47 @@ def get_all_users():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# All dashboard counters in one round trip, read from the materialized stats document
+@app.route('/api/admin/stats', methods=['GET'])
+@role_required('admin')
+def get_admin_stats():
+    try:
+        return jsonify(get_dashboard_stats(mongo)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/admin/users/count', methods=['GET'])
+@role_required('admin')
 def get_users_count():
     try:
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        current_user = get_user_by_id(mongo, session['user_id'])
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-        
-        total_users = mongo.db.users.count_documents({})
-        active_users = mongo.db.users.count_documents({'status': 'active'})
-        
-        return jsonify({
-            'total': total_users,
-            'active': active_users
-        }), 200
+        return jsonify(get_dashboard_stats(mongo)['users']), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/comments/count', methods=['GET'])
+@role_required('admin')
 def get_comments_count():
     try:
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        current_user = get_user_by_id(mongo, session['user_id'])
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-        
-        history_records = mongo.db.history.find({'status': 'active'})
-        
-        total_comments = sum(record.get('total_chats', 0) for record in history_records)
-        
-        return jsonify({
-            'total': total_comments
-        }), 200
+        return jsonify(get_dashboard_stats(mongo)['comments']), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/usage/count', methods=['GET'])
+@role_required('admin')
 def get_usage_count():
     try:
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        current_user = get_user_by_id(mongo, session['user_id'])
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-        
-        total_requests = mongo.db.history.count_documents({'status': 'active'})
-        
-        return jsonify({
-            'total': total_requests
-        }), 200
+        return jsonify(get_dashboard_stats(mongo)['usage']), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/users/<user_id>', methods=['PUT'])
+@role_required('admin')
 def update_user(user_id):
     try:
-        # Check if user is authenticated
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        # Check if user is an admin
-        current_user = get_user_by_id(mongo, session['user_id'])
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-        
         # Get request data
         data = request.get_json()
         if not data:
@@ -728,6 +1006,8 @@ def update_user(user_id):
             updated_user = update_user_by_admin(mongo, user_id, data)
             if not updated_user:
                 return jsonify({'error': 'Failed to update user'}), 400
+            forget_user_name(user_id)
+            updated_user['profile_image'] = profile_image_url(updated_user)
             
             # Prepare log details about what changed
             changes = []
@@ -752,7 +1032,8 @@ def update_user(user_id):
                 mongo,
                 session['user_id'],
                 'Updated user profile',
-                details
+                details,
+                user_name=session_user_name()
             )
                 
             return jsonify(updated_user), 200
@@ -764,15 +1045,12 @@ def update_user(user_id):
 
 # Add new route for admin to get logs
 @app.route('/api/admin/logs', methods=['GET'])
+@role_required('admin')
 def get_admin_logs():
     try:
-        # Check if user is admin
-        if 'role' not in session or session['role'] != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-            
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 10))
+        # Get pagination parameters; pages after the first continue from the previous page's cursor
+        limit = min(int(request.args.get('limit', 10)), 100)
+        cursor = request.args.get('cursor')
         search = request.args.get('search')
         sort_field = request.args.get('sortField', 'created_at')
         sort_direction = request.args.get('sortDirection', 'desc')
@@ -781,8 +1059,8 @@ def get_admin_logs():
         # Get logs with pagination
         logs_data = get_logs(
             mongo, 
-            page=page, 
             limit=limit, 
+            cursor=cursor,
             search=search, 
             sort_field=sort_field, 
             sort_direction=sort_direction,
@@ -791,18 +1069,17 @@ def get_admin_logs():
         
         return jsonify(logs_data), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error getting logs: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 # Maintenance route to clear old logs (can be called manually or set up as a scheduled task)
 @app.route('/api/admin/logs/cleanup', methods=['POST'])
+@role_required('admin')
 def cleanup_logs():
     try:
-        # Check if user is admin
-        if 'role' not in session or session['role'] != 'admin':
-            return jsonify({'error': 'Admin privileges required'}), 403
-            
         # Get days to keep from request or use default (90 days)
         data = request.get_json()
         days_to_keep = data.get('days_to_keep', 90)
@@ -838,7 +1115,8 @@ def log_analysis_start():
             mongo, 
             session['user_id'], 
             'Started an analysis', 
-            f"Channel: {streamer}"
+            f"Channel: {streamer}",
+            user_name=session_user_name()
         )
         
         return jsonify({'message': 'Activity logged successfully'}), 200
@@ -859,183 +1137,72 @@ def generate_analysis_pdf(history_id):
         if not history:
             return jsonify({'error': 'History not found'}), 404
 
-        # Create a BytesIO buffer for the PDF
-        buffer = BytesIO()
-
-        # Create the PDF document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Define styles
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=1,  # Center alignment
-            fontName='Helvetica-Bold'
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceBefore=20,
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceBefore=6,
-            spaceAfter=6,
-            fontName='Helvetica'
-        )
-        
-        elements = []
-
-        # Format dates
-        current_date = datetime.now().strftime('%B %d, %Y %H:%M')
-        analysis_date = datetime.strptime(str(history['created_at']), '%Y-%m-%d %H:%M:%S.%f').strftime('%B %d, %Y %H:%M') if isinstance(history['created_at'], str) else history['created_at'].strftime('%B %d, %Y %H:%M')
-
-        # Add title and date
-        elements.append(Paragraph("Chat Analysis Report", title_style))
-        elements.append(Paragraph(f"Generated on: {current_date}", normal_style))
-        elements.append(Spacer(1, 20))
-
-        # Add streamer info
-        elements.append(Paragraph(f"Channel: {history['streamer_name']}", heading_style))
-        elements.append(Paragraph(f"Analysis Date: {analysis_date}", normal_style))
-        # Add duration (format as HH:MM:SS)
-        def format_duration(seconds):
-            h = int(seconds) // 3600
-            m = (int(seconds) % 3600) // 60
-            s = int(seconds) % 60
-            return f"{h:02d}:{m:02d}:{s:02d}"
-        duration_val = history.get('duration', 0)
-        elements.append(Paragraph(f"Duration: {format_duration(duration_val)}", normal_style))
-        elements.append(Paragraph(f"Total Messages Analyzed: {history['total_chats']}", normal_style))
-        elements.append(Spacer(1, 20))
-
-        # Calculate total messages for percentage
-        total_messages = history['total_chats']
-        if total_messages == 0:  # Prevent division by zero
-            total_messages = 1
-
-        # Add sentiment analysis
-        elements.append(Paragraph("Sentiment Analysis Summary", heading_style))
-        sentiment_data = [
-            ['Category', 'Count', 'Percentage'],
-            ['Positive', 
-             str(history['sentiment_count']['positive']),
-             f"{(history['sentiment_count']['positive'] / total_messages * 100):.1f}%"],
-            ['Neutral', 
-             str(history['sentiment_count']['neutral']),
-             f"{(history['sentiment_count']['neutral'] / total_messages * 100):.1f}%"],
-            ['Negative', 
-             str(history['sentiment_count']['negative']),
-             f"{(history['sentiment_count']['negative'] / total_messages * 100):.1f}%"]
-        ]
-        
-        # Create and style the sentiment table
-        sentiment_table = Table(sentiment_data, colWidths=[200, 100, 100])
-        sentiment_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BOX', (0, 0), (-1, -1), 2, colors.black),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.white),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        elements.append(sentiment_table)
-        elements.append(Spacer(1, 20))
-
-        # Add AI Summary
-        elements.append(Paragraph("Analysis Summary", heading_style))
-        elements.append(Paragraph(history.get('summary', 'No summary available'), normal_style))
-        elements.append(Spacer(1, 20))
-
-        # Add top contributors
-        elements.append(Paragraph("Top Contributors Analysis", heading_style))
-
-        # Function to create contributor table
-        def create_contributor_table(title, contributors):
-            elements.append(Paragraph(title, normal_style))
-            data = [['Username', 'Message Count']]
-            for contributor in contributors:
-                data.append([contributor['username'], str(contributor['count'])])
-            
-            table = Table(data, colWidths=[300, 100])
-            table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 12),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BOX', (0, 0), (-1, -1), 2, colors.black),
-                ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.white),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            return table
-
-        # Add contributor tables
-        elements.append(create_contributor_table("Most Positive Contributors", history['top_positive']))
-        elements.append(Spacer(1, 10))
-        elements.append(create_contributor_table("Most Neutral Contributors", history['top_neutral']))
-        elements.append(Spacer(1, 10))
-        elements.append(create_contributor_table("Most Negative Contributors", history['top_negative']))
-
-        # Build the PDF
-        doc.build(elements)
-
-        # Get the value from the BytesIO buffer
-        pdf_value = buffer.getvalue()
-        buffer.close()
+        # Rendered once per version of the record, then served from disk
+        pdf_path = pdf_cache.get(history, render_analysis_pdf)
 
         # Log the PDF download
         add_log(
             mongo,
             session['user_id'],
             'Downloaded analysis PDF',
-            f"Channel: {history.get('streamer_name', 'Unknown')}"
+            f"Channel: {history.get('streamer_name', 'Unknown')}",
+            user_name=session_user_name()
         )
 
-        # Create the response
-        response = make_response(pdf_value)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=chat_analysis_{history_id}.pdf'
-        
-        return response
+        return send_file(
+            pdf_path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'chat_analysis_{history_id}.pdf',
+            conditional=True
+        )
 
     except Exception as e:
         print(f"PDF Generation Error: {str(e)}")  # Add detailed error logging
         return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
 
+# All of a user's analyses as one ZIP, streamed while it is being built
+@app.route('/api/history/export', methods=['GET'])
+def export_history():
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        formats = [f for f in request.args.get('formats', ','.join(EXPORT_FORMATS)).split(',') if f]
+        if not formats or any(f not in EXPORT_FORMATS for f in formats):
+            return jsonify({'error': f"formats must be a comma-separated subset of {', '.join(EXPORT_FORMATS)}"}), 400
+
+        # Admins may export another user's analyses
+        user_id = request.args.get('user_id') or session['user_id']
+        if user_id != session['user_id']:
+            current_user = principal_cache.get(mongo, session['user_id'])
+            if not current_user or current_user.get('role') != 'admin':
+                return jsonify({'error': 'Admin privileges required'}), 403
+        if not ObjectId.is_valid(user_id):
+            return jsonify({'error': 'Invalid user id'}), 400
+
+        cursor = mongo.db.history.find(
+            {'user_id': ObjectId(user_id), 'status': 'active'},
+            batch_size=100
+        ).sort([('created_at', -1), ('_id', -1)])
+
+        add_log(
+            mongo,
+            session['user_id'],
+            'Exported analysis history',
+            f"Formats: {', '.join(formats)}",
+            user_name=session_user_name()
+        )
+
+        response = Response(history_exporter.stream(cursor, formats), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f"attachment; filename=chat_analyses_{datetime.utcnow():%Y%m%d}.zip"
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    except Exception as e:
+        print(f"History export error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/resend-otp', methods=['POST'])
 def resend_otp():
     try:
@@ -1083,6 +1250,7 @@ def contact():
         if not all([name, email, subject, message]):
             return jsonify({'error': 'All fields are required.'}), 400
 
+        # Only refused when the mail queue is full; later delivery failures are logged by the queue
         email_sent = send_contact_email(name, email, subject, message)
         if not email_sent:
             return jsonify({'error': 'Failed to send message.'}), 500
@@ -1138,6 +1306,9 @@ def delete_account():
             return jsonify({'error': 'Incorrect password'}), 401
         # Delete the user
         result = mongo.db.users.delete_one({'_id': user['_id']})
+        principal_cache.invalidate(user['_id'])
+        if result.deleted_count:
+            increment_stats(mongo, users_total=-1, users_active=-1 if user.get('status') == 'active' else 0)
         session.clear()
         if result.deleted_count == 0:
             return jsonify({'error': 'Failed to delete account'}), 500
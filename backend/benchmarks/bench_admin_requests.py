@@ -0,0 +1,75 @@
+# Admin page request latency with and without the principal cache.
+# Drives the Flask app in-process with a test client signed in as a temporary
+# admin, so every request goes through the real role check and Mongo reads.
+# Needs the app's MongoDB (MONGO_URI); the temporary admin is removed afterwards.
+# Run from the backend directory: python -m benchmarks.bench_admin_requests --requests 500
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime
+
+os.environ.setdefault('SENTIMENT_WARMUP', 'false')
+
+from app import app, mongo
+from utils.principal_cache import principal_cache
+
+ENDPOINTS = ['/api/authenticate', '/api/admin/stats', '/api/admin/users/count', '/api/admin/logs?limit=10']
+
+def create_admin():
+    result = mongo.db.users.insert_one({
+        'first_name': 'Bench',
+        'last_name': 'Admin',
+        'email': f"bench-admin-{time.time_ns()}@example.invalid",
+        'password_hash': '',
+        'role': 'admin',
+        'status': 'active',
+        'created_at': datetime.utcnow()
+    })
+    return result.inserted_id
+
+def measure(client, path, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def run(client, count, ttl):
+    principal_cache.ttl = ttl
+    principal_cache.clear()
+    return {path: measure(client, path, count) for path in ENDPOINTS}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark admin request latency with and without the principal cache')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--ttl', type=float, default=30)
+    args = parser.parse_args()
+
+    admin_id = create_admin()
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = str(admin_id)
+            session['role'] = 'admin'
+            session['first_name'] = 'Bench'
+            session['last_name'] = 'Admin'
+
+        uncached = run(client, args.requests, 0)
+        cached = run(client, args.requests, args.ttl)
+
+        print(f"{'endpoint':32} {'uncached p50/p95 ms':>22} {'cached p50/p95 ms':>22}")
+        for path in ENDPOINTS:
+            (u50, u95), (c50, c95) = uncached[path], cached[path]
+            print(f"{path:32} {u50:10.2f} / {u95:8.2f} {c50:10.2f} / {c95:8.2f}")
+        print(f"principal cache: {principal_cache.stats()}")
+    finally:
+        mongo.db.users.delete_one({'_id': admin_id})
+        principal_cache.invalidate(admin_id)
+
+if __name__ == '__main__':
+    main()
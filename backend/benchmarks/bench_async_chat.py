@@ -0,0 +1,58 @@
+# Load benchmark for the asyncio chat client against the local fake IRC server.
+# Run from the backend directory: python -m benchmarks.bench_async_chat --channels 2000
+import argparse
+import threading
+import time
+import asyncio
+
+from utils.async_twitch_chat import AsyncTwitchChatClient
+from utils.fake_irc_server import FakeTwitchIrcServer
+
+def main():
+    parser = argparse.ArgumentParser(description='asyncio Twitch chat client load benchmark')
+    parser.add_argument('--channels', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=5, help='messages per second per channel')
+    parser.add_argument('--channels-per-connection', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    received = 0
+    lock = threading.Lock()
+
+    def count_message(channel, username, message, handler):
+        nonlocal received
+        with lock:
+            received += 1
+
+    server = FakeTwitchIrcServer(rate_per_channel=args.rate)
+    server_loop = asyncio.new_event_loop()
+    port = server_loop.run_until_complete(server.start())
+    threading.Thread(target=server_loop.run_forever, daemon=True).start()
+
+    # The fake server has no JOIN rate limit, so let the client join as fast as it can
+    client = AsyncTwitchChatClient(
+        host='127.0.0.1',
+        port=port,
+        max_channels_per_connection=args.channels_per_connection,
+        joins_per_window=args.channels,
+        submit=count_message
+    )
+
+    start = time.perf_counter()
+    for i in range(args.channels):
+        client.join(f"channel{i}", handler=lambda message_data: None)
+    while len(server.joined_channels()) < args.channels:
+        time.sleep(0.1)
+    join_time = time.perf_counter() - start
+
+    received = 0
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    elapsed = time.perf_counter() - start
+
+    stats = client.stats()
+    print(f"channels joined:  {args.channels} in {join_time:.2f}s over {stats['connections']} connection(s)")
+    print(f"messages/sec:     {received / elapsed:,.0f} (offered {args.channels * args.rate:,.0f})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Compares per-message sentiment inference with the micro-batched collector.
+# Run from the backend directory: python -m benchmarks.bench_batch_inference
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.sentiment_analyzer import sentiment_analyzer, BatchCollector
+
+SAMPLE_MESSAGES = [
+    "LUL", "KEKW", "this stream is amazing", "worst play I've ever seen",
+    "gg", "what is this song?", "PogChamp that clutch", "so boring today",
+    "!commands", "love you streamer <3", "lag again...", "hello chat",
+    "that was actually insane", "why would you do that", "first time here",
+]
+
+def make_messages(count):
+    return [random.choice(SAMPLE_MESSAGES) + f" {i}" for i in range(count)]
+
+def bench_per_message(messages):
+    start = time.perf_counter()
+    for message in messages:
+        sentiment_analyzer.analyze_text(message)
+    return len(messages) / (time.perf_counter() - start)
+
+def bench_batched(messages, producers, batch_size, wait_ms):
+    collector = BatchCollector(sentiment_analyzer, max_batch_size=batch_size, max_wait_ms=wait_ms)
+    # Simulate several chat bots submitting concurrently
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=producers) as pool:
+        list(pool.map(collector.analyze, messages))
+    return len(messages) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-message vs batched sentiment inference')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--producers', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--wait-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    sentiment_analyzer.analyze_batch(messages[:8])  # warm up
+
+    per_message = bench_per_message(messages)
+    batched = bench_batched(messages, args.producers, args.batch_size, args.wait_ms)
+
+    print(f"per-message: {per_message:8.1f} msg/s")
+    print(f"batched:     {batched:8.1f} msg/s (batch={args.batch_size}, wait={args.wait_ms}ms)")
+    print(f"speedup:     {batched / per_message:8.2f}x")
+
+if __name__ == '__main__':
+    main()
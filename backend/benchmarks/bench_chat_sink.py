@@ -0,0 +1,71 @@
+# Raw chat persistence: one insert_one per message vs the buffered ChatMessageSink.
+# Needs a running MongoDB (MONGO_URI or localhost); writes to a scratch database
+# that is dropped afterwards.
+# Run from the backend directory: python -m benchmarks.bench_chat_sink --messages 50000
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from pymongo import MongoClient
+
+from utils.chat_sink import ChatMessageSink
+from benchmarks.bench_batch_inference import make_messages
+
+def make_chat(count, channels):
+    return [
+        {
+            'channel': f"channel{i % channels}",
+            'username': f"viewer{random.randint(0, 5000)}",
+            'message': message,
+            'sentiment': random.choice(['positive', 'neutral', 'negative']),
+            'confidence': random.random()
+        }
+        for i, message in enumerate(make_messages(count))
+    ]
+
+def bench_insert_one(mongo, chat):
+    collection = mongo.db['bench_insert_one']
+    start = time.perf_counter()
+    for message_data in chat:
+        collection.insert_one(dict(message_data, timestamp=datetime.now(timezone.utc)))
+    return len(chat) / (time.perf_counter() - start)
+
+def bench_sink(mongo, chat, batch_size, flush_ms):
+    sink = ChatMessageSink(batch_size=batch_size, flush_ms=flush_ms, collection='bench_sink')
+    sink.start(mongo)
+    start = time.perf_counter()
+    for message_data in chat:
+        sink.record(message_data)
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    return len(chat) / elapsed, sink.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark raw chat message persistence')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--flush-ms', type=int, default=1000)
+    parser.add_argument('--database', default='twitch_sentiment_bench')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/'))
+    client.drop_database(args.database)
+    mongo = SimpleNamespace(db=client[args.database])
+    chat = make_chat(args.messages, args.channels)
+
+    try:
+        one_by_one = bench_insert_one(mongo, chat)
+        print(f"insert_one per message: {one_by_one:10.1f} msg/s")
+
+        buffered, stats = bench_sink(mongo, chat, args.batch_size, args.flush_ms)
+        print(f"buffered insert_many:   {buffered:10.1f} msg/s "
+              f"({stats['batches']} batches, {stats['written']} written, {stats['dropped']} dropped)")
+        print(f"speedup: {buffered / one_by_one:.1f}x")
+    finally:
+        client.drop_database(args.database)
+
+if __name__ == '__main__':
+    main()
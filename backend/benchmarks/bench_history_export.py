@@ -0,0 +1,43 @@
+# Bulk history export: throughput and peak memory of the streamed ZIP as the
+# number of records grows. Peak memory should stay flat; the archive is written
+# to /dev/null as it streams. Uses synthetic records, no database needed.
+# Run from the backend directory: python -m benchmarks.bench_history_export --records 100 1000
+import argparse
+import os
+import resource
+import time
+import tracemalloc
+
+from utils.history_export import HistoryExporter
+from benchmarks.bench_pdf_report import make_history
+
+def run(exporter, count):
+    records = (make_history(i) for i in range(count))
+    written = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'wb') as sink:
+        for chunk in exporter.stream(records):
+            sink.write(chunk)
+            written += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, written, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streamed history export')
+    parser.add_argument('--records', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--max-in-flight', type=int, default=8)
+    args = parser.parse_args()
+
+    exporter = HistoryExporter(workers=args.workers, max_in_flight=args.max_in_flight)
+    for count in args.records:
+        elapsed, written, peak = run(exporter, count)
+        print(f"{count:6d} records: {count / elapsed:8.1f} records/s, {written / 1e6:8.1f} MB archive, "
+              f"peak python heap {peak / 1e6:6.1f} MB")
+    print(f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB ({args.workers} workers)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Compares in-process inference with the out-of-process inference server.
+# Starts inference_server.py on a private port, then pushes the same messages
+# through a BatchCollector backed by each analyzer.
+# Run from the backend directory: python -m benchmarks.bench_inference_server --workers 2
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.sentiment_analyzer import SentimentAnalyzer, BatchCollector
+from utils.sentiment_backends import RemoteBackend
+from benchmarks.bench_batch_inference import make_messages
+
+def throughput(analyzer, messages, producers, concurrency):
+    collector = BatchCollector(analyzer, concurrency=concurrency)
+    collector.analyze("warm up")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=producers) as pool:
+        list(pool.map(collector.analyze, messages))
+    return len(messages) / (time.perf_counter() - start)
+
+def wait_for_server(address, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return RemoteBackend(address)
+        except OSError:
+            time.sleep(1)
+    raise RuntimeError('Inference server did not start')
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process vs out-of-process sentiment inference')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--producers', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads-per-worker', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--address', default='127.0.0.1:6099')
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    # Shared with the server subprocess through its environment
+    os.environ.setdefault('INFERENCE_AUTHKEY', secrets.token_hex(32))
+
+    in_process = throughput(SentimentAnalyzer(backend='torch'), messages, args.producers, 1)
+    print(f"in-process:          {in_process:8.1f} msg/s")
+
+    server = subprocess.Popen([
+        sys.executable, 'inference_server.py',
+        '--address', args.address,
+        '--workers', str(args.workers),
+        '--threads-per-worker', str(args.threads_per_worker)
+    ])
+    try:
+        remote = SentimentAnalyzer(backend=wait_for_server(args.address))
+        out_of_process = throughput(remote, messages, args.producers, args.workers)
+        print(f"inference server:    {out_of_process:8.1f} msg/s "
+              f"({args.workers} workers x {args.threads_per_worker} threads)")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == '__main__':
+    main()
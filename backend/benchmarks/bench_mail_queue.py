@@ -0,0 +1,94 @@
+# Outgoing mail: a fresh SMTP connection per message (the old send path) vs the
+# background MailQueue, both against a local aiosmtpd server. Reports the
+# latency a request thread sees and end-to-end delivery time. --fail-every N
+# makes the server answer 451 to every Nth message to exercise retries.
+# Needs aiosmtpd (pip install aiosmtpd).
+# Run from the backend directory: python -m benchmarks.bench_mail_queue --messages 500
+import argparse
+import itertools
+import smtplib
+import socket
+import statistics
+import threading
+import time
+from aiosmtpd.controller import Controller
+
+from utils.email_sender import build_message, OTP_TEXT, OTP_HTML
+from utils.mail_queue import MailQueue, SmtpConnection
+
+class CountingHandler:
+    def __init__(self, fail_every=0):
+        self.fail_every = fail_every
+        self.received = 0
+        self._attempts = itertools.count(1)
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_every and next(self._attempts) % self.fail_every == 0:
+            return '451 Requested action aborted: try again later'
+        with self._lock:
+            self.received += 1
+        return '250 OK'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def make_message(index):
+    return build_message('Bench <bench@example.invalid>', f"user{index}@example.invalid",
+                         "Your OTP for Account Verification", OTP_TEXT, OTP_HTML, otp=f"{index:06d}")
+
+def bench_direct(host, port, count):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        sent = time.perf_counter()
+        with smtplib.SMTP(host, port) as server:
+            server.send_message(make_message(i))
+        latencies.append((time.perf_counter() - sent) * 1000)
+    return latencies, time.perf_counter() - start
+
+def bench_queue(host, port, count, workers, batch_size):
+    mail = MailQueue(lambda: SmtpConnection(host, port, starttls=False),
+                     workers=workers, batch_size=batch_size, base_delay=0.05, max_delay=0.5)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        sent = time.perf_counter()
+        mail.send(make_message(i))
+        latencies.append((time.perf_counter() - sent) * 1000)
+    mail.drain(timeout=120)
+    return latencies, time.perf_counter() - start, mail.stats()
+
+def report(label, latencies, elapsed, count):
+    latencies.sort()
+    print(f"{label:18} request p50 {statistics.median(latencies):7.3f} ms  p95 {latencies[int(len(latencies) * 0.95) - 1]:7.3f} ms  "
+          f"delivered {count / elapsed:8.1f} msg/s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark outgoing mail against a local SMTP server')
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--fail-every', type=int, default=0)
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.fail_every)
+    host, port = '127.0.0.1', free_port()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    try:
+        if not args.fail_every:
+            latencies, elapsed = bench_direct(host, port, args.messages)
+            report('connect per mail', latencies, elapsed, args.messages)
+
+        received_before = handler.received
+        latencies, elapsed, stats = bench_queue(host, port, args.messages, args.workers, args.batch_size)
+        report('mail queue', latencies, elapsed, args.messages)
+        print(f"server received {handler.received - received_before}/{args.messages}; queue stats {stats}")
+    finally:
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Latency/throughput comparison of the sentiment backends, with label agreement
+# against PyTorch for reference. The parity gate itself is tests/test_onnx_parity.py.
+# Run from the backend directory: python -m benchmarks.bench_onnx_backend
+import argparse
+import statistics
+import time
+
+from utils.sentiment_analyzer import SentimentAnalyzer
+from benchmarks.bench_batch_inference import SAMPLE_MESSAGES, make_messages
+
+PARITY_MESSAGES = SAMPLE_MESSAGES + [
+    "I can't believe how good this is", "this is the worst stream ever",
+    "meh, it's okay I guess", "ResidentSleeper", "POGGERS let's go",
+    "you're trash at this game", "thanks for the raid!", "when is the next stream?",
+]
+
+def measure(analyzer, messages, batch_size):
+    latencies = []
+    for message in messages[:200]:
+        start = time.perf_counter()
+        analyzer.analyze_text(message)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for i in range(0, len(messages), batch_size):
+        analyzer.analyze_batch(messages[i:i + batch_size])
+    throughput = len(messages) / (time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+        'throughput': throughput
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare torch and ONNX Runtime sentiment backends')
+    parser.add_argument('--backends', default='torch,onnx,onnx-int8')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    names = args.backends.split(',')
+    analyzers = {name: SentimentAnalyzer(backend=name) for name in names}
+    messages = make_messages(args.messages)
+
+    reference = [r['sentiment'] for r in analyzers['torch'].analyze_batch(PARITY_MESSAGES)] if 'torch' in analyzers else None
+
+    print(f"{'backend':<10} {'agree':>7} {'p50 ms':>8} {'p95 ms':>8} {'msg/s':>9}")
+    for name, analyzer in analyzers.items():
+        analyzer.analyze_batch(messages[:8])  # warm up
+        agreement = 1.0
+        if reference is not None:
+            labels = [r['sentiment'] for r in analyzer.analyze_batch(PARITY_MESSAGES)]
+            agreement = sum(a == b for a, b in zip(labels, reference)) / len(reference)
+        result = measure(analyzer, messages, args.batch_size)
+        print(f"{name:<10} {agreement:>7.1%} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['throughput']:>9.1f}")
+
+if __name__ == '__main__':
+    main()
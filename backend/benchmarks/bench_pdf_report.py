@@ -0,0 +1,63 @@
+# Analysis PDF downloads: rendering on every request vs serving from PdfCache.
+# Uses a synthetic history record and a scratch cache directory; no database needed.
+# Run from the backend directory: python -m benchmarks.bench_pdf_report --downloads 200
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from utils.pdf_report import render_analysis_pdf
+from utils.pdf_cache import PdfCache
+
+def make_history(index):
+    contributors = [{'username': f"viewer{i}", 'count': 100 - i} for i in range(5)]
+    return {
+        '_id': f"bench{index:04d}",
+        'streamer_name': 'benchchannel',
+        'total_chats': 12345,
+        'sentiment_count': {'positive': 5000, 'neutral': 6000, 'negative': 1345},
+        'top_positive': contributors,
+        'top_neutral': contributors,
+        'top_negative': contributors,
+        'summary': 'Chat was mostly upbeat with a few complaints about stream quality. ' * 5,
+        'duration': 5400,
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }
+
+def bench_render(histories, downloads):
+    start = time.perf_counter()
+    for i in range(downloads):
+        render_analysis_pdf(histories[i % len(histories)])
+    return (time.perf_counter() - start) / downloads * 1000
+
+def bench_cached(histories, downloads, directory):
+    cache = PdfCache(directory)
+    start = time.perf_counter()
+    for i in range(downloads):
+        with open(cache.get(histories[i % len(histories)], render_analysis_pdf), 'rb') as f:
+            while f.read(64 * 1024):
+                pass
+    return (time.perf_counter() - start) / downloads * 1000, cache.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analysis PDF downloads with and without the cache')
+    parser.add_argument('--downloads', type=int, default=200)
+    parser.add_argument('--records', type=int, default=10)
+    args = parser.parse_args()
+
+    histories = [make_history(i) for i in range(args.records)]
+    directory = tempfile.mkdtemp(prefix='bench-pdf-')
+    try:
+        uncached = bench_render(histories, args.downloads)
+        print(f"render per download: {uncached:8.2f} ms")
+
+        cached, stats = bench_cached(histories, args.downloads, directory)
+        print(f"cached download:     {cached:8.2f} ms ({stats['renders']} renders, {stats['hits']} hits)")
+        print(f"speedup: {uncached / cached:.1f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Startup profile: import time per module when loading the Flask app.
+# Uses python -X importtime, so nothing in the app has to be instrumented.
+# Run from the backend directory: python -m benchmarks.profile_startup --top 25
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+def profile_imports(target):
+    env = dict(os.environ, SENTIMENT_WARMUP='false')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        capture_output=True, text=True, env=env
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(result.returncode)
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return wall, modules
+
+def main():
+    parser = argparse.ArgumentParser(description='Show import time per module for the backend')
+    parser.add_argument('--target', default='app')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    wall, modules = profile_imports(args.target)
+
+    # Top-level packages (no leading indentation) give the per-dependency picture
+    top_level = [m for m in modules if not m[0].startswith(' ')]
+    top_level.sort(key=lambda m: m[2], reverse=True)
+
+    print(f"import {args.target}: {wall:.2f}s wall (model warm-up disabled)\n")
+    print(f"{'module':<40} {'cumulative ms':>14} {'self ms':>9}")
+    for name, self_us, cumulative_us in top_level[:args.top]:
+        print(f"{name.strip():<40} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+if __name__ == '__main__':
+    main()
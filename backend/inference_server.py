@@ -0,0 +1,167 @@
+# Standalone sentiment inference service. Runs N model worker processes, each
+# pinned to its own group of cores with a fixed number of torch intra-op
+# threads, and serves batches over a local socket. Web workers connect with
+# SENTIMENT_BACKEND=remote instead of each loading their own copy of the model.
+#
+#   python inference_server.py --workers 2 --threads-per-worker 4
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from multiprocessing.connection import Listener
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.sentiment_backends import INFERENCE_SERVER_ADDRESS, inference_authkey, is_local_address, parse_address
+
+def model_worker(index, backend_name, threads, task_queue, result_queue):
+    # Keep each worker on its own cores so workers don't fight over the same caches
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        group = cpus[index * threads:(index + 1) * threads]
+        if len(group) == threads:
+            os.sched_setaffinity(0, group)
+    os.environ['SENTIMENT_INTRA_OP_THREADS'] = str(threads)
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+
+    from utils.sentiment_backends import load_backend
+
+    if backend_name == 'torch':
+        import torch
+        torch.set_num_threads(threads)
+    backend = load_backend(backend_name)
+    print(f"Inference worker {index} ready ({backend_name}, {threads} threads)")
+    result_queue.put(('ready', index, None, None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        client_id, request_id, texts = task
+        try:
+            result_queue.put((client_id, request_id, backend.predict(texts), None))
+        except Exception as e:
+            result_queue.put((client_id, request_id, None, str(e)))
+
+class InferenceServer:
+    def __init__(self, address, authkey, workers=2, threads_per_worker=1, backend='torch'):
+        self.address = address
+        self.authkey = authkey
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.backend = backend
+
+        context = multiprocessing.get_context('spawn')
+        self.task_queue = context.Queue()
+        self.result_queue = context.Queue()
+        self.processes = [
+            context.Process(
+                target=model_worker,
+                args=(i, backend, threads_per_worker, self.task_queue, self.result_queue),
+                daemon=True
+            )
+            for i in range(workers)
+        ]
+        self._clients = {}
+        self._client_ids = 0
+        self._lock = threading.Lock()
+
+    def _route_results(self):
+        while True:
+            client_id, request_id, results, error = self.result_queue.get()
+            if client_id == 'ready':
+                continue
+            with self._lock:
+                client = self._clients.get(client_id)
+            if client is None:
+                continue
+            conn, send_lock = client
+            try:
+                with send_lock:
+                    conn.send((request_id, results, error))
+            except (OSError, ValueError):
+                pass
+
+    def _serve_client(self, client_id, conn):
+        try:
+            while True:
+                request_id, texts = conn.recv()
+                self.task_queue.put((client_id, request_id, texts))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._clients.pop(client_id, None)
+            conn.close()
+
+    def serve_forever(self):
+        for process in self.processes:
+            process.start()
+        try:
+            self._serve()
+        finally:
+            for process in self.processes:
+                process.terminate()
+
+    def _serve(self):
+        ready = 0
+        while ready < self.workers:
+            if self.result_queue.get()[0] == 'ready':
+                ready += 1
+
+        router = threading.Thread(target=self._route_results, name='inference-router')
+        router.daemon = True
+        router.start()
+
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Inference server listening on {self.address} with {self.workers} worker(s)")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Rejected inference client: {e}")
+                    continue
+                with self._lock:
+                    self._client_ids += 1
+                    client_id = self._client_ids
+                    self._clients[client_id] = (conn, threading.Lock())
+                thread = threading.Thread(target=self._serve_client, args=(client_id, conn))
+                thread.daemon = True
+                thread.start()
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentiment inference server')
+    parser.add_argument('--address', default=INFERENCE_SERVER_ADDRESS, help='host:port or unix socket path')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('INFERENCE_WORKERS', 2)))
+    parser.add_argument('--threads-per-worker', type=int, default=int(os.getenv('INFERENCE_THREADS_PER_WORKER', 1)))
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'torch'),
+                        help='model backend used by the workers: torch, onnx or onnx-int8')
+    parser.add_argument('--allow-remote', action='store_true',
+                        help='listen on a non-loopback address (clients can run code here if they have the key)')
+    args = parser.parse_args()
+
+    try:
+        authkey = inference_authkey()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    address = parse_address(args.address)
+    if not is_local_address(address) and not args.allow_remote:
+        sys.exit(f"Refusing to listen on {args.address}; use a loopback address, a unix socket or --allow-remote")
+
+    # Turn SIGTERM into a normal exit so the model workers are shut down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = InferenceServer(
+        address,
+        authkey,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        backend=args.backend
+    )
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,35 @@
 from datetime import datetime
 from bson.objectid import ObjectId
-from utils.gemini_analyzer import generate_analysis_summary
+from utils.gemini_analyzer import summaries_enabled
+from utils.summary_worker import summary_worker
+from utils.summary_cache import summary_cache
+from utils.pdf_cache import pdf_cache
+from models.stats import increment_stats
 import traceback
+import base64
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+# Fields shown in the history list; summaries, contributors and time series load with the full document
+HISTORY_LIST_PROJECTION = {
+    'user_id': 1, 'streamer_name': 1, 'total_chats': 1, 'sentiment_count': 1,
+    'duration': 1, 'summary_status': 1, 'created_at': 1
+}
+
+TIMESERIES_FIELDS = ['resolution', 'start', 'positive', 'neutral', 'negative', 'confidence']
+
 def create_history_schema(mongo):
     try:
         mongo.db.history.create_index([('user_id', 1)])  
         mongo.db.history.create_index([('created_at', -1)])  
         mongo.db.history.create_index([('status', 1)]) 
+        # Serves the paginated history list: equality on user/status, then keyset order
+        mongo.db.history.create_index([('user_id', 1), ('status', 1), ('created_at', -1), ('_id', -1)])
     except Exception as e:
         logger.error(f"History index creation failed: {str(e)}")
 
@@ -21,6 +38,12 @@ def validate_top_contributors(contributors):
         return []
     return contributors[:5]  
 
+def validate_timeseries(series):
+    # Per-minute sentiment buckets recorded while the channel was analyzed
+    if not series or not isinstance(series, dict):
+        return None
+    return {field: series.get(field) for field in TIMESERIES_FIELDS}
+
 def save_analysis(mongo, data):
     try:
         now = datetime.utcnow()
@@ -52,19 +75,18 @@ def save_analysis(mongo, data):
             data['top_negative'] = data.get('top_negative', [])[:5]
             data['top_neutral'] = data.get('top_neutral', [])[:5]
 
-        summary = "Summary generation failed. Please try again later."
-        try:
-            # Check if Gemini API key is configured
-            if not os.getenv('GEMINI_API_KEY'):
-                logger.warning("GEMINI_API_KEY not found in environment variables")
-                summary = "Summary generation skipped: API key not configured"
-            else:
-                summary = generate_analysis_summary(data)
-                if "Unable to generate summary" in summary:
-                    logger.warning(f"Gemini API warning: {summary}")
-        except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
-            logger.error(traceback.format_exc())
+        # The summary is generated in the background; the document is stored as pending until it lands
+        summary = None
+        summary_status = 'pending'
+        if not summaries_enabled():
+            logger.warning("GEMINI_API_KEY not found in environment variables")
+            summary = "Summary generation skipped: API key not configured"
+            summary_status = 'skipped'
+        else:
+            # An identical analysis was summarised before, so reuse it without calling the LLM
+            summary = summary_cache.get(mongo, data)
+            if summary:
+                summary_status = 'completed'
 
         try:
             history = {
@@ -79,7 +101,9 @@ def save_analysis(mongo, data):
                 'top_positive': data.get('top_positive', []),
                 'top_negative': data.get('top_negative', []),
                 'top_neutral': data.get('top_neutral', []),
+                'timeseries': validate_timeseries(data.get('timeseries')),
                 'summary': summary,
+                'summary_status': summary_status,
                 'status': 'active',
                 'duration': data.get('duration', 0),
                 'created_at': now,
@@ -94,26 +118,59 @@ def save_analysis(mongo, data):
             logger.debug("Inserting history document into database")
             result = mongo.db.history.insert_one(history)
             logger.debug(f"Inserted document with ID: {result.inserted_id}")
-            return result.inserted_id
         except Exception as e:
             logger.error(f"Error inserting document into MongoDB: {str(e)}")
             raise
+
+        increment_stats(mongo, analyses_total=1, comments_total=history['total_chats'])
+        if summary_status == 'pending':
+            history['_id'] = result.inserted_id
+            summary_worker.submit(mongo, history)
+        return result.inserted_id
         
     except Exception as e:
         logger.error(f"Unhandled error in save_analysis: {str(e)}")
         logger.error(traceback.format_exc())
         raise  
 
-def get_user_history(mongo, user_id):
+def encode_history_cursor(item):
+    raw = f"{item['created_at'].isoformat()}|{item['_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(cursor):
     try:
-        history = mongo.db.history.find({
-            'user_id': ObjectId(user_id),
-            'status': 'active'
-        }).sort('created_at', -1)
-        return list(history)
+        created_at, history_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), ObjectId(history_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_user_history(mongo, user_id, limit=HISTORY_PAGE_SIZE, cursor=None):
+    # Keyset pagination on (created_at, _id), newest first. Returns one page of
+    # list-view fields and the cursor for the next page (None on the last page).
+    query = {
+        'user_id': ObjectId(user_id),
+        'status': 'active'
+    }
+    if cursor:
+        created_at, history_id = decode_history_cursor(cursor)
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': history_id}}
+        ]
+
+    limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+    try:
+        history = list(
+            mongo.db.history.find(query, HISTORY_LIST_PROJECTION)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(limit + 1)
+        )
     except Exception as e:
         logger.error(f"Error fetching history: {str(e)}")
-        return []
+        return [], None
+
+    next_cursor = encode_history_cursor(history[limit - 1]) if len(history) > limit else None
+    return history[:limit], next_cursor
 
 def get_history_by_id(mongo, history_id):
     try:
@@ -124,22 +181,27 @@ def get_history_by_id(mongo, history_id):
 
 def delete_history(mongo, history_id, user_id):
     try:
-        result = mongo.db.history.update_one(
+        deleted = mongo.db.history.find_one_and_update(
             {
                 '_id': ObjectId(history_id),
-                'user_id': ObjectId(user_id) 
+                'user_id': ObjectId(user_id),
+                'status': 'active'
             },
             {
                 '$set': {
                     'status': 'deleted',
                     'updated_at': datetime.utcnow()
                 }
-            }
+            },
+            projection={'total_chats': 1}
         )
         
-        if result.modified_count == 0:
+        if deleted is None:
             logger.warning(f"No history found for id: {history_id} and user_id: {user_id}")
             return False
+
+        increment_stats(mongo, analyses_total=-1, comments_total=-deleted.get('total_chats', 0))
+        pdf_cache.invalidate(history_id)
             
         logger.debug(f"Successfully deleted history id: {history_id}")
         return True
@@ -1,69 +1,216 @@
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from collections import OrderedDict
+from utils.log_buffer import log_buffer
+import threading
 import logging
+import os
+import base64
+import json
+import time
+import re
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+SORT_FIELDS = {'created_at': 'created_at', 'user_name': 'user_name', 'activity': 'activity', 'id': '_id', '_id': '_id'}
+COUNT_LIMIT = 10000
+COUNT_CACHE_TTL = 30
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+USER_NAME_CACHE_SIZE = int(os.getenv('LOG_USER_NAME_CACHE_SIZE', 1024))
+_user_names = OrderedDict()
+_user_names_lock = threading.Lock()
+
 def create_logs_schema(mongo):
     try:
         mongo.db.logs.create_index([('user_id', 1)])  
         mongo.db.logs.create_index([('created_at', -1)])  
         mongo.db.logs.create_index([('activity', 1)])  
+        # Keyset pagination for every sortable column, and word-prefix search
+        mongo.db.logs.create_index([('created_at', -1), ('_id', -1)])
+        mongo.db.logs.create_index([('user_name', 1), ('_id', 1)])
+        mongo.db.logs.create_index([('activity', 1), ('_id', 1)])
+        mongo.db.logs.create_index([('search_tokens', 1)])
     except Exception as e:
         logger.error(f"Logs index creation failed: {str(e)}")
 
-def add_log(mongo, user_id, activity, details=None):
+def tokenize(*values):
+    # Lowercased words of the searchable fields; a search term matches a token by prefix
+    tokens = set()
+    for value in values:
+        if value:
+            tokens.update(re.findall(r'\w+', str(value).lower()))
+    return sorted(tokens)
+
+def backfill_search_tokens(mongo, batch_size=1000):
+    # Logs written before search_tokens existed get them once, in bulk
+    updated = 0
     try:
-        # Get user info for the log
-        user = mongo.db.users.find_one({'_id': ObjectId(user_id)})
-        user_name = f"{user['first_name']} {user['last_name']}" if user else "Unknown User"
+        while True:
+            batch = list(mongo.db.logs.find(
+                {'search_tokens': {'$exists': False}},
+                {'user_name': 1, 'activity': 1, 'details': 1}
+            ).limit(batch_size))
+            if not batch:
+                break
+            mongo.db.logs.bulk_write([
+                UpdateOne({'_id': log['_id']}, {'$set': {
+                    'search_tokens': tokenize(log.get('user_name'), log.get('activity'), log.get('details'))
+                }})
+                for log in batch
+            ], ordered=False)
+            updated += len(batch)
+    except Exception as e:
+        logger.error(f"Error backfilling log search tokens: {str(e)}")
+    return updated
+
+def remember_user_name(user_id, user_name):
+    with _user_names_lock:
+        _user_names[str(user_id)] = user_name
+        _user_names.move_to_end(str(user_id))
+        while len(_user_names) > USER_NAME_CACHE_SIZE:
+            _user_names.popitem(last=False)
+
+def forget_user_name(user_id):
+    with _user_names_lock:
+        _user_names.pop(str(user_id), None)
+
+def resolve_user_name(mongo, user_id):
+    with _user_names_lock:
+        user_name = _user_names.get(str(user_id))
+        if user_name:
+            _user_names.move_to_end(str(user_id))
+    if user_name:
+        return user_name
+
+    user = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'first_name': 1, 'last_name': 1})
+    if not user:
+        return "Unknown User"
+    user_name = f"{user['first_name']} {user['last_name']}"
+    remember_user_name(user_id, user_name)
+    return user_name
+
+def add_log(mongo, user_id, activity, details=None, user_name=None):
+    # The entry is queued and written in a batch by log_buffer, so logging costs
+    # the request no round trips when the user name is passed in or cached
+    try:
+        if user_name:
+            remember_user_name(user_id, user_name)
+        else:
+            user_name = resolve_user_name(mongo, user_id)
         
         log_entry = {
+            '_id': ObjectId(),
             'user_id': ObjectId(user_id),
             'user_name': user_name,
             'activity': activity,
             'details': details,
+            'search_tokens': tokenize(user_name, activity, details),
             'created_at': datetime.utcnow()
         }
         
-        result = mongo.db.logs.insert_one(log_entry)
-        return result.inserted_id
+        log_buffer.write(mongo, log_entry)
+        return log_entry['_id']
     except Exception as e:
         logger.error(f"Error adding log: {str(e)}")
         return None
 
-def get_logs(mongo, page=1, limit=10, search=None, sort_field='created_at', sort_direction='desc', activity=None):
+def encode_log_cursor(log, sort_field):
+    value = log.get(sort_field)
+    if isinstance(value, datetime):
+        value = {'$date': value.isoformat()}
+    elif isinstance(value, ObjectId):
+        value = {'$oid': str(value)}
+    raw = json.dumps({'v': value, 'id': str(log['_id'])})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
 
+def decode_log_cursor(cursor):
     try:
-        query = {}
-        
-        if search:
-            query['$or'] = [
-                {'user_name': {'$regex': search, '$options': 'i'}},
-                {'activity': {'$regex': search, '$options': 'i'}},
-                {'details': {'$regex': search, '$options': 'i'}}
-            ]
-            
-        # Add activity filter if provided
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value = data['v']
+        if isinstance(value, dict) and '$date' in value:
+            value = datetime.fromisoformat(value['$date'])
+        elif isinstance(value, dict) and '$oid' in value:
+            value = ObjectId(value['$oid'])
+        return value, ObjectId(data['id'])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_after(sort_field, sort_order, value, last_id):
+    # Rows after (value, last_id) in sort order. Missing/None values sort before
+    # every string or date, but $gt/$lt never match across types, so the null
+    # group is handled explicitly: first when ascending, last when descending.
+    op = '$gt' if sort_order == 1 else '$lt'
+    if sort_field == '_id':
+        return {'_id': {op: last_id}}
+    same_value = {sort_field: value, '_id': {op: last_id}}
+    if value is None:
+        if sort_order == 1:
+            return {'$or': [same_value, {sort_field: {'$ne': None}}]}
+        return same_value
+    after = [{sort_field: {op: value}}, same_value]
+    if sort_order == -1:
+        after.append({sort_field: None})
+    return {'$or': after}
+
+def count_logs(mongo, query):
+    # The unfiltered total comes from collection metadata; filtered totals are
+    # counted through the token index, capped at COUNT_LIMIT and cached briefly
+    if not query:
+        return mongo.db.logs.estimated_document_count(), True
+
+    key = json.dumps(query, sort_keys=True, default=str)
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+
+    total = mongo.db.logs.count_documents(query, limit=COUNT_LIMIT + 1)
+    result = (min(total, COUNT_LIMIT), total <= COUNT_LIMIT)
+    with _count_lock:
+        if len(_count_cache) > 1000:
+            _count_cache.clear()
+        _count_cache[key] = (now + COUNT_CACHE_TTL, result[0], result[1])
+    return result
+
+def get_logs(mongo, limit=10, search=None, sort_field='created_at', sort_direction='desc', activity=None, cursor=None):
+
+    try:
+        filters = [
+            # Anchored, case-sensitive prefix on lowercase tokens, so it is an index range scan
+            {'search_tokens': {'$regex': f'^{re.escape(term)}'}}
+            for term in tokenize(search)
+        ]
+        # The activity dropdown is an exact match, served by the (activity, _id) index
         if activity and activity != 'all':
-            query['activity'] = {'$regex': activity, '$options': 'i'}
+            filters.insert(0, {'activity': activity})
+        query = {'$and': filters} if len(filters) > 1 else (filters[0] if filters else {})
         
-        # Set up sorting
+        # Set up sorting; _id breaks ties so the keyset is unique
+        sort_field = SORT_FIELDS.get(sort_field, 'created_at')
         sort_order = 1 if sort_direction == 'asc' else -1
+        sort = [(sort_field, sort_order)] if sort_field == '_id' else [(sort_field, sort_order), ('_id', sort_order)]
         
-        # Count total matching documents
-        total_items = mongo.db.logs.count_documents(query)
+        total_items, total_exact = count_logs(mongo, query)
         
-        # Calculate skip value for pagination
-        skip = (page - 1) * limit
+        # Continue after the last row of the previous page instead of skipping
+        page_query = query
+        if cursor:
+            value, last_id = decode_log_cursor(cursor)
+            after = keyset_after(sort_field, sort_order, value, last_id)
+            page_query = {'$and': [query, after]} if query else after
         
-        # Get paginated and sorted results
-        logs = mongo.db.logs.find(query).sort(sort_field, sort_order).skip(skip).limit(limit)
+        logs = list(mongo.db.logs.find(page_query, {'search_tokens': 0}).sort(sort).limit(limit + 1))
+        next_cursor = encode_log_cursor(logs[limit - 1], sort_field) if len(logs) > limit else None
         
         # Convert to list and process ObjectIds for JSON serialization
         logs_list = []
-        for log in logs:
+        for log in logs[:limit]:
             log['_id'] = str(log['_id'])
             log['user_id'] = str(log['user_id'])
             log['created_at'] = log['created_at'].isoformat() if log.get('created_at') else None
@@ -71,14 +218,20 @@ def get_logs(mongo, page=1, limit=10, search=None, sort_field='created_at', sort
         
         return {
             'logs': logs_list,
-            'totalItems': total_items
+            'totalItems': total_items,
+            'totalExact': total_exact,
+            'nextCursor': next_cursor
         }
     
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Error getting logs: {str(e)}")
         return {
             'logs': [],
-            'totalItems': 0
+            'totalItems': 0,
+            'totalExact': True,
+            'nextCursor': None
         }
 
 def clear_old_logs(mongo, days_to_keep=90):
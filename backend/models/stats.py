@@ -0,0 +1,105 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Dashboard counters live in one materialized document that the write paths
+# keep current with $inc, so reading them never scans users or history.
+STATS_ID = 'dashboard'
+STATS_CACHE_TTL = float(os.getenv('ADMIN_STATS_CACHE_TTL', 5))
+
+_cache = {'value': None, 'expires': 0.0}
+_cache_lock = threading.Lock()
+
+def rebuild_stats(mongo):
+    # Recount everything with two aggregations when the counters document is missing.
+    # $setOnInsert never overwrites a live document, so a restart (or a concurrent
+    # rebuild) can't clobber counters that $inc updates have moved on since
+    try:
+        users = next(mongo.db.users.aggregate([
+            {'$group': {
+                '_id': None,
+                'total': {'$sum': 1},
+                'active': {'$sum': {'$cond': [{'$eq': ['$status', 'active']}, 1, 0]}}
+            }}
+        ]), {'total': 0, 'active': 0})
+        history = next(mongo.db.history.aggregate([
+            {'$match': {'status': 'active'}},
+            {'$group': {
+                '_id': None,
+                'analyses': {'$sum': 1},
+                'comments': {'$sum': {'$ifNull': ['$total_chats', 0]}}
+            }}
+        ]), {'analyses': 0, 'comments': 0})
+
+        stats = {
+            'users_total': users['total'],
+            'users_active': users['active'],
+            'analyses_total': history['analyses'],
+            'comments_total': history['comments'],
+            'rebuilt_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        stats = mongo.db.stats.find_one_and_update(
+            {'_id': STATS_ID},
+            {'$setOnInsert': stats},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        invalidate_stats_cache()
+        return stats
+    except Exception as e:
+        logger.error(f"Error rebuilding dashboard stats: {str(e)}")
+        return None
+
+def ensure_stats(mongo):
+    # Startup only builds the document when it is missing
+    if mongo.db.stats.find_one({'_id': STATS_ID}, {'_id': 1}) is None:
+        rebuild_stats(mongo)
+
+def increment_stats(mongo, **deltas):
+    deltas = {field: amount for field, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    try:
+        # No upsert: a missing document is rebuilt from scratch on the next read
+        mongo.db.stats.update_one(
+            {'_id': STATS_ID},
+            {'$inc': deltas, '$set': {'updated_at': datetime.utcnow()}}
+        )
+    except Exception as e:
+        logger.error(f"Error updating dashboard stats: {str(e)}")
+
+def record_user_status_change(mongo, old_status, new_status):
+    if old_status == new_status:
+        return
+    if new_status == 'active':
+        increment_stats(mongo, users_active=1)
+    elif old_status == 'active':
+        increment_stats(mongo, users_active=-1)
+
+def invalidate_stats_cache():
+    with _cache_lock:
+        _cache['value'] = None
+        _cache['expires'] = 0.0
+
+def get_dashboard_stats(mongo):
+    with _cache_lock:
+        if _cache['value'] is not None and time.monotonic() < _cache['expires']:
+            return _cache['value']
+
+    stats = mongo.db.stats.find_one({'_id': STATS_ID}) or rebuild_stats(mongo) or {}
+    value = {
+        'users': {'total': stats.get('users_total', 0), 'active': stats.get('users_active', 0)},
+        'comments': {'total': stats.get('comments_total', 0)},
+        'usage': {'total': stats.get('analyses_total', 0)},
+        'updated_at': stats['updated_at'].isoformat() if stats.get('updated_at') else None
+    }
+    with _cache_lock:
+        _cache['value'] = value
+        _cache['expires'] = time.monotonic() + STATS_CACHE_TTL
+    return value
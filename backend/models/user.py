@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 import secrets
 import pyotp
 from bson.objectid import ObjectId
+from models.stats import increment_stats, record_user_status_change
+from utils.image_store import image_store
+from utils.principal_cache import principal_cache
 
 def create_user_schema(mongo):
     try:
@@ -42,11 +45,20 @@ def create_user(mongo, user_data):
         'profile_image': None 
     }
     result = mongo.db.users.insert_one(user)
+    increment_stats(mongo, users_total=1)
     return result, otp
 
+def delete_unverified_user(mongo, user_id):
+    # Rolls back a registration whose verification email could not be sent; an
+    # account that has been verified in the meantime is left alone
+    result = mongo.db.users.delete_one({'_id': user_id, 'status': 'not_active'})
+    if result.deleted_count:
+        increment_stats(mongo, users_total=-1)
+    return result.deleted_count > 0
+
 def activate_user(mongo, email):
     now = datetime.utcnow()
-    return mongo.db.users.update_one(
+    previous = mongo.db.users.find_one_and_update(
         {'email': email},
         {
             '$set': {
@@ -55,8 +67,13 @@ def activate_user(mongo, email):
                 'otp_created_at': None,
                 'updated_at': now
             }
-        }
+        },
+        projection={'status': 1}
     )
+    if previous:
+        principal_cache.invalidate(previous['_id'])
+        record_user_status_change(mongo, previous.get('status'), 'active')
+    return previous
 
 def generate_reset_token():
     token = secrets.token_urlsafe(32)
@@ -106,6 +123,7 @@ def update_profile(mongo, user_id, profile_data):
             {'_id': ObjectId(user_id)},
             {'$set': update_fields}
         )
+        principal_cache.invalidate(user_id)
         return result.modified_count > 0
     except ValueError as e:
         raise e
@@ -113,18 +131,23 @@ def update_profile(mongo, user_id, profile_data):
         return False
 
 def update_profile_image(mongo, user_id, image_data):
+    # The image itself goes to the blob store; the user document only keeps its hash
     try:
         now = datetime.utcnow()
+        image_hash = image_store.put(mongo, image_data)
         result = mongo.db.users.update_one(
             {'_id': ObjectId(user_id)},
             {
                 '$set': {
-                    'profile_image': image_data,
+                    'profile_image': image_hash,
                     'updated_at': now
                 }
             }
         )
-        return result.modified_count > 0
+        principal_cache.invalidate(user_id)
+        return result.matched_count > 0
+    except ValueError:
+        raise
     except:
         return False
 
@@ -140,10 +163,27 @@ def remove_profile_image(mongo, user_id):
                 }
             }
         )
+        principal_cache.invalidate(user_id)
         return result.modified_count > 0
     except:
         return False
 
+def migrate_profile_images(mongo):
+    # Move images stored inline as data URLs by older versions into the blob store
+    migrated = 0
+    for user in mongo.db.users.find({'profile_image': {'$regex': '^data:'}}, {'profile_image': 1}):
+        try:
+            image_hash = image_store.put(mongo, user['profile_image'])
+        except Exception as e:
+            print(f"Could not migrate profile image for {user['_id']}: {e}")
+            continue
+        mongo.db.users.update_one(
+            {'_id': user['_id'], 'profile_image': user['profile_image']},
+            {'$set': {'profile_image': image_hash}}
+        )
+        migrated += 1
+    return migrated
+
 def save_reset_token(mongo, email):
     try:
         user = get_user_by_email(mongo, email)
@@ -248,12 +288,15 @@ def update_user_by_admin(mongo, user_id, user_data):
             if existing_user:
                 raise ValueError('Email is already taken')
         
-        result = mongo.db.users.update_one(
+        previous = mongo.db.users.find_one_and_update(
             {'_id': ObjectId(user_id)},
-            {'$set': update_fields}
+            {'$set': update_fields},
+            projection={'status': 1}
         )
         
-        if result.modified_count > 0:
+        if previous:
+            principal_cache.invalidate(user_id)
+            record_user_status_change(mongo, previous.get('status'), update_fields.get('status', previous.get('status')))
             updated_user = mongo.db.users.find_one({'_id': ObjectId(user_id)})
             if updated_user:
                 updated_user['_id'] = str(updated_user['_id'])
@@ -0,0 +1,215 @@
+# Offline replay: re-runs sentiment analysis over an archived chat log and prints
+# one analysis document per channel, in the shape /api/history/save stores.
+# The log is memory-mapped and streamed through generators (parse -> normalize ->
+# batch -> infer -> aggregate), with inference spread over a process pool.
+#
+#   python replay_chat.py vod_chat.log --workers 4 --output analysis.json
+#
+# Lines may be raw IRC (optionally with IRCv3 tags, as logged from Twitch) or
+# JSON objects with username/message and optional channel/timestamp fields.
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.async_twitch_chat import parse_irc_line
+from utils.chat_aggregator import ChannelAggregator
+from utils.sentiment_analyzer import normalize_text
+
+def iter_lines(path):
+    # mmap lets the OS page the file in and out, so multi-gigabyte logs never sit in memory
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            size = len(mm)
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = size
+                yield mm[start:end].decode('utf-8', errors='replace').rstrip('\r')
+                start = end + 1
+
+def parse_timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # Twitch tags and most exporters use milliseconds
+        return value / 1000.0 if value > 1e11 else float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value) / 1000.0 if float(value) > 1e11 else float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def first_string(record, *fields):
+    # Exported records are untrusted; a non-string value counts as missing
+    for field in fields:
+        value = record.get(field)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+def parse_json_line(line, default_channel):
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        return None
+    username = first_string(record, 'username', 'user', 'display_name')
+    text = first_string(record, 'message', 'text')
+    if not username or not text:
+        return None
+    channel = (first_string(record, 'channel', 'streamer_name') or default_channel).lstrip('#').lower()
+    return channel, username, text, parse_timestamp(record.get('timestamp'))
+
+def parse_raw_line(line, default_channel):
+    message = parse_irc_line(line)
+    if message is None or message.command != 'PRIVMSG':
+        return None
+    username = message.tags.get('display-name') or message.nick
+    return message.channel or default_channel, username, message.text, parse_timestamp(message.tags.get('tmi-sent-ts'))
+
+def parse(lines, default_channel):
+    for line in lines:
+        if not line:
+            continue
+        try:
+            parsed = parse_json_line(line, default_channel) if line[0] == '{' else parse_raw_line(line, default_channel)
+        except ValueError:
+            parsed = None
+        if parsed:
+            yield parsed
+
+def normalize(messages):
+    for channel, username, text, timestamp in messages:
+        text = normalize_text(text)
+        if text:
+            yield channel, username, text, timestamp
+
+def batched(messages, size):
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+_worker_analyzer = None
+
+def init_worker(backend, threads):
+    global _worker_analyzer
+    os.environ['SENTIMENT_INTRA_OP_THREADS'] = str(threads)
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    from utils.sentiment_analyzer import SentimentAnalyzer
+
+    if backend == 'torch':
+        import torch
+        torch.set_num_threads(threads)
+    _worker_analyzer = SentimentAnalyzer(backend=backend)
+    _worker_analyzer.load()
+
+def analyze_texts(texts):
+    return [(r['sentiment'], r['confidence']) for r in _worker_analyzer.analyze_batch(texts)]
+
+def infer(batches, pool, max_in_flight):
+    # Keep only a few batches in flight so reading never runs far ahead of inference
+    in_flight = deque()
+    for batch in batches:
+        in_flight.append((batch, pool.submit(analyze_texts, [text for _, _, text, _ in batch])))
+        if len(in_flight) >= max_in_flight:
+            batch, future = in_flight.popleft()
+            yield batch, future.result()
+    while in_flight:
+        batch, future = in_flight.popleft()
+        yield batch, future.result()
+
+def aggregate(results, progress_every=5.0):
+    aggregators = {}
+    bounds = {}
+    processed = 0
+    start = last_report = time.perf_counter()
+
+    for batch, sentiments in results:
+        for (channel, username, _, timestamp), (sentiment, confidence) in zip(batch, sentiments):
+            aggregator = aggregators.get(channel)
+            if aggregator is None:
+                aggregator = aggregators[channel] = ChannelAggregator(channel, started_at=timestamp)
+            aggregator.record({'username': username, 'sentiment': sentiment, 'confidence': confidence}, timestamp)
+            if timestamp:
+                first, last = bounds.get(channel, (timestamp, timestamp))
+                bounds[channel] = (min(first, timestamp), max(last, timestamp))
+        processed += len(batch)
+
+        now = time.perf_counter()
+        if now - last_report >= progress_every:
+            print(f"{processed} messages, {processed / (now - start):.1f} msg/s", file=sys.stderr)
+            last_report = now
+
+    elapsed = time.perf_counter() - start
+    return aggregators, bounds, processed, elapsed
+
+def analysis_document(aggregator, bounds):
+    snapshot = aggregator.snapshot()
+    first, last = bounds or (None, None)
+    document = {field: snapshot[field] for field in
+                ['streamer_name', 'total_chats', 'sentiment_count', 'top_positive', 'top_negative', 'top_neutral']}
+    document['duration'] = int(last - first) if bounds else 0
+    document['timeseries'] = aggregator.series(60, now=last) if bounds else None
+    return document
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an archived chat log through sentiment analysis')
+    parser.add_argument('path', help='IRC raw log or JSONL file')
+    parser.add_argument('--channel', help='channel name for lines that do not carry one (default: file name)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--threads-per-worker', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--backend', default=os.getenv('SENTIMENT_BACKEND', 'torch'),
+                        help='torch, onnx or onnx-int8')
+    parser.add_argument('--output', help='write the analysis documents to this JSON file instead of stdout')
+    parser.add_argument('--save-user', help='also store each analysis in history for this user id')
+    args = parser.parse_args()
+
+    default_channel = (args.channel or os.path.splitext(os.path.basename(args.path))[0]).lower()
+    pipeline = batched(normalize(parse(iter_lines(args.path), default_channel)), args.batch_size)
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             initializer=init_worker, initargs=(args.backend, args.threads_per_worker)) as pool:
+        aggregators, bounds, processed, elapsed = aggregate(infer(pipeline, pool, args.workers * 2))
+
+    print(f"Replayed {processed} messages in {elapsed:.1f}s: {processed / elapsed if elapsed else 0:.1f} msg/s "
+          f"({args.workers} workers x {args.threads_per_worker} threads, {args.backend})", file=sys.stderr)
+
+    documents = [analysis_document(a, bounds.get(channel)) for channel, a in aggregators.items()]
+    output = json.dumps(documents, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.save_user:
+        from types import SimpleNamespace
+        from pymongo import MongoClient
+        from models.history import save_analysis
+
+        mongo = SimpleNamespace(db=MongoClient(os.getenv('MONGO_URI')).get_default_database())
+        for document in documents:
+            history_id = save_analysis(mongo, dict(document, user_id=args.save_user))
+            print(f"Saved {document['streamer_name']} as history {history_id}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import tempfile
+import itertools
+import pytest
+
+# Tests import the backend the same way app.py does: utils.*, models.*
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PDF_CACHE_DIR', tempfile.mkdtemp(prefix='test-pdf-cache-'))
+
+from bson.objectid import ObjectId
+
+def _matches(document, query):
+    return all(document.get(field) == value for field, value in query.items())
+
+class FakeResult:
+    def __init__(self, matched=0, modified=0, inserted_id=None):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.inserted_id = inserted_id
+
+# Just enough of a pymongo collection for the summary code paths: equality
+# filters, $set/$inc updates and upserts
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def insert_one(self, document):
+        document.setdefault('_id', ObjectId())
+        self.documents.append(document)
+        return FakeResult(inserted_id=document['_id'])
+
+    def find(self, query=None, projection=None):
+        return [dict(d) for d in self.documents if _matches(d, query or {})]
+
+    def find_one(self, query=None, projection=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def update_one(self, query, update, upsert=False):
+        for document in self.documents:
+            if _matches(document, query):
+                document.update(update.get('$set', {}))
+                for field, amount in update.get('$inc', {}).items():
+                    document[field] = document.get(field, 0) + amount
+                return FakeResult(matched=1, modified=1)
+        if upsert:
+            self.insert_one(dict(query, **update.get('$set', {})))
+        return FakeResult()
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def command(self, name):
+        return {'ok': 1}
+
+class FakeMongo:
+    def __init__(self):
+        self.db = FakeDatabase()
+
+@pytest.fixture
+def mongo():
+    return FakeMongo()
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    # Route request_summary to the local stub model; no network, no latency
+    from utils import gemini_analyzer
+
+    model = gemini_analyzer.StubSummaryModel(latency=0, quota_failures=0)
+    monkeypatch.setattr(gemini_analyzer, 'SUMMARY_LLM', 'stub')
+    monkeypatch.setattr(gemini_analyzer, 'stub_summary_model', model)
+    return model
+
+_counter = itertools.count()
+
+@pytest.fixture
+def analysis():
+    return {
+        'user_id': str(ObjectId()),
+        'streamer_name': f"streamer{next(_counter)}",
+        'total_chats': 10,
+        'sentiment_count': {'positive': 5, 'neutral': 3, 'negative': 2},
+        'top_positive': [{'username': 'alice', 'count': 3}],
+        'top_negative': [{'username': 'bob', 'count': 1}],
+        'top_neutral': [{'username': 'carol', 'count': 2}],
+        'duration': 120
+    }
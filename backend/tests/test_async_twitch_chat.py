@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import pytest
+
+from conftest import wait_until
+from utils.async_twitch_chat import AsyncTwitchChatClient, parse_irc_line
+from utils.fake_irc_server import FakeTwitchIrcServer
+
+def test_parse_privmsg_with_tags_prefix_and_trailing():
+    message = parse_irc_line(
+        "@badge-info=;display-name=Some\\sViewer;emotes=;tmi-sent-ts=1700000000000 "
+        ":someviewer!someviewer@someviewer.tmi.twitch.tv PRIVMSG #SomeChannel :hello there : friends"
+    )
+
+    assert message.command == 'PRIVMSG'
+    assert message.tags['display-name'] == 'Some Viewer'
+    assert message.tags['emotes'] == ''
+    assert message.tags['tmi-sent-ts'] == '1700000000000'
+    assert message.prefix == 'someviewer!someviewer@someviewer.tmi.twitch.tv'
+    assert message.nick == 'someviewer'
+    assert message.channel == 'somechannel'
+    assert message.text == 'hello there : friends'
+
+def test_parse_tag_escapes():
+    message = parse_irc_line("@msg=a\\:b\\\\c\\rd\\ne\\ :tmi.twitch.tv NOTICE #c :x")
+    assert message.tags['msg'] == 'a;b\\c\rd\ne'
+
+def test_parse_without_tags_or_prefix():
+    ping = parse_irc_line("PING :tmi.twitch.tv")
+    assert (ping.tags, ping.prefix, ping.command, ping.params) == ({}, None, 'PING', ['tmi.twitch.tv'])
+    assert ping.channel is None
+
+    welcome = parse_irc_line(":tmi.twitch.tv 001 justinfan123 :Welcome, GLHF!")
+    assert welcome.command == '001'
+    assert welcome.params == ['justinfan123', 'Welcome, GLHF!']
+
+def test_parse_empty_line():
+    assert parse_irc_line('') is None
+    assert parse_irc_line(':tmi.twitch.tv') is None
+
+@pytest.fixture
+def irc_server():
+    # The fake server runs on its own event loop, separate from the client's
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = FakeTwitchIrcServer()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(timeout=5)
+    server.run = lambda coro: asyncio.run_coroutine_threadsafe(coro, loop).result(timeout=5)
+    yield server
+    server.run(server.stop())
+    loop.call_soon_threadsafe(loop.stop)
+
+@pytest.fixture
+def chat_client(irc_server):
+    submitted = []
+    client = AsyncTwitchChatClient('127.0.0.1', irc_server.port,
+                                   submit=lambda *args: submitted.append(args))
+    client.submitted = submitted
+    return client
+
+def test_join_and_privmsg_dispatch(irc_server, chat_client):
+    handler = object()
+    assert chat_client.join('SomeChannel', handler)
+    assert chat_client.is_joined('somechannel')
+    assert wait_until(lambda: 'somechannel' in irc_server.joined_channels())
+
+    irc_server.run(irc_server.broadcast('somechannel', 'viewer1', 'hello chat'))
+    irc_server.run(irc_server.broadcast('otherchannel', 'viewer2', 'not joined'))
+
+    assert wait_until(lambda: chat_client.submitted)
+    assert chat_client.submitted == [('somechannel', 'viewer1', 'hello chat', handler)]
+
+    assert chat_client.part('somechannel')
+    assert not chat_client.is_joined('somechannel')
+    assert wait_until(lambda: 'somechannel' not in irc_server.joined_channels())
+
+def test_over_long_line_reconnects_and_rejoins(irc_server, chat_client):
+    chat_client.join('somechannel', object())
+    assert wait_until(lambda: 'somechannel' in irc_server.joined_channels())
+    first_connection = set(irc_server.clients)
+
+    # Longer than asyncio's 64 KiB readline limit
+    for client in first_connection:
+        client.send('x' * 70000)
+
+    def rejoined():
+        return any(client not in first_connection and 'somechannel' in client.channels
+                   for client in list(irc_server.clients))
+
+    assert wait_until(rejoined, timeout=10)
+    irc_server.run(irc_server.broadcast('somechannel', 'viewer1', 'still here'))
+    assert wait_until(lambda: chat_client.submitted)
+    assert chat_client.submitted[-1][2] == 'still here'
+
+def test_failing_handler_keeps_the_connection(irc_server):
+    calls = []
+
+    def submit(channel, username, text, handler):
+        calls.append(text)
+        if text == 'boom':
+            raise RuntimeError('handler bug')
+
+    client = AsyncTwitchChatClient('127.0.0.1', irc_server.port, submit=submit)
+    client.join('somechannel', object())
+    assert wait_until(lambda: 'somechannel' in irc_server.joined_channels())
+    connection = set(irc_server.clients)
+
+    irc_server.run(irc_server.broadcast('somechannel', 'viewer1', 'boom'))
+    irc_server.run(irc_server.broadcast('somechannel', 'viewer1', 'after'))
+
+    assert wait_until(lambda: calls == ['boom', 'after'])
+    assert set(irc_server.clients) == connection
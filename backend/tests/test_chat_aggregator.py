@@ -0,0 +1,72 @@
+import threading
+from utils.chat_aggregator import AggregatorRegistry
+
+def message(username, sentiment):
+    return {'channel': 'somechannel', 'username': username, 'sentiment': sentiment, 'confidence': 0.9}
+
+def test_session_only_counts_messages_after_the_user_joined():
+    registry = AggregatorRegistry()
+    registry.reset('somechannel')
+    registry.start_session('first-user', 'somechannel')
+    for _ in range(5):
+        registry.record(message('alice', 'positive'))
+
+    # A second user joins the already-connected channel
+    registry.start_session('second-user', 'SomeChannel')
+    registry.record(message('bob', 'negative'))
+    registry.record(message('bob', 'negative'))
+
+    assert registry.snapshot('somechannel')['total_chats'] == 7
+    assert registry.session('first-user', 'somechannel').snapshot()['total_chats'] == 7
+
+    second = registry.session('second-user', 'somechannel').snapshot()
+    assert second['total_chats'] == 2
+    assert second['sentiment_count'] == {'positive': 0, 'neutral': 0, 'negative': 2}
+    assert second['top_positive'] == []
+    assert second['top_negative'] == [{'username': 'bob', 'count': 2}]
+
+def test_ended_and_idle_sessions_are_dropped():
+    registry = AggregatorRegistry(max_idle=60)
+    registry.start_session('first-user', 'somechannel')
+    registry.start_session('second-user', 'somechannel')
+
+    registry.end_session('first-user', 'somechannel')
+    assert registry.session('first-user', 'somechannel') is None
+
+    registry.session('second-user', 'somechannel').updated_at -= 120
+    registry.reset('otherchannel')
+    assert registry.session('second-user', 'somechannel') is None
+
+def test_recording_while_sessions_start_and_end():
+    registry = AggregatorRegistry(max_idle=3600)
+    errors = []
+    stop = threading.Event()
+
+    def churn():
+        # Sessions come and go on another thread while messages are recorded
+        i = 0
+        while not stop.is_set():
+            registry.start_session(f"user{i % 50}", 'somechannel')
+            registry.end_session(f"user{(i + 25) % 50}", 'somechannel')
+            registry.reset('otherchannel')
+            i += 1
+
+    def record():
+        try:
+            for _ in range(5000):
+                registry.record(message('alice', 'positive'))
+        except Exception as e:
+            errors.append(e)
+
+    churner = threading.Thread(target=churn)
+    churner.start()
+    recorders = [threading.Thread(target=record) for _ in range(4)]
+    for thread in recorders:
+        thread.start()
+    for thread in recorders:
+        thread.join()
+    stop.set()
+    churner.join()
+
+    assert errors == []
+    assert registry.snapshot('somechannel')['total_chats'] == 20000
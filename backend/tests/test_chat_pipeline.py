@@ -0,0 +1,78 @@
+import time
+import threading
+from concurrent.futures import Future
+
+from conftest import wait_until
+from utils.chat_pipeline import ChatPipeline
+
+class ManualCollector:
+    # Futures are completed by the test, standing in for a slow model
+    max_batch_size = 4
+
+    def __init__(self):
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def submit(self, text):
+        future = Future()
+        with self.lock:
+            self.futures[text] = future
+        return future
+
+    def finish(self, text, sentiment='positive'):
+        self.futures[text].set_result({'sentiment': sentiment, 'confidence': 0.9, 'text': text})
+
+def test_workers_do_not_wait_on_inference():
+    collector = ManualCollector()
+    pipeline = ChatPipeline(collector, workers=1)
+    delivered = []
+
+    pipeline.submit('somechannel', 'viewer1', 'slow message', delivered.append)
+    assert wait_until(lambda: 'slow message' in collector.futures)
+
+    # The single worker keeps feeding the collector while the first message is unfinished
+    pipeline.submit('otherchannel', 'viewer2', 'fast message', delivered.append)
+    assert wait_until(lambda: 'fast message' in collector.futures)
+    collector.finish('fast message')
+    assert [m['message'] for m in delivered] == ['fast message']
+
+    collector.finish('slow message', 'negative')
+    assert delivered[-1] == {
+        'channel': 'somechannel',
+        'username': 'viewer1',
+        'message': 'slow message',
+        'sentiment': 'negative',
+        'confidence': 0.9
+    }
+    assert pipeline.metrics()['processed'] == 2
+    assert pipeline.metrics()['in_flight'] == 0
+
+def test_in_flight_messages_are_bounded():
+    collector = ManualCollector()
+    pipeline = ChatPipeline(collector, workers=1, max_in_flight=2)
+
+    for i in range(5):
+        pipeline.submit('somechannel', 'viewer', f"message {i}", lambda message: None)
+
+    assert wait_until(lambda: len(collector.futures) == 2)
+    time.sleep(0.05)
+    # The worker waits for a free slot instead of piling work onto the collector
+    assert len(collector.futures) == 2
+
+    collector.finish('message 0')
+    assert wait_until(lambda: len(collector.futures) == 3)
+    assert pipeline.metrics()['in_flight'] == 2
+
+def test_handler_errors_are_counted():
+    collector = ManualCollector()
+    pipeline = ChatPipeline(collector, workers=1)
+
+    def broken_handler(message_data):
+        raise RuntimeError('emit failed')
+
+    pipeline.submit('somechannel', 'viewer', 'hello', broken_handler)
+    assert wait_until(lambda: 'hello' in collector.futures)
+    collector.finish('hello')
+
+    assert pipeline.metrics()['errors'] == 1
+    assert pipeline.metrics()['in_flight'] == 0
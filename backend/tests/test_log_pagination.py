@@ -0,0 +1,116 @@
+import re
+import pytest
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+
+from models.log import get_logs
+
+def _compare(a, b):
+    # $gt/$lt only match values of the same type, as in MongoDB
+    if a is None or b is None or type(a) is not type(b):
+        return None
+    return (a > b) - (a < b)
+
+def _matches(document, query):
+    for field, condition in query.items():
+        if field == '$and':
+            if not all(_matches(document, q) for q in condition):
+                return False
+        elif field == '$or':
+            if not any(_matches(document, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(field)
+            for op, operand in condition.items():
+                if op == '$ne' and value == operand:
+                    return False
+                if op in ('$gt', '$lt'):
+                    order = _compare(value, operand)
+                    if order is None or (order <= 0 if op == '$gt' else order >= 0):
+                        return False
+                if op == '$regex' and not any(isinstance(v, str) and re.search(operand, v) for v in value or []):
+                    return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+def _sort_key(document, field):
+    # null and missing sort before strings and dates
+    value = document.get(field)
+    return (value is not None, value if value is not None else 0)
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda d: _sort_key(d, field), reverse=direction == -1)
+        return self
+
+    def limit(self, count):
+        return self.documents[:count]
+
+class FakeLogs:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.documents if _matches(d, query)])
+
+    def count_documents(self, query, limit=0):
+        return len([d for d in self.documents if _matches(d, query)])
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+class FakeMongo:
+    def __init__(self, documents):
+        self.db = type('FakeDatabase', (), {'logs': FakeLogs(documents)})()
+
+@pytest.fixture
+def logs():
+    start = datetime(2026, 1, 1)
+    names = ['alice', None, 'bob', None, 'alice', 'carol', None, 'bob']
+    documents = []
+    for i, name in enumerate(names):
+        document = {
+            '_id': ObjectId(),
+            'user_id': ObjectId(),
+            'activity': 'Logged In',
+            'search_tokens': ['logged', 'in'],
+            'created_at': start + timedelta(minutes=i)
+        }
+        # Old entries may have no user_name at all rather than None
+        if name is not None or i == 1:
+            document['user_name'] = name
+        documents.append(document)
+    return documents
+
+def all_pages(mongo, **kwargs):
+    seen = []
+    cursor = None
+    while True:
+        page = get_logs(mongo, limit=2, cursor=cursor, **kwargs)
+        seen.extend(log['_id'] for log in page['logs'])
+        cursor = page['nextCursor']
+        if not cursor:
+            return seen
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_paging_by_user_name_crosses_missing_names(logs, direction):
+    mongo = FakeMongo(logs)
+
+    seen = all_pages(mongo, sort_field='user_name', sort_direction=direction)
+
+    expected = FakeLogs(logs).find({}).sort([('user_name', 1 if direction == 'asc' else -1),
+                                            ('_id', 1 if direction == 'asc' else -1)]).limit(len(logs))
+    assert seen == [str(log['_id']) for log in expected]
+    assert len(set(seen)) == len(logs)
+
+def test_paging_with_a_search_filter(logs):
+    mongo = FakeMongo(logs)
+
+    seen = all_pages(mongo, sort_field='user_name', sort_direction='desc', search='logged')
+
+    assert len(set(seen)) == len(logs)
@@ -0,0 +1,140 @@
+import threading
+import socketserver
+import pytest
+from email.message import EmailMessage
+from email.utils import parseaddr
+
+from utils.mail_queue import MailQueue, SmtpConnection
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    # A tiny SMTP server. Recipients listed in `refuse` get the given reply code;
+    # a 4xx code is only returned `transient_failures` times for each recipient.
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, refuse=None, transient_failures=1):
+        super().__init__(('127.0.0.1', 0), SmtpStubHandler)
+        self.refuse = refuse or {}
+        self.transient_failures = transient_failures
+        self.refused = {}
+        self.delivered = []
+        self.lock = threading.Lock()
+
+    def reply_for(self, recipient):
+        code = self.refuse.get(recipient)
+        with self.lock:
+            if code is None:
+                return None
+            if code < 500 and self.refused.get(recipient, 0) >= self.transient_failures:
+                return None
+            self.refused[recipient] = self.refused.get(recipient, 0) + 1
+            return code
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply('220 stub ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 stub')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipient = parseaddr(line.split(':', 1)[1])[1]
+                code = self.server.reply_for(recipient)
+                if code:
+                    self.reply(f'{code} refused')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                with self.server.lock:
+                    self.server.delivered.extend(recipients)
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 OK')
+
+@pytest.fixture
+def smtp_stub(request):
+    server = SmtpStub(**getattr(request, 'param', {}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_queue(server):
+    host, port = server.server_address
+    return MailQueue(lambda: SmtpConnection(host, port, starttls=False), workers=1,
+                     max_retries=3, base_delay=0.01, max_delay=0.02, drain_timeout=5)
+
+def message(to):
+    message = EmailMessage()
+    message['From'] = 'Twitch Insight <noreply@example.invalid>'
+    message['To'] = to
+    message['Subject'] = 'Test'
+    message.set_content('Hello')
+    return message
+
+def test_messages_are_delivered_over_one_connection(smtp_stub):
+    mail = make_queue(smtp_stub)
+
+    for i in range(5):
+        assert mail.send(message(f"user{i}@example.invalid"))
+
+    assert mail.drain()
+    assert sorted(smtp_stub.delivered) == [f"user{i}@example.invalid" for i in range(5)]
+    assert mail.stats()['sent'] == 5
+    assert mail.stats()['connects'] == 1
+
+@pytest.mark.parametrize('smtp_stub', [{'refuse': {'later@example.invalid': 451}, 'transient_failures': 2}], indirect=True)
+def test_transient_refusals_are_retried(smtp_stub):
+    mail = make_queue(smtp_stub)
+    failures = []
+
+    mail.send(message('later@example.invalid'), on_failure=failures.append)
+
+    assert mail.drain()
+    assert smtp_stub.delivered == ['later@example.invalid']
+    assert mail.stats()['retries'] == 2
+    assert failures == []
+
+@pytest.mark.parametrize('smtp_stub', [{'refuse': {'bounce@example.invalid': 550}}], indirect=True)
+def test_permanent_failures_are_reported_and_not_retried(smtp_stub):
+    mail = make_queue(smtp_stub)
+    failures = []
+
+    mail.send(message('bounce@example.invalid'), on_failure=failures.append)
+    mail.send(message('fine@example.invalid'))
+
+    assert mail.drain()
+    assert smtp_stub.delivered == ['fine@example.invalid']
+    assert smtp_stub.refused == {'bounce@example.invalid': 1}
+    assert len(failures) == 1
+    assert mail.stats()['failed'] == 1
+
+@pytest.mark.parametrize('smtp_stub', [{'refuse': {'later@example.invalid': 451}, 'transient_failures': 10}], indirect=True)
+def test_retries_give_up_and_report(smtp_stub):
+    mail = make_queue(smtp_stub)
+    failures = []
+
+    mail.send(message('later@example.invalid'), on_failure=failures.append)
+
+    assert mail.drain()
+    assert smtp_stub.delivered == []
+    assert mail.stats()['retries'] == mail.max_retries
+    assert len(failures) == 1
@@ -0,0 +1,35 @@
+import pytest
+
+# Needs the optional ONNX dependencies and the model weights (downloaded on first run)
+pytest.importorskip('onnxruntime')
+pytest.importorskip('onnx')
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+
+from utils.sentiment_analyzer import SentimentAnalyzer
+
+PARITY_MESSAGES = [
+    "LUL", "KEKW", "this stream is amazing", "worst play I've ever seen",
+    "gg", "what is this song?", "PogChamp that clutch", "so boring today",
+    "!commands", "love you streamer <3", "lag again...", "hello chat",
+    "that was actually insane", "why would you do that", "first time here",
+    "I can't believe how good this is", "this is the worst stream ever",
+    "meh, it's okay I guess", "ResidentSleeper", "POGGERS let's go",
+    "you're trash at this game", "thanks for the raid!", "when is the next stream?",
+]
+
+MIN_AGREEMENT = 0.95
+
+def labels(backend):
+    return [result['sentiment'] for result in SentimentAnalyzer(backend=backend).analyze_batch(PARITY_MESSAGES)]
+
+@pytest.fixture(scope='module')
+def torch_labels():
+    return labels('torch')
+
+@pytest.mark.parametrize('backend', ['onnx', 'onnx-int8'])
+def test_onnx_labels_match_torch(backend, torch_labels):
+    onnx_labels = labels(backend)
+    agreement = sum(a == b for a, b in zip(onnx_labels, torch_labels)) / len(torch_labels)
+    disagreements = [(m, t, o) for m, t, o in zip(PARITY_MESSAGES, torch_labels, onnx_labels) if t != o]
+    assert agreement >= MIN_AGREEMENT, f"{backend} disagrees with torch on {disagreements}"
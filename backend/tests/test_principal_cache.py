@@ -0,0 +1,53 @@
+from utils.principal_cache import PrincipalCache
+
+def add_user(mongo, role='user'):
+    return mongo.db.users.insert_one({'email': 'someone@example.invalid', 'first_name': 'Some',
+                                      'last_name': 'One', 'role': role, 'status': 'active'}).inserted_id
+
+def count_reads(mongo, monkeypatch, during_read=None):
+    reads = []
+    find_one = mongo.db.users.find_one
+
+    def counting_find_one(query, projection=None):
+        user = find_one(query, projection)
+        reads.append(query['_id'])
+        if during_read:
+            during_read()
+        return user
+
+    monkeypatch.setattr(mongo.db.users, 'find_one', counting_find_one)
+    return reads
+
+def test_principal_is_cached_until_invalidated(mongo, monkeypatch):
+    cache = PrincipalCache(ttl=60)
+    user_id = add_user(mongo)
+    reads = count_reads(mongo, monkeypatch)
+
+    assert cache.get(mongo, user_id)['role'] == 'user'
+    assert cache.get(mongo, str(user_id))['role'] == 'user'
+    assert len(reads) == 1
+
+    mongo.db.users.update_one({'_id': user_id}, {'$set': {'role': 'admin'}})
+    cache.invalidate(user_id)
+    assert cache.get(mongo, user_id)['role'] == 'admin'
+    assert len(reads) == 2
+
+def test_invalidate_during_load_is_not_overwritten(mongo, monkeypatch):
+    cache = PrincipalCache(ttl=60)
+    user_id = add_user(mongo, role='admin')
+    changes = []
+
+    def demote_once():
+        # The role changes after the cache read the user but before it stored it
+        if not changes:
+            changes.append('demoted')
+            mongo.db.users.update_one({'_id': user_id}, {'$set': {'role': 'user'}})
+            cache.invalidate(user_id)
+
+    reads = count_reads(mongo, monkeypatch, during_read=demote_once)
+
+    assert cache.get(mongo, user_id)['role'] == 'admin'
+    # The stale read was not cached, so the next lookup sees the change
+    assert cache.get(mongo, user_id)['role'] == 'user'
+    assert cache.get(mongo, user_id)['role'] == 'user'
+    assert len(reads) == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from utils.sentiment_analyzer import SentimentAnalyzer
+
+class FakeBackend:
+    def __init__(self, name='torch', failures=None):
+        self.name = name
+        # Exceptions raised by the next predict calls, in order
+        self.failures = list(failures or [])
+        self.calls = 0
+
+    def predict(self, texts):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return [{'label': 'LABEL_2', 'score': 0.9} for _ in texts]
+
+def test_local_failure_only_affects_its_own_batch():
+    backend = FakeBackend('torch', failures=[RuntimeError('CUDA out of memory')])
+    analyzer = SentimentAnalyzer(backend, breaker_seconds=60)
+
+    assert analyzer.analyze_batch(['first']) == [{'sentiment': 'neutral', 'confidence': 0.0, 'text': 'first'}]
+    assert analyzer.analyze_batch(['second']) == [{'sentiment': 'positive', 'confidence': 0.9, 'text': 'second'}]
+    assert backend.calls == 2
+    assert analyzer.status()['circuit'] == 'closed'
+    assert analyzer.status()['batch_errors'] == 1
+
+@pytest.mark.parametrize('error', [ConnectionError('Inference server connection lost'), TimeoutError('no answer')])
+def test_remote_transport_errors_open_the_breaker(error):
+    backend = FakeBackend('remote', failures=[error])
+    analyzer = SentimentAnalyzer(backend, breaker_seconds=60)
+
+    analyzer.analyze_batch(['first'])
+    assert analyzer.analyze_batch(['second'])[0]['confidence'] == 0.0
+    assert backend.calls == 1
+    assert analyzer.status()['circuit'] == 'open'
+    assert analyzer.status()['breaker_trips'] == 1
+
+def test_remote_model_error_does_not_open_the_breaker():
+    # The server answered, it just failed on this batch
+    backend = FakeBackend('remote', failures=[RuntimeError('bad input')])
+    analyzer = SentimentAnalyzer(backend, breaker_seconds=60)
+
+    analyzer.analyze_batch(['first'])
+    assert analyzer.analyze_batch(['second'])[0]['sentiment'] == 'positive'
+    assert analyzer.status()['breaker_trips'] == 0
@@ -0,0 +1,130 @@
+import pytest
+from bson.objectid import ObjectId
+
+from conftest import wait_until
+from models import history as history_model
+from models.history import save_analysis, get_history_by_id
+from utils import gemini_analyzer
+from utils.gemini_analyzer import QUOTA_EXCEEDED_SUMMARY
+from utils.summary_worker import SummaryWorker
+
+@pytest.fixture
+def worker(monkeypatch):
+    # Short backoff so retries finish within the test
+    worker = SummaryWorker(workers=2, max_retries=3, base_delay=0.01, max_delay=0.05)
+    notifications = []
+    worker.set_notifier(lambda user_id, payload: notifications.append((user_id, payload)))
+    worker.notifications = notifications
+    monkeypatch.setattr(history_model, 'summary_worker', worker)
+    return worker
+
+def summary_status(mongo, history_id):
+    return get_history_by_id(mongo, history_id)['summary_status']
+
+def test_save_stores_pending_then_completes_and_notifies(mongo, stub_llm, worker, analysis):
+    history_id = save_analysis(mongo, dict(analysis))
+
+    # Stored straight away; the summary lands in the background
+    assert get_history_by_id(mongo, history_id) is not None
+    assert wait_until(lambda: summary_status(mongo, history_id) == 'completed')
+
+    # What GET /api/history/<id>/summary polls
+    history = get_history_by_id(mongo, history_id)
+    assert analysis['streamer_name'] in history['summary']
+    assert worker.notifications == [(analysis['user_id'], {
+        'history_id': str(history_id),
+        'summary_status': 'completed',
+        'summary': history['summary']
+    })]
+
+def test_save_is_pending_until_the_worker_finishes(mongo, stub_llm, worker, analysis, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(worker, 'submit', lambda mongo, history: submitted.append(history))
+
+    history_id = save_analysis(mongo, dict(analysis))
+
+    assert summary_status(mongo, history_id) == 'pending'
+    assert get_history_by_id(mongo, history_id)['summary'] is None
+    assert [h['_id'] for h in submitted] == [history_id]
+
+def test_identical_analysis_reuses_cached_summary(mongo, stub_llm, worker, analysis):
+    first = save_analysis(mongo, dict(analysis))
+    assert wait_until(lambda: summary_status(mongo, first) == 'completed')
+
+    second = save_analysis(mongo, dict(analysis))
+    assert summary_status(mongo, second) == 'completed'
+    assert get_history_by_id(mongo, second)['summary'] == get_history_by_id(mongo, first)['summary']
+
+def test_quota_errors_are_retried_with_backoff(mongo, stub_llm, worker, analysis, monkeypatch):
+    stub_llm.quota_failures = 2
+    delays = []
+    retry_delay = worker._retry_delay
+    monkeypatch.setattr(worker, '_retry_delay', lambda attempt: delays.append((attempt, retry_delay(attempt))) or 0.01)
+
+    history_id = save_analysis(mongo, dict(analysis))
+
+    assert wait_until(lambda: summary_status(mongo, history_id) == 'completed')
+    assert worker.stats()['retries'] == 2
+    # Full jitter: each delay is drawn from [0, min(max_delay, base * 2^attempt)]
+    assert [attempt for attempt, _ in delays] == [0, 1]
+    for attempt, delay in delays:
+        assert 0 <= delay <= min(worker.max_delay, worker.base_delay * 2 ** attempt)
+
+def test_sdk_quota_errors_are_detected_and_retried(mongo, worker, analysis, monkeypatch):
+    # The Gemini SDK raises generic errors; "429"/"quota" in the message marks them as quota errors
+    calls = []
+
+    def flaky_gemini(analysis_data):
+        calls.append(analysis_data['history_id'])
+        if len(calls) == 1:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        return "Chat was upbeat."
+
+    monkeypatch.setattr(gemini_analyzer, 'SUMMARY_LLM', 'gemini')
+    monkeypatch.setattr(gemini_analyzer, '_request_gemini_summary', flaky_gemini)
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+
+    history_id = save_analysis(mongo, dict(analysis))
+
+    assert wait_until(lambda: summary_status(mongo, history_id) == 'completed')
+    assert get_history_by_id(mongo, history_id)['summary'] == "Chat was upbeat."
+    assert len(calls) == 2
+
+def test_quota_retries_give_up_after_max_retries(mongo, stub_llm, worker, analysis):
+    stub_llm.quota_failures = worker.max_retries + 1
+
+    history_id = save_analysis(mongo, dict(analysis))
+
+    assert wait_until(lambda: summary_status(mongo, history_id) == 'failed')
+    assert get_history_by_id(mongo, history_id)['summary'] == QUOTA_EXCEEDED_SUMMARY
+    assert worker.stats()['retries'] == worker.max_retries
+    assert worker.notifications[0][1]['summary_status'] == 'failed'
+
+def test_resume_picks_up_pending_summaries_after_restart(mongo, stub_llm, worker, analysis):
+    # Documents left pending by a process that stopped before their summaries landed
+    def stored(**fields):
+        document = dict(analysis, user_id=ObjectId(analysis['user_id']), summary=None, status='active', **fields)
+        return mongo.db.history.insert_one(document).inserted_id
+
+    pending = [stored(summary_status='pending'), stored(summary_status='pending')]
+    done = stored(summary_status='completed')
+    deleted = stored(summary_status='pending')
+    mongo.db.history.update_one({'_id': deleted}, {'$set': {'status': 'deleted'}})
+
+    assert worker.resume(mongo) == 2
+    assert wait_until(lambda: all(summary_status(mongo, h) == 'completed' for h in pending))
+    assert summary_status(mongo, done) == 'completed'
+    assert get_history_by_id(mongo, done)['summary'] is None
+    assert summary_status(mongo, deleted) == 'pending'
+
+def test_finished_summary_is_not_overwritten_by_a_resumed_job(mongo, stub_llm, worker, analysis):
+    history_id = mongo.db.history.insert_one(dict(
+        analysis, user_id=ObjectId(analysis['user_id']), status='active',
+        summary='Written by the first worker', summary_status='completed'
+    )).inserted_id
+
+    worker.submit(mongo, get_history_by_id(mongo, history_id))
+
+    assert wait_until(lambda: worker.stats()['in_flight'] == 0)
+    assert get_history_by_id(mongo, history_id)['summary'] == 'Written by the first worker'
+    assert worker.notifications == []
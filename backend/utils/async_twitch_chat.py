@@ -0,0 +1,308 @@
+import asyncio
+import threading
+import random
+import time
+import os
+from collections import deque
+from .chat_pipeline import chat_pipeline
+
+TWITCH_SERVER = os.getenv('TWITCH_IRC_HOST', 'irc.chat.twitch.tv')
+TWITCH_PORT = int(os.getenv('TWITCH_IRC_PORT', 6667))
+
+TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+
+class IrcMessage:
+    __slots__ = ('tags', 'prefix', 'command', 'params')
+
+    def __init__(self, tags, prefix, command, params):
+        self.tags = tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+
+    @property
+    def nick(self):
+        return self.prefix.split('!', 1)[0] if self.prefix else None
+
+    @property
+    def channel(self):
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:].lower()
+        return None
+
+    @property
+    def text(self):
+        return self.params[-1] if self.params else ''
+
+def unescape_tag_value(value):
+    if '\\' not in value:
+        return value
+    result = []
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == '\\' and i + 1 < len(value):
+            result.append(TAG_ESCAPES.get(value[i + 1], value[i + 1]))
+            i += 2
+        elif char == '\\':
+            i += 1
+        else:
+            result.append(char)
+            i += 1
+    return ''.join(result)
+
+# Parses one IRC line, including the IRCv3 tags requested with twitch.tv/tags
+def parse_irc_line(line):
+    tags = {}
+    prefix = None
+
+    if line.startswith('@'):
+        raw_tags, _, line = line[1:].partition(' ')
+        for item in raw_tags.split(';'):
+            key, _, value = item.partition('=')
+            tags[key] = unescape_tag_value(value)
+
+    if line.startswith(':'):
+        prefix, _, line = line[1:].partition(' ')
+
+    trailing = None
+    if ' :' in line:
+        line, trailing = line.split(' :', 1)
+    elif line.startswith(':'):
+        line, trailing = '', line[1:]
+
+    parts = line.split()
+    if not parts:
+        return None
+    params = parts[1:]
+    if trailing is not None:
+        params.append(trailing)
+    return IrcMessage(tags, prefix, parts[0].upper(), params)
+
+# One anonymous connection on the shared event loop. Parsed lines are exposed
+# as an async generator that the client consumes.
+class AsyncTwitchConnection:
+    def __init__(self, client, index):
+        self.client = client
+        self.index = index
+        self.nickname = f"justinfan{random.randint(1000, 999999)}"
+        self.channels = set()
+        self.pending_joins = deque()
+        self.join_times = deque()
+        self.closing = False
+        self.registered = False
+        self.reader = None
+        self.writer = None
+        self.task = None
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def send(self, line):
+        if not self.connected:
+            return
+        self.writer.write((line + '\r\n').encode('utf-8'))
+        await self.writer.drain()
+
+    async def connect(self):
+        self.registered = False
+        self.reader, self.writer = await asyncio.open_connection(self.client.host, self.client.port)
+        await self.send('CAP REQ :twitch.tv/tags twitch.tv/commands twitch.tv/membership')
+        await self.send('PASS SCHMOOPIIE')
+        await self.send(f'NICK {self.nickname}')
+        self.join_times.clear()
+        for channel in self.channels:
+            self.queue_join(channel)
+
+    def queue_join(self, channel):
+        if channel not in self.pending_joins:
+            self.pending_joins.append(channel)
+
+    async def flush_joins(self):
+        if not self.registered:
+            return
+        now = time.monotonic()
+        while self.join_times and now - self.join_times[0] > self.client.join_window:
+            self.join_times.popleft()
+        while self.pending_joins and len(self.join_times) < self.client.joins_per_window:
+            channel = self.pending_joins.popleft()
+            if channel in self.channels:
+                await self.send(f'JOIN #{channel}')
+                self.join_times.append(now)
+
+    async def messages(self):
+        while True:
+            raw = await self.reader.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if not line:
+                continue
+            message = parse_irc_line(line)
+            if message is None:
+                continue
+            if message.command == 'PING':
+                await self.send(f'PONG :{message.text}')
+                continue
+            yield message
+
+    async def run(self):
+        delay = 1
+        while not self.closing:
+            try:
+                await self.connect()
+                delay = 1
+                async for message in self.messages():
+                    if message.command == 'PRIVMSG':
+                        try:
+                            await self.client.dispatch(message)
+                        except Exception as e:
+                            # A failing handler only loses this message, not the connection
+                            print(f"Error dispatching message on async connection {self.index}: {e}")
+                    elif message.command == '001':
+                        self.registered = True
+                    elif message.command == 'RECONNECT':
+                        break
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                # readline raises ValueError for a line longer than the stream limit
+                print(f"Async connection {self.index} error: {e}")
+            except Exception as e:
+                print(f"Unexpected error on async connection {self.index}, reconnecting: {e!r}")
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+            if not self.closing:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def close(self):
+        self.closing = True
+        await self.send('QUIT :Goodbye!')
+        if self.writer is not None:
+            self.writer.close()
+        if self.task is not None:
+            self.task.cancel()
+
+# asyncio alternative to TwitchConnectionPool: every connection and channel
+# subscription lives on one event loop running in a background thread. It has
+# the same join/part interface so app.py can switch with TWITCH_CHAT_MODE=asyncio.
+class AsyncTwitchChatClient:
+    def __init__(self, host=TWITCH_SERVER, port=TWITCH_PORT, max_channels_per_connection=100,
+                 joins_per_window=20, join_window=10, submit=None):
+        self.host = host
+        self.port = port
+        self.max_channels_per_connection = max_channels_per_connection
+        self.joins_per_window = joins_per_window
+        self.join_window = join_window
+        self.submit = submit or chat_pipeline.submit
+        self.blocking_submit = submit is None and chat_pipeline.policy == 'block'
+
+        self._connections = []
+        self._handlers = {}
+        self._assignments = {}
+        self._next_index = 0
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name='twitch-asyncio')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._join_scheduler())
+        self._loop.run_forever()
+
+    def _call(self, coro):
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _join_scheduler(self):
+        while True:
+            for connection in list(self._connections):
+                try:
+                    await connection.flush_joins()
+                except Exception as e:
+                    print(f"Error joining channels on async connection {connection.index}: {e}")
+            await asyncio.sleep(0.5)
+
+    async def dispatch(self, message):
+        handler = self._handlers.get(message.channel)
+        if handler is None:
+            return
+        args = (message.channel, message.nick, message.text, handler)
+        if self.blocking_submit:
+            # A blocking submit must not stall every other channel on the loop
+            await asyncio.get_running_loop().run_in_executor(None, self.submit, *args)
+        else:
+            self.submit(*args)
+
+    def _acquire_connection(self):
+        available = [c for c in self._connections
+                     if not c.closing and len(c.channels) < self.max_channels_per_connection]
+        if available:
+            return min(available, key=lambda c: len(c.channels))
+
+        connection = AsyncTwitchConnection(self, self._next_index)
+        self._next_index += 1
+        self._connections.append(connection)
+        connection.task = asyncio.get_running_loop().create_task(connection.run())
+        return connection
+
+    async def join_async(self, channel, handler):
+        channel = channel.lower()
+        self._handlers[channel] = handler
+        if channel in self._assignments:
+            return False
+        connection = self._acquire_connection()
+        connection.channels.add(channel)
+        connection.queue_join(channel)
+        self._assignments[channel] = connection
+        return True
+
+    async def part_async(self, channel):
+        channel = channel.lower()
+        self._handlers.pop(channel, None)
+        connection = self._assignments.pop(channel, None)
+        if connection is None:
+            return False
+        connection.channels.discard(channel)
+        await connection.send(f'PART #{channel}')
+        if not connection.channels:
+            self._connections.remove(connection)
+            await connection.close()
+        return True
+
+    def join(self, channel, handler):
+        return self._call(self.join_async(channel, handler))
+
+    def part(self, channel):
+        return self._call(self.part_async(channel))
+
+    def is_joined(self, channel):
+        return channel.lower() in self._assignments
+
+    def channels(self):
+        return list(self._assignments)
+
+    def stats(self):
+        return {
+            'mode': 'asyncio',
+            'connections': len(self._connections),
+            'channels': len(self._assignments),
+            'pending_joins': sum(len(c.pending_joins) for c in self._connections),
+            'channels_per_connection': [len(c.channels) for c in self._connections]
+        }
+
+async_twitch_client = AsyncTwitchChatClient(
+    max_channels_per_connection=int(os.getenv('TWITCH_CHANNELS_PER_CONNECTION', 100)),
+    joins_per_window=int(os.getenv('TWITCH_JOINS_PER_WINDOW', 20))
+)
@@ -0,0 +1,227 @@
+import threading
+import time
+import os
+from array import array
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+# Space-saving top-k sketch: tracks at most `capacity` users. When full, a new
+# user replaces the current minimum and inherits its count as the error bound,
+# so heavy hitters are always kept regardless of how many viewers chat.
+class SpaceSaving:
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, key, amount=1):
+        if key in self.counts:
+            self.counts[key] += amount
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = amount
+            self.errors[key] = 0
+            return
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        self.errors.pop(victim, None)
+        self.counts[key] = floor + amount
+        self.errors[key] = floor
+
+    def top(self, n=5):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [{'username': username, 'count': count} for username, count in ranked]
+
+# Fixed-size ring buffer of sentiment counts per time bucket. Slot i holds the
+# bucket whose number modulo `slots` is i; the stored bucket number tells a live
+# slot from a stale one, so old buckets are overwritten without ever shifting.
+class SentimentTimeSeries:
+    def __init__(self, resolution, slots, started_at=None):
+        self.resolution = resolution
+        self.slots = slots
+        self.first_bucket = int((started_at or time.time()) // resolution)
+        self.buckets = array('q', [-1]) * slots
+        self.counts = {sentiment: array('I', [0]) * slots for sentiment in SENTIMENTS}
+        self.confidence_sum = array('d', [0.0]) * slots
+
+    def record(self, timestamp, sentiment, confidence):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.slots
+        if self.buckets[slot] != bucket:
+            self.buckets[slot] = bucket
+            for counts in self.counts.values():
+                counts[slot] = 0
+            self.confidence_sum[slot] = 0.0
+        self.counts[sentiment][slot] += 1
+        self.confidence_sum[slot] += confidence
+
+    def series(self, since=None, now=None):
+        # Column-oriented window from `since` (inclusive, so the bucket still being
+        # filled is re-sent on the next incremental read) up to the current bucket
+        newest = int((now or time.time()) // self.resolution)
+        oldest = max(self.first_bucket, newest - self.slots + 1)
+        if since is not None:
+            oldest = max(oldest, int(float(since) // self.resolution))
+
+        result = {'resolution': self.resolution, 'start': oldest * self.resolution,
+                  'positive': [], 'neutral': [], 'negative': [], 'confidence': []}
+        for bucket in range(oldest, newest + 1):
+            slot = bucket % self.slots
+            live = self.buckets[slot] == bucket
+            total = 0
+            for sentiment in SENTIMENTS:
+                count = self.counts[sentiment][slot] if live else 0
+                result[sentiment].append(count)
+                total += count
+            result['confidence'].append(round(self.confidence_sum[slot] / total, 4) if total else 0.0)
+        return result
+
+class ChannelAggregator:
+    def __init__(self, channel, top_k_capacity=100, second_slots=300, minute_slots=720, started_at=None):
+        self.channel = channel
+        self.started_at = started_at or time.time()
+        self.updated_at = self.started_at
+        self.total = 0
+        self.counts = {sentiment: 0 for sentiment in SENTIMENTS}
+        self.confidence_sum = {sentiment: 0.0 for sentiment in SENTIMENTS}
+        self.top = {sentiment: SpaceSaving(top_k_capacity) for sentiment in SENTIMENTS}
+        self.timeseries = {
+            1: SentimentTimeSeries(1, second_slots, self.started_at),
+            60: SentimentTimeSeries(60, minute_slots, self.started_at)
+        }
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def record(self, message_data, timestamp=None):
+        sentiment = message_data.get('sentiment', 'neutral')
+        if sentiment not in self.counts:
+            sentiment = 'neutral'
+        confidence = message_data.get('confidence', 0.0)
+        with self._lock:
+            now = timestamp or time.time()
+            self.total += 1
+            self.counts[sentiment] += 1
+            self.confidence_sum[sentiment] += confidence
+            self.top[sentiment].add(message_data['username'])
+            for series in self.timeseries.values():
+                series.record(now, sentiment, confidence)
+            self.updated_at = now
+            self.version += 1
+
+    def snapshot(self, top_n=5):
+        with self._lock:
+            return {
+                'streamer_name': self.channel,
+                'total_chats': self.total,
+                'sentiment_count': dict(self.counts),
+                'average_confidence': {
+                    sentiment: (self.confidence_sum[sentiment] / self.counts[sentiment]) if self.counts[sentiment] else 0.0
+                    for sentiment in SENTIMENTS
+                },
+                'top_positive': self.top['positive'].top(top_n),
+                'top_neutral': self.top['neutral'].top(top_n),
+                'top_negative': self.top['negative'].top(top_n),
+                'started_at': self.started_at,
+                'duration': int(time.time() - self.started_at),
+                'version': self.version
+            }
+
+    def series(self, resolution=1, since=None, now=None):
+        series = self.timeseries.get(resolution)
+        if series is None:
+            raise ValueError(f"resolution must be one of: {', '.join(str(r) for r in self.timeseries)}")
+        with self._lock:
+            return dict(series.series(since, now), streamer_name=self.channel, version=self.version)
+
+# Per-channel aggregators updated by the inference workers. A channel's
+# aggregate is reset when it is (re)joined and kept after it is parted so the
+# session can still be saved; idle aggregates are evicted after max_idle seconds.
+# Each user analysing a channel also gets a session aggregate started when they
+# connect, so a save only covers the messages seen since that user joined even
+# when the shared channel connection was opened earlier by someone else.
+class AggregatorRegistry:
+    def __init__(self, top_k_capacity=100, max_idle=3600, second_slots=300, minute_slots=720):
+        self.top_k_capacity = top_k_capacity
+        self.second_slots = second_slots
+        self.minute_slots = minute_slots
+        self.max_idle = max_idle
+        self._aggregators = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _new_aggregator(self, channel):
+        return ChannelAggregator(channel, self.top_k_capacity, self.second_slots, self.minute_slots)
+
+    def reset(self, channel):
+        channel = channel.lower()
+        with self._lock:
+            self._evict_idle()
+            aggregator = self._new_aggregator(channel)
+            self._aggregators[channel] = aggregator
+            return aggregator
+
+    def start_session(self, session_key, channel):
+        channel = channel.lower()
+        with self._lock:
+            self._evict_idle()
+            aggregator = self._new_aggregator(channel)
+            self._sessions.setdefault(channel, {})[session_key] = aggregator
+            return aggregator
+
+    def session(self, session_key, channel):
+        with self._lock:
+            return self._sessions.get(channel.lower(), {}).get(session_key)
+
+    def end_session(self, session_key, channel):
+        channel = channel.lower()
+        with self._lock:
+            sessions = self._sessions.get(channel, {})
+            sessions.pop(session_key, None)
+            if not sessions:
+                self._sessions.pop(channel, None)
+
+    def get(self, channel):
+        with self._lock:
+            return self._aggregators.get(channel.lower())
+
+    def record(self, message_data):
+        channel = message_data['channel'].lower()
+        # Look up under the lock, which start/end_session and eviction hold while
+        # changing these dicts; the (per-aggregator locked) updates happen outside it
+        with self._lock:
+            aggregator = self._aggregators.get(channel)
+            if aggregator is None:
+                aggregator = self._aggregators[channel] = self._new_aggregator(channel)
+            sessions = list(self._sessions.get(channel, {}).values())
+        aggregator.record(message_data)
+        for session in sessions:
+            session.record(message_data)
+
+    def snapshot(self, channel, top_n=5):
+        aggregator = self.get(channel)
+        return aggregator.snapshot(top_n) if aggregator else None
+
+    def series(self, channel, resolution=1, since=None):
+        aggregator = self.get(channel)
+        return aggregator.series(resolution, since) if aggregator else None
+
+    def channels(self):
+        with self._lock:
+            return list(self._aggregators)
+
+    def _evict_idle(self):
+        cutoff = time.time() - self.max_idle
+        for channel in [c for c, a in self._aggregators.items() if a.updated_at < cutoff]:
+            self._aggregators.pop(channel, None)
+        for channel, sessions in list(self._sessions.items()):
+            for key in [k for k, a in sessions.items() if a.updated_at < cutoff]:
+                sessions.pop(key, None)
+            if not sessions:
+                self._sessions.pop(channel, None)
+
+chat_aggregators = AggregatorRegistry(
+    top_k_capacity=int(os.getenv('CHAT_TOP_K_CAPACITY', 100)),
+    # 5 minutes of per-second buckets and 12 hours of per-minute buckets
+    second_slots=int(os.getenv('CHAT_SERIES_SECONDS', 300)),
+    minute_slots=int(os.getenv('CHAT_SERIES_MINUTES', 720))
+)
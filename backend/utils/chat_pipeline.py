@@ -0,0 +1,141 @@
+import threading
+import random
+import os
+from collections import deque
+from .sentiment_analyzer import batch_collector
+
+BACKPRESSURE_POLICIES = ('drop_oldest', 'sample', 'block')
+
+# Sits between IRC ingestion and sentiment inference. The IRC reactor only
+# enqueues raw messages; workers drain the bounded queue into the batch
+# collector without waiting on inference, and each result is handed to the
+# channel's socket handler from its future's callback. At most max_in_flight
+# messages are with the collector at once, so a slow model still backs up into
+# this queue and its backpressure policy.
+class ChatPipeline:
+    def __init__(self, collector, max_queue_size=5000, workers=4, policy='drop_oldest', sample_rate=0.1,
+                 max_in_flight=None):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'Backpressure policy must be one of: {", ".join(BACKPRESSURE_POLICIES)}')
+
+        self.collector = collector
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.max_in_flight = max_in_flight or collector.max_batch_size * 4
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._threads = []
+
+        self._enqueued = 0
+        self._processed = 0
+        self._dropped = 0
+        self._errors = 0
+        self._pending = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'chat-inference-{i}')
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, channel, username, message, handler):
+        if not self._threads:
+            self.start()
+
+        item = (channel, username, message, handler)
+        with self._lock:
+            if len(self._queue) >= self.max_queue_size:
+                if self.policy == 'block':
+                    while len(self._queue) >= self.max_queue_size:
+                        self._not_full.wait()
+                elif self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self._dropped += 1
+                else:
+                    # sample: only a fraction of the overflow displaces queued messages
+                    if random.random() >= self.sample_rate:
+                        self._dropped += 1
+                        return False
+                    self._queue.popleft()
+                    self._dropped += 1
+
+            self._queue.append(item)
+            self._enqueued += 1
+            self._not_empty.notify()
+        return True
+
+    def _take_batch(self):
+        with self._lock:
+            while not self._queue:
+                self._not_empty.wait()
+            batch = []
+            while self._queue and len(batch) < self.collector.max_batch_size:
+                batch.append(self._queue.popleft())
+            self._not_full.notify_all()
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._take_batch()
+            for item in batch:
+                self._in_flight.acquire()
+                with self._lock:
+                    self._pending += 1
+                # Cached results complete immediately; the rest complete on the collector's thread
+                future = self.collector.submit(item[2])
+                future.add_done_callback(lambda future, item=item: self._deliver(item, future))
+
+    def _deliver(self, item, future):
+        channel, username, message, handler = item
+        try:
+            sentiment_result = future.result()
+            message_data = {
+                'channel': channel,
+                'username': username,
+                'message': message,
+                'sentiment': sentiment_result['sentiment'],
+                'confidence': sentiment_result['confidence']
+            }
+            handler(message_data)
+        except Exception as e:
+            print(f"Error processing chat message: {e}")
+            with self._lock:
+                self._errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._processed += 1
+            self._in_flight.release()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'queue_depth': len(self._queue),
+                'queue_capacity': self.max_queue_size,
+                'in_flight': self._pending,
+                'policy': self.policy,
+                'workers': self.workers,
+                'enqueued': self._enqueued,
+                'processed': self._processed,
+                'dropped': self._dropped,
+                'errors': self._errors
+            }
+
+chat_pipeline = ChatPipeline(
+    batch_collector,
+    max_queue_size=int(os.getenv('CHAT_QUEUE_SIZE', 5000)),
+    workers=int(os.getenv('CHAT_INFERENCE_WORKERS', 4)),
+    policy=os.getenv('CHAT_BACKPRESSURE', 'drop_oldest'),
+    sample_rate=float(os.getenv('CHAT_SAMPLE_RATE', 0.1)),
+    max_in_flight=int(os.getenv('CHAT_MAX_IN_FLIGHT', 0)) or None
+)
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+# Optional raw-message store. Analyzed messages are buffered per channel and
+# written with one unordered insert_many per batch, either when a channel has
+# batch_size messages or flush_ms after its oldest buffered message. At most
+# max_buffered messages are held in memory; past that, new messages are dropped
+# and counted rather than letting a slow database grow the buffers without bound.
+class ChatMessageSink:
+    def __init__(self, batch_size=500, flush_ms=1000, max_buffered=50000,
+                 collection='chat_messages', ttl=7 * 24 * 3600):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.max_buffered = max_buffered
+        self.collection = collection
+        self.ttl = ttl
+
+        self._mongo = None
+        self._buffers = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stats = {'received': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    @property
+    def enabled(self):
+        return self._mongo is not None
+
+    def create_schema(self, mongo):
+        # Time-series collection bucketed by channel; old messages expire after ttl seconds
+        try:
+            mongo.db.create_collection(
+                self.collection,
+                timeseries={'timeField': 'timestamp', 'metaField': 'channel', 'granularity': 'seconds'},
+                expireAfterSeconds=self.ttl
+            )
+        except CollectionInvalid:
+            pass
+        except Exception as e:
+            print(f"Chat message collection creation failed: {str(e)}")
+
+    def start(self, mongo):
+        self.create_schema(mongo)
+        self._mongo = mongo
+        thread = threading.Thread(target=self._run, name='chat-sink')
+        thread.daemon = True
+        thread.start()
+
+    def record(self, message_data):
+        if self._mongo is None:
+            return
+        document = {
+            'timestamp': datetime.now(timezone.utc),
+            'channel': message_data['channel'].lower(),
+            'username': message_data['username'],
+            'message': message_data['message'],
+            'sentiment': message_data['sentiment'],
+            'confidence': message_data['confidence']
+        }
+        with self._lock:
+            self._stats['received'] += 1
+            if self._buffered >= self.max_buffered:
+                self._stats['dropped'] += 1
+                return
+            buffer = self._buffers.get(document['channel'])
+            if buffer is None:
+                buffer = self._buffers[document['channel']] = {'documents': [], 'since': time.monotonic()}
+            buffer['documents'].append(document)
+            self._buffered += 1
+            full = len(buffer['documents']) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _take(self, channel=None, force=False):
+        now = time.monotonic()
+        batches = []
+        with self._lock:
+            channels = [channel] if channel is not None else list(self._buffers)
+            for name in channels:
+                buffer = self._buffers.get(name)
+                if not buffer:
+                    continue
+                documents = buffer['documents']
+                if force or len(documents) >= self.batch_size or now - buffer['since'] >= self.flush_interval:
+                    del self._buffers[name]
+                    self._buffered -= len(documents)
+                    for i in range(0, len(documents), self.batch_size):
+                        batches.append(documents[i:i + self.batch_size])
+        return batches
+
+    def _write(self, batches):
+        collection = self._mongo.db[self.collection]
+        with self._write_lock:
+            for documents in batches:
+                try:
+                    collection.insert_many(documents, ordered=False)
+                    written = len(documents)
+                except BulkWriteError as e:
+                    written = e.details.get('nInserted', 0)
+                    print(f"Chat sink wrote {written}/{len(documents)} messages: {len(e.details.get('writeErrors', []))} errors")
+                except Exception as e:
+                    written = 0
+                    print(f"Chat sink failed to write {len(documents)} messages: {str(e)}")
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['written'] += written
+                    self._stats['failed'] += len(documents) - written
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval / 2)
+            self._wakeup.clear()
+            batches = self._take()
+            if batches:
+                self._write(batches)
+
+    def flush(self, channel=None):
+        # Write everything buffered for a channel (or all channels) now, e.g. when it is disconnected
+        if self._mongo is None:
+            return
+        batches = self._take(channel.lower() if channel else None, force=True)
+        if batches:
+            self._write(batches)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                enabled=self.enabled,
+                buffered=self._buffered,
+                channels=len(self._buffers),
+                max_buffered=self.max_buffered
+            )
+
+chat_sink = ChatMessageSink(
+    batch_size=int(os.getenv('CHAT_SINK_BATCH_SIZE', 500)),
+    flush_ms=int(os.getenv('CHAT_SINK_FLUSH_MS', 1000)),
+    max_buffered=int(os.getenv('CHAT_SINK_MAX_BUFFERED', 50000)),
+    ttl=int(os.getenv('CHAT_SINK_TTL', 7 * 24 * 3600))
+)
@@ -0,0 +1,146 @@
+# Local stand-in for irc.chat.twitch.tv used for tests and load benchmarks.
+# It accepts anonymous logins, acknowledges CAP requests, tracks JOIN/PART and
+# can generate tagged PRIVMSG traffic for every joined channel.
+#
+# Run standalone: python -m utils.fake_irc_server --port 6667 --rate 50
+import argparse
+import asyncio
+import itertools
+import random
+
+FAKE_MESSAGES = [
+    "LUL", "KEKW", "this stream is amazing", "worst play I've ever seen",
+    "gg", "what is this song?", "PogChamp that clutch", "so boring today",
+    "love you streamer <3", "lag again...", "hello chat", "first time here",
+]
+
+class FakeClient:
+    def __init__(self, writer):
+        self.writer = writer
+        self.nickname = None
+        self.channels = set()
+
+    def send(self, line):
+        if not self.writer.is_closing():
+            self.writer.write((line + '\r\n').encode('utf-8'))
+
+class FakeTwitchIrcServer:
+    def __init__(self, host='127.0.0.1', port=0, rate_per_channel=0):
+        self.host = host
+        self.port = port
+        self.rate_per_channel = rate_per_channel
+        self.clients = set()
+        self.sent_messages = 0
+        self._server = None
+        self._generator = None
+        self._ids = itertools.count(1)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.rate_per_channel > 0:
+            self._generator = asyncio.get_running_loop().create_task(self._generate_traffic())
+        return self.port
+
+    async def stop(self):
+        if self._generator is not None:
+            self._generator.cancel()
+        for client in list(self.clients):
+            client.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def joined_channels(self):
+        return set().union(*(client.channels for client in self.clients)) if self.clients else set()
+
+    def privmsg_line(self, channel, username, text):
+        message_id = next(self._ids)
+        tags = (f"@badge-info=;badges=;color=#9147FF;display-name={username};emotes=;"
+                f"id=fake-{message_id};mod=0;room-id=1;subscriber=0;tmi-sent-ts=0;turbo=0;user-type=")
+        return f"{tags} :{username}!{username}@{username}.tmi.twitch.tv PRIVMSG #{channel} :{text}"
+
+    async def broadcast(self, channel, username, text):
+        channel = channel.lower().lstrip('#')
+        line = self.privmsg_line(channel, username, text)
+        for client in list(self.clients):
+            if channel in client.channels:
+                client.send(line)
+                self.sent_messages += 1
+        await asyncio.sleep(0)
+
+    async def _generate_traffic(self):
+        interval = 0.1
+        budget = 0.0
+        while True:
+            budget += self.rate_per_channel * interval
+            per_tick = int(budget)
+            budget -= per_tick
+            for client in list(self.clients):
+                for channel in list(client.channels):
+                    for _ in range(per_tick):
+                        username = f"viewer{random.randint(1, 5000)}"
+                        client.send(self.privmsg_line(channel, username, random.choice(FAKE_MESSAGES)))
+                        self.sent_messages += 1
+                try:
+                    await client.writer.drain()
+                except ConnectionError:
+                    pass
+            await asyncio.sleep(interval)
+
+    async def _handle_client(self, reader, writer):
+        client = FakeClient(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+                command, _, rest = line.partition(' ')
+                command = command.upper()
+
+                if command == 'CAP':
+                    client.send(f":tmi.twitch.tv CAP * ACK :{rest.partition(':')[2]}")
+                elif command == 'NICK':
+                    client.nickname = rest.strip()
+                    client.send(f":tmi.twitch.tv 001 {client.nickname} :Welcome, GLHF!")
+                    client.send(f":tmi.twitch.tv 376 {client.nickname} :>")
+                elif command == 'JOIN':
+                    for channel in rest.split(','):
+                        channel = channel.strip().lstrip('#').lower()
+                        client.channels.add(channel)
+                        client.send(f":{client.nickname}!{client.nickname}@{client.nickname}.tmi.twitch.tv JOIN #{channel}")
+                elif command == 'PART':
+                    for channel in rest.split(','):
+                        client.channels.discard(channel.strip().lstrip('#').lower())
+                elif command == 'PING':
+                    client.send(f":tmi.twitch.tv PONG tmi.twitch.tv {rest}")
+                elif command == 'QUIT':
+                    break
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+async def serve(host, port, rate):
+    server = FakeTwitchIrcServer(host, port, rate_per_channel=rate)
+    await server.start()
+    print(f"Fake Twitch IRC server listening on {host}:{server.port} ({rate} msg/s per channel)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake Twitch IRC server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6667)
+    parser.add_argument('--rate', type=float, default=10, help='messages per second per joined channel')
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.rate))
+
+if __name__ == '__main__':
+    main()
@@ -1,81 +1,159 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 load_dotenv()
 
-def generate_analysis_summary(analysis_data):
-    try:
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            print("Error: Missing GEMINI_API_KEY in environment variables")
-            return "Unable to generate summary: API key not configured"
-
-        print("Configuring Gemini API...")
-        genai.configure(api_key=api_key)
-
-        # Format duration as HH:MM:SS
-        def format_duration(seconds):
-            h = int(seconds) // 3600
-            m = (int(seconds) % 3600) // 60
-            s = int(seconds) % 60
-            return f"{h:02d}:{m:02d}:{s:02d}"
-        duration_val = analysis_data.get('duration', 0)
-        formatted_duration = format_duration(duration_val)
-
-        # Create the analysis content
-        content = f"""
-        Generate a concise summary of the following Twitch chat analysis:
-
-        Channel: {analysis_data['streamer_name']}
-        Total Messages: {analysis_data['total_chats']}
-        Duration: {formatted_duration}
-
-        Sentiment Breakdown:
-        - Positive: {analysis_data['sentiment_count']['positive']}
-        - Neutral: {analysis_data['sentiment_count']['neutral']}
-        - Negative: {analysis_data['sentiment_count']['negative']}
-
-        Top Chatters:
-        - Most Positive: {', '.join([c['username'] for c in analysis_data['top_positive'][:5]])}
-        - Most Neutral: {', '.join([c['username'] for c in analysis_data['top_neutral'][:5]])}
-        - Most Negative: {', '.join([c['username'] for c in analysis_data['top_negative'][:5]])}
-
-        Instructions:
-        1. Calculate and include the percentage distribution of positive, neutral, and negative messages.
-        2. Provide a brief insight or takeaway for the streamer based on this sentiment data.
-        3. Keep the tone informative and the summary short and clear.
-        4. Make an insight of the chat, what the streamer is doing well and what they could improve on.
-        """
-
-        print("Creating Gemini model...")
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        print("Generating content with Gemini API...")
-        response = model.generate_content(content)
-
-        if not response:
-            print("Error: No response from Gemini API")
-            return "Unable to generate summary: No response received"
-
-        # Get the generated text
-        summary = response.text.strip()
-        if not summary:
-            print("Error: Empty summary received")
-            return "Unable to generate summary: Empty response"
-
-        print("Successfully generated summary of length:", len(summary))
-        return summary
+# SUMMARY_LLM=stub answers locally without calling Gemini (development and load tests).
+# SUMMARY_STUB_QUOTA_FAILURES makes the stub fail that many times first to exercise retries.
+SUMMARY_LLM = os.getenv('SUMMARY_LLM', 'gemini')
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+QUOTA_EXCEEDED_SUMMARY = "Unable to generate summary: API quota exceeded. Please try again later or upgrade to a paid plan."
+
+class SummaryQuotaError(Exception):
+    pass
+
+class StubSummaryModel:
+    def __init__(self, latency=None, quota_failures=None):
+        self.latency = float(latency if latency is not None else os.getenv('SUMMARY_STUB_LATENCY', 0.5))
+        self.quota_failures = int(quota_failures if quota_failures is not None else os.getenv('SUMMARY_STUB_QUOTA_FAILURES', 0))
+        self._lock = threading.Lock()
+
+    def generate(self, analysis_data):
+        with self._lock:
+            fail = self.quota_failures > 0
+            if fail:
+                self.quota_failures -= 1
+        time.sleep(self.latency)
+        if fail:
+            raise SummaryQuotaError("429 Resource has been exhausted (e.g. check quota).")
+
+        counts = analysis_data['sentiment_count']
+        total = sum(counts.values()) or 1
+        return (
+            f"{analysis_data['streamer_name']}'s chat was "
+            f"{counts['positive'] / total:.0%} positive, "
+            f"{counts['neutral'] / total:.0%} neutral and "
+            f"{counts['negative'] / total:.0%} negative across "
+            f"{analysis_data['total_chats']} messages."
+        )
+
+stub_summary_model = StubSummaryModel()
 
+def summaries_enabled():
+    return SUMMARY_LLM == 'stub' or bool(os.getenv('GEMINI_API_KEY'))
+
+def is_quota_error(error):
+    error_msg = str(error)
+    return isinstance(error, SummaryQuotaError) or "quota" in error_msg.lower() or "429" in error_msg
+
+# Raises SummaryQuotaError when the API is rate limited so callers can retry later
+def request_summary(analysis_data):
+    if SUMMARY_LLM == 'stub':
+        return stub_summary_model.generate(analysis_data)
+
+    try:
+        return _request_gemini_summary(analysis_data)
+    except SummaryQuotaError:
+        raise
     except Exception as e:
-        print(f"Detailed error in generate_analysis_summary:")
-        print(f"Error type: {type(e)}")
-        print(f"Error message: {str(e)}")
-        
-        error_msg = str(e)
-        if "quota" in error_msg.lower() or "429" in error_msg:
-            return "Unable to generate summary: API quota exceeded. Please try again later or upgrade to a paid plan."
-        
-        print(f"Input data keys: {list(analysis_data.keys())}")
-        return f"Unable to generate summary. Error: {str(e)}"
+        if is_quota_error(e):
+            raise SummaryQuotaError(str(e))
+        raise
+
+# Configures the SDK once and hands out reusable GenerativeModel instances,
+# one per concurrent caller, instead of building a new client for every summary.
+class GeminiClientPool:
+    def __init__(self, model_name=GEMINI_MODEL, size=4):
+        self.model_name = model_name
+        self.size = size
+        self._models = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._genai = None
+
+    def _configure(self):
+        with self._lock:
+            if self._genai is None:
+                api_key = os.getenv('GEMINI_API_KEY')
+                if not api_key:
+                    raise RuntimeError("API key not configured")
+
+                # Imported lazily; the SDK is slow to import and only needed when saving an analysis
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                self._genai = genai
+            return self._genai
+
+    @contextmanager
+    def model(self):
+        genai = self._configure()
+        try:
+            model = self._models.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self._created += 1
+            model = genai.GenerativeModel(self.model_name)
+        try:
+            yield model
+        finally:
+            if self._models.qsize() < self.size:
+                self._models.put(model)
+
+    def stats(self):
+        return {'model': self.model_name, 'created': self._created, 'idle': self._models.qsize(), 'size': self.size}
+
+gemini_clients = GeminiClientPool(size=int(os.getenv('SUMMARY_WORKERS', 4)))
+
+def _request_gemini_summary(analysis_data):
+    with gemini_clients.model() as model:
+        response = model.generate_content(build_summary_prompt(analysis_data))
+
+    if not response:
+        raise RuntimeError("No response received")
+    summary = response.text.strip()
+    if not summary:
+        raise RuntimeError("Empty response")
+    return summary
+
+def build_summary_prompt(analysis_data):
+    # Format duration as HH:MM:SS
+    def format_duration(seconds):
+        h = int(seconds) // 3600
+        m = (int(seconds) % 3600) // 60
+        s = int(seconds) % 60
+        return f"{h:02d}:{m:02d}:{s:02d}"
+    duration_val = analysis_data.get('duration', 0)
+    formatted_duration = format_duration(duration_val)
+
+    # Create the analysis content
+    content = f"""
+    Generate a concise summary of the following Twitch chat analysis:
+
+    Channel: {analysis_data['streamer_name']}
+    Total Messages: {analysis_data['total_chats']}
+    Duration: {formatted_duration}
+
+    Sentiment Breakdown:
+    - Positive: {analysis_data['sentiment_count']['positive']}
+    - Neutral: {analysis_data['sentiment_count']['neutral']}
+    - Negative: {analysis_data['sentiment_count']['negative']}
+
+    Top Chatters:
+    - Most Positive: {', '.join([c['username'] for c in analysis_data['top_positive'][:5]])}
+    - Most Neutral: {', '.join([c['username'] for c in analysis_data['top_neutral'][:5]])}
+    - Most Negative: {', '.join([c['username'] for c in analysis_data['top_negative'][:5]])}
+
+    Instructions:
+    1. Calculate and include the percentage distribution of positive, neutral, and negative messages.
+    2. Provide a brief insight or takeaway for the streamer based on this sentiment data.
+    3. Keep the tone informative and the summary short and clear.
+    4. Make an insight of the chat, what the streamer is doing well and what they could improve on.
+    """
+    return content
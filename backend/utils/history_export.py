@@ -0,0 +1,195 @@
+import os
+import tempfile
+import re
+import csv
+import json
+import shutil
+import zipfile
+import threading
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bson.objectid import ObjectId
+from .pdf_report import render_analysis_pdf
+from .pdf_cache import pdf_cache
+
+EXPORT_FORMATS = ('pdf', 'json', 'csv')
+CSV_FIELDS = ['id', 'streamer_name', 'created_at', 'duration', 'total_chats',
+              'positive', 'neutral', 'negative', 'summary_status', 'file']
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def export_name(history):
+    streamer = re.sub(r'[^\w.-]+', '_', history.get('streamer_name') or 'unknown')
+    created = history['created_at'].strftime('%Y%m%d_%H%M%S') if isinstance(history.get('created_at'), datetime) else 'unknown'
+    return f"{streamer}_{created}_{history['_id']}"
+
+class _ZipOutput:
+    # Write-only sink for ZipFile; the archive is written without seeking and
+    # whatever has been written since the last drain is handed to the response
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+# Streams a ZIP of analyses straight from a Mongo cursor. PDFs come from the
+# PDF cache or are rendered in a process pool and cached; only max_in_flight
+# records are held at once, so memory stays flat however many are exported.
+# The CSV index is spooled to a temp file and written as the last entry.
+class HistoryExporter:
+    def __init__(self, workers=2, max_in_flight=8):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {'exports': 0, 'records': 0, 'failed': 0, 'in_progress': 0, 'pool_restarts': 0}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Workers re-import the __main__ module; app.py keeps its startup work and
+                # background tasks out of them, and the target (pdf_report) never imports app
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset_pool(self, broken):
+        # A worker died; the executor can't recover, so start a fresh one next time
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats['pool_restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, history):
+        pool = self._pool()
+        try:
+            return pool.submit(render_analysis_pdf, history)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            return self._pool().submit(render_analysis_pdf, history)
+
+    def _render(self, history, future):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Give the record one more try; submitting to the broken pool replaces it
+            return self._submit(history).result()
+
+    def _rendered(self, cursor, render_pdf):
+        # Results come back in cursor order with a bounded number of renders queued.
+        # Reports already in the PDF cache are read from disk instead of re-rendered.
+        in_flight = deque()
+        try:
+            for history in cursor:
+                cached = future = None
+                if render_pdf:
+                    cached = pdf_cache.open_cached(history)
+                    if cached is None:
+                        future = self._submit(history)
+                in_flight.append((history, future, cached))
+                if len(in_flight) >= self.max_in_flight:
+                    yield in_flight.popleft()
+            while in_flight:
+                yield in_flight.popleft()
+        finally:
+            # The client went away mid-export; drop renders nobody will read
+            for _, future, cached in in_flight:
+                if future is not None:
+                    future.cancel()
+                if cached is not None:
+                    cached.close()
+
+    def stream(self, cursor, formats=EXPORT_FORMATS):
+        return (chunk for chunk in self._stream(cursor, formats) if chunk)
+
+    def _stream(self, cursor, formats):
+        output = _ZipOutput()
+        index = None
+        writer = None
+        with self._lock:
+            self._stats['exports'] += 1
+            self._stats['in_progress'] += 1
+        try:
+            with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                if 'csv' in formats:
+                    index = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+                    writer = csv.writer(index)
+                    writer.writerow(CSV_FIELDS)
+
+                for history, future, cached in self._rendered(cursor, 'pdf' in formats):
+                    name = export_name(history)
+                    if cached is not None:
+                        # PDFs are already compressed
+                        entry_info = zipfile.ZipInfo(f"pdf/{name}.pdf", datetime.utcnow().timetuple()[:6])
+                        with cached, archive.open(entry_info, 'w') as entry:
+                            shutil.copyfileobj(cached, entry, 64 * 1024)
+                    elif future is not None:
+                        try:
+                            pdf = self._render(history, future)
+                            pdf_cache.put(history, pdf)
+                            archive.writestr(f"pdf/{name}.pdf", pdf, compress_type=zipfile.ZIP_STORED)
+                        except Exception as e:
+                            print(f"Export failed to render {history['_id']}: {e}")
+                            archive.writestr(f"pdf/{name}.error.txt", f"Could not render this report: {e}")
+                            with self._lock:
+                                self._stats['failed'] += 1
+                    if 'json' in formats:
+                        archive.writestr(f"json/{name}.json", json.dumps(history, default=_json_default, indent=2))
+                    if writer is not None:
+                        counts = history.get('sentiment_count', {})
+                        writer.writerow([
+                            str(history['_id']), history.get('streamer_name'),
+                            _json_default(history['created_at']) if history.get('created_at') else '',
+                            history.get('duration', 0), history.get('total_chats', 0),
+                            counts.get('positive', 0), counts.get('neutral', 0), counts.get('negative', 0),
+                            history.get('summary_status', 'completed'), name
+                        ])
+                    with self._lock:
+                        self._stats['records'] += 1
+                    yield output.drain()
+
+                if writer is not None:
+                    index.flush()
+                    index.seek(0)
+                    with archive.open('analyses.csv', 'w') as entry:
+                        while True:
+                            chunk = index.read(64 * 1024)
+                            if not chunk:
+                                break
+                            entry.write(chunk.encode('utf-8'))
+                            yield output.drain()
+            yield output.drain()
+        finally:
+            if index is not None:
+                index.close()
+            with self._lock:
+                self._stats['in_progress'] -= 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+history_exporter = HistoryExporter(
+    workers=int(os.getenv('EXPORT_WORKERS', max(1, (os.cpu_count() or 2) // 2))),
+    max_in_flight=int(os.getenv('EXPORT_MAX_IN_FLIGHT', 8))
+)
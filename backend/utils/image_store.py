@@ -0,0 +1,121 @@
+import os
+import re
+import base64
+import hashlib
+from io import BytesIO
+import gridfs
+
+THUMBNAIL_SIZES = (64, 128, 256)
+# Only raster formats; SVG can carry script and would run on the app's origin
+IMAGE_FORMATS = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+DATA_URL_PATTERN = re.compile(r'^data:image/(?:png|jpeg|jpg|gif|webp);base64,(.*)$', re.DOTALL)
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Content-addressed image store in GridFS. An image is stored once under the
+# sha256 of its bytes, so user documents only keep the hash and the same upload
+# is never stored twice. Thumbnails are rendered on first request and stored
+# next to the original as "<hash>-<size>".
+class ImageStore:
+    def __init__(self, collection='profile_images', max_bytes=5 * 1024 * 1024):
+        self.collection = collection
+        self.max_bytes = max_bytes
+
+    def _fs(self, mongo):
+        return gridfs.GridFS(mongo.db, collection=self.collection)
+
+    def create_schema(self, mongo):
+        try:
+            mongo.db[f'{self.collection}.files'].create_index([('filename', 1)], unique=True)
+        except Exception as e:
+            print(f"Image store index creation failed: {str(e)}")
+
+    def decode_data_url(self, data_url):
+        match = DATA_URL_PATTERN.match(data_url or '')
+        if not match:
+            raise ValueError('Image must be a PNG, JPEG, GIF or WebP data URL')
+        try:
+            data = base64.b64decode(match.group(1), validate=True)
+        except Exception:
+            raise ValueError('Image data is not valid base64')
+        if len(data) > self.max_bytes:
+            raise ValueError(f'Image must be smaller than {self.max_bytes // (1024 * 1024)}MB')
+        return data, self.detect_content_type(data)
+
+    def detect_content_type(self, data):
+        # Trust the decoded bytes, not the type the client declared
+        from PIL import Image
+
+        try:
+            with Image.open(BytesIO(data)) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:
+            raise ValueError('Image data is not a valid image')
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError('Image must be a PNG, JPEG, GIF or WebP')
+        return IMAGE_FORMATS[image_format]
+
+    def put(self, mongo, data_url):
+        data, content_type = self.decode_data_url(data_url)
+        image_hash = hashlib.sha256(data).hexdigest()
+        fs = self._fs(mongo)
+        if not fs.exists({'filename': image_hash}):
+            try:
+                fs.put(data, filename=image_hash, content_type=content_type)
+            except Exception:
+                # Lost a race with an identical upload; the unique index kept one copy
+                if not fs.exists({'filename': image_hash}):
+                    raise
+        return image_hash
+
+    def get(self, mongo, image_hash, size=None):
+        if not HASH_PATTERN.match(image_hash or ''):
+            return None
+        fs = self._fs(mongo)
+        name = f'{image_hash}-{size}' if size else image_hash
+        stored = fs.find_one({'filename': name})
+        if stored is not None:
+            return stored.read(), self._served_type(stored.content_type)
+        if not size:
+            return None
+
+        original = fs.find_one({'filename': image_hash})
+        if original is None:
+            return None
+        data = original.read()
+        thumbnail, content_type = self._thumbnail(data, size)
+        if thumbnail is None:
+            return data, self._served_type(original.content_type)
+        try:
+            fs.put(thumbnail, filename=name, content_type=content_type)
+        except Exception:
+            pass
+        return thumbnail, content_type
+
+    def _served_type(self, content_type):
+        # Files stored before uploads were checked may carry any type; never echo one back
+        return content_type if content_type in IMAGE_FORMATS.values() else 'application/octet-stream'
+
+    def _thumbnail(self, data, size):
+        try:
+            from PIL import Image
+        except ImportError:
+            print("Pillow is not installed; serving profile images without thumbnails")
+            return None, None
+
+        try:
+            image = Image.open(BytesIO(data))
+            image.thumbnail((size, size))
+        except Exception as e:
+            print(f"Could not render a {size}px thumbnail: {str(e)}")
+            return None, None
+        output = BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image.save(output, format='PNG', optimize=True)
+            return output.getvalue(), 'image/png'
+        image.convert('RGB').save(output, format='JPEG', quality=85, optimize=True)
+        return output.getvalue(), 'image/jpeg'
+
+image_store = ImageStore(
+    max_bytes=int(os.getenv('PROFILE_IMAGE_MAX_BYTES', 5 * 1024 * 1024))
+)
@@ -0,0 +1,88 @@
+import os
+import atexit
+import threading
+from collections import deque
+from pymongo.errors import BulkWriteError
+
+# Write-behind buffer for activity logs. Request threads only append; a
+# background thread writes the backlog with insert_many every flush_ms or as
+# soon as batch_size entries are waiting. Whatever is still buffered is written
+# at interpreter exit. If Mongo falls behind, at most max_buffered entries are
+# kept and the oldest are dropped first.
+class LogBuffer:
+    def __init__(self, batch_size=200, flush_ms=1000, max_buffered=10000, collection='logs'):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.max_buffered = max_buffered
+        self.collection = collection
+
+        self._mongo = None
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {'buffered': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def _ensure_started(self, mongo):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._mongo = mongo
+            self._thread = threading.Thread(target=self._run, name='log-writer')
+            self._thread.daemon = True
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def write(self, mongo, entry):
+        self._ensure_started(mongo)
+        with self._lock:
+            if len(self._entries) >= self.max_buffered:
+                self._entries.popleft()
+                self._stats['dropped'] += 1
+            self._entries.append(entry)
+            self._stats['buffered'] += 1
+            full = len(self._entries) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        if self._mongo is None:
+            return
+        # One writer at a time keeps batches in order, including the final flush at exit
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    if not self._entries:
+                        return
+                    count = min(len(self._entries), self.batch_size)
+                    batch = [self._entries.popleft() for _ in range(count)]
+                try:
+                    self._mongo.db[self.collection].insert_many(batch, ordered=False)
+                    written = len(batch)
+                except BulkWriteError as e:
+                    written = e.details.get('nInserted', 0)
+                    print(f"Log buffer wrote {written}/{len(batch)} entries")
+                except Exception as e:
+                    written = 0
+                    print(f"Log buffer failed to write {len(batch)} entries: {str(e)}")
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['written'] += written
+                    self._stats['failed'] += len(batch) - written
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._entries))
+
+log_buffer = LogBuffer(
+    batch_size=int(os.getenv('LOG_BATCH_SIZE', 200)),
+    flush_ms=int(os.getenv('LOG_FLUSH_MS', 1000)),
+    max_buffered=int(os.getenv('LOG_MAX_BUFFERED', 10000))
+)
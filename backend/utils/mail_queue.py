@@ -0,0 +1,236 @@
+import os
+import time
+import queue
+import random
+import atexit
+import smtplib
+import threading
+
+def is_transient(error):
+    # Transient per RFC 5321: 4xx replies, dropped connections and network errors
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # SMTPException derives from OSError, so protocol errors are ruled out first
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+# Refusals of a single message; smtplib resets the session, so it stays usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+class SmtpConnection:
+    # One persistent SMTP session. Reconnects (and re-runs STARTTLS and login)
+    # whenever the server has dropped it, and closes it after idle_timeout so
+    # the server never sees a long-idle session.
+    def __init__(self, host, port, username=None, password=None, starttls=True, timeout=30, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self.connects += 1
+
+    def _alive(self):
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used < self.idle_timeout:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, message):
+        if not self._alive():
+            self.close()
+            self._connect()
+        try:
+            self._server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle session between our check and the send; one fresh attempt
+            self.close()
+            self._connect()
+            self._server.send_message(message)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+# Background mail delivery. Request threads only enqueue; each worker owns one
+# persistent SMTP connection and sends up to batch_size queued messages per
+# wake-up over it. Transient failures are retried with full-jitter backoff on a
+# timer; permanent (5xx) failures, and transient ones that run out of retries,
+# are dropped, counted and reported to the message's on_failure callback.
+# send() returning True therefore only means "accepted", not "delivered".
+# Messages still queued at interpreter exit get up to drain_timeout seconds to go out.
+class MailQueue:
+    def __init__(self, connection_factory, workers=2, batch_size=20, max_retries=5,
+                 base_delay=2.0, max_delay=120.0, max_queued=10000, drain_timeout=5.0):
+        self.connection_factory = connection_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.drain_timeout = drain_timeout
+
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._connections = []
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+        self._stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'rejected': 0, 'batches': 0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                connection = self.connection_factory()
+                thread = threading.Thread(target=self._run, args=(connection,), name=f'mail-{index}')
+                thread.daemon = True
+                self._connections.append(connection)
+                self._threads.append(thread)
+                thread.start()
+        atexit.register(self.drain)
+
+    def send(self, message, on_failure=None):
+        self._ensure_started()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((message, 0, on_failure))
+        except queue.Full:
+            self._done(rejected=True)
+            print(f"Mail queue is full, dropping message to {message['To']}")
+            return False
+        with self._lock:
+            self._stats['queued'] += 1
+        return True
+
+    def _retry_delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _run(self, connection):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=connection.idle_timeout)]
+            except queue.Empty:
+                connection.close_if_idle()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                self._stats['batches'] += 1
+            for message, attempt, on_failure in batch:
+                self._deliver(connection, message, attempt, on_failure)
+
+    def _deliver(self, connection, message, attempt, on_failure=None):
+        try:
+            connection.send(message)
+        except Exception as e:
+            if not isinstance(e, MESSAGE_ERRORS):
+                # Don't reuse a session left in an unknown state
+                connection.close()
+            if is_transient(e) and attempt < self.max_retries:
+                delay = self._retry_delay(attempt)
+                print(f"Sending mail to {message['To']} failed, retrying in {delay:.1f}s: {e}")
+                with self._lock:
+                    self._stats['retries'] += 1
+                timer = threading.Timer(delay, self._queue.put, args=((message, attempt + 1, on_failure),))
+                timer.daemon = True
+                timer.start()
+                return
+            print(f"Error sending mail to {message['To']}: {e}")
+            if on_failure is not None:
+                try:
+                    on_failure(e)
+                except Exception as callback_error:
+                    print(f"Mail failure callback for {message['To']} failed: {callback_error}")
+            self._done(failed=True)
+            return
+        self._done()
+
+    def _done(self, failed=False, rejected=False):
+        with self._lock:
+            self._pending -= 1
+            if rejected:
+                self._stats['rejected'] += 1
+            elif failed:
+                self._stats['failed'] += 1
+            else:
+                self._stats['sent'] += 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        # Wait until every accepted message has been sent or given up on
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        with self._lock:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=self._pending,
+                        connects=sum(c.connects for c in self._connections))
+
+def smtp_connection():
+    return SmtpConnection(
+        os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+        int(os.getenv('SMTP_PORT', 587)),
+        username=os.getenv('EMAIL_SENDER'),
+        password=os.getenv('EMAIL_PASSWORD'),
+        starttls=os.getenv('SMTP_STARTTLS', 'true').lower() == 'true',
+        timeout=float(os.getenv('SMTP_TIMEOUT', 30)),
+        idle_timeout=float(os.getenv('SMTP_IDLE_SECONDS', 60))
+    )
+
+mail_queue = MailQueue(
+    smtp_connection,
+    workers=int(os.getenv('MAIL_CONNECTIONS', 2)),
+    batch_size=int(os.getenv('MAIL_BATCH_SIZE', 20)),
+    max_retries=int(os.getenv('MAIL_MAX_RETRIES', 5)),
+    base_delay=float(os.getenv('MAIL_RETRY_BASE_SECONDS', 2)),
+    max_delay=float(os.getenv('MAIL_RETRY_MAX_SECONDS', 120)),
+    max_queued=int(os.getenv('MAIL_MAX_QUEUED', 10000)),
+    drain_timeout=float(os.getenv('MAIL_DRAIN_SECONDS', 5))
+)
@@ -0,0 +1,141 @@
+import os
+import glob
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Disk cache of rendered analysis PDFs. A file is keyed on the history id and
+# its updated_at, so any write to the record (summary finished, deleted) makes
+# the old file unreachable; invalidate() also removes it straight away. Files
+# are served straight from disk and the least recently used ones are removed
+# once the cache grows past max_bytes.
+class PdfCache:
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._render_locks = {}
+        self._stats = {'hits': 0, 'renders': 0, 'evicted': 0}
+
+    def _load(self):
+        # Pick up files left by earlier runs, oldest first, so they count against the budget
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        existing = []
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            existing.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(existing):
+            self._files[path] = size
+            self._total += size
+        self._loaded = True
+
+    def path_for(self, history):
+        version = int(history['updated_at'].timestamp() * 1000) if history.get('updated_at') else 0
+        return os.path.join(self.directory, f"{history['_id']}-{version}.pdf")
+
+    def open_cached(self, history):
+        # An open handle stays readable even if the file is evicted meanwhile
+        path = self.path_for(history)
+        with self._lock:
+            self._load()
+            if path not in self._files:
+                return None
+            try:
+                handle = open(path, 'rb')
+            except OSError:
+                self._total -= self._files.pop(path, 0)
+                return None
+            self._files.move_to_end(path)
+            self._stats['hits'] += 1
+            return handle
+
+    def get(self, history, render):
+        path = self.path_for(history)
+        with self._lock:
+            self._load()
+            if path in self._files and os.path.exists(path):
+                self._files.move_to_end(path)
+                self._stats['hits'] += 1
+                return path
+            render_lock = self._render_locks.setdefault(path, threading.Lock())
+
+        # Concurrent downloads of the same report render it once
+        with render_lock:
+            if not os.path.exists(path):
+                self._write(path, lambda f: render(history, f))
+                with self._lock:
+                    self._stats['renders'] += 1
+
+        with self._lock:
+            self._render_locks.pop(path, None)
+            self._register(path)
+        return path
+
+    def put(self, history, data):
+        # Store a report rendered elsewhere, e.g. by the export pool
+        path = self.path_for(history)
+        with self._lock:
+            self._load()
+        self._write(path, lambda f: f.write(data))
+        with self._lock:
+            self._stats['renders'] += 1
+            self._register(path)
+        return path
+
+    def _write(self, path, write):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _register(self, path):
+        if path not in self._files:
+            size = os.path.getsize(path)
+            self._files[path] = size
+            self._total += size
+        self._files.move_to_end(path)
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        while self._total > self.max_bytes and len(self._files) > 1:
+            path, size = next(iter(self._files.items()))
+            if path == keep:
+                self._files.move_to_end(path)
+                continue
+            self._remove(path)
+            self._stats['evicted'] += 1
+
+    def _remove(self, path):
+        self._total -= self._files.pop(path, 0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate(self, history_id):
+        prefix = os.path.join(self.directory, f"{history_id}-")
+        with self._lock:
+            self._load()
+            for path in [p for p in self._files if p.startswith(prefix)]:
+                self._remove(path)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, files=len(self._files), bytes=self._total)
+
+pdf_cache = PdfCache(
+    os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'chat-analysis-pdfs')),
+    max_bytes=int(os.getenv('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+)
@@ -0,0 +1,135 @@
+from datetime import datetime
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+# Styles are immutable once built, so they are created once per process and
+# shared by every report instead of being rebuilt on each request.
+_styles = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_styles['Heading1'],
+    fontSize=16,
+    spaceAfter=30,
+    alignment=1,  # Center alignment
+    fontName='Helvetica-Bold'
+)
+
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    spaceBefore=20,
+    spaceAfter=10,
+    fontName='Helvetica-Bold'
+)
+
+NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=_styles['Normal'],
+    fontSize=12,
+    spaceBefore=6,
+    spaceAfter=6,
+    fontName='Helvetica'
+)
+
+_TABLE_COMMANDS = [
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BOX', (0, 0), (-1, -1), 2, colors.black),
+    ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.white),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+]
+
+SENTIMENT_TABLE_STYLE = TableStyle(_TABLE_COMMANDS + [('ALIGN', (1, 0), (-1, -1), 'RIGHT')])
+CONTRIBUTOR_TABLE_STYLE = TableStyle(_TABLE_COMMANDS + [('ALIGN', (1, 0), (1, -1), 'RIGHT')])
+
+def format_duration(seconds):
+    h = int(seconds) // 3600
+    m = (int(seconds) % 3600) // 60
+    s = int(seconds) % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+def format_date(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f')
+    return value.strftime('%B %d, %Y %H:%M')
+
+def contributor_table(contributors):
+    data = [['Username', 'Message Count']]
+    for contributor in contributors:
+        data.append([contributor['username'], str(contributor['count'])])
+    table = Table(data, colWidths=[300, 100])
+    table.setStyle(CONTRIBUTOR_TABLE_STYLE)
+    return table
+
+def report_elements(history):
+    elements = []
+
+    # Title and date
+    elements.append(Paragraph("Chat Analysis Report", TITLE_STYLE))
+    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y %H:%M')}", NORMAL_STYLE))
+    elements.append(Spacer(1, 20))
+
+    # Streamer info
+    elements.append(Paragraph(f"Channel: {history['streamer_name']}", HEADING_STYLE))
+    elements.append(Paragraph(f"Analysis Date: {format_date(history['created_at'])}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Duration: {format_duration(history.get('duration', 0))}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Total Messages Analyzed: {history['total_chats']}", NORMAL_STYLE))
+    elements.append(Spacer(1, 20))
+
+    # Prevent division by zero
+    total_messages = history['total_chats'] or 1
+    counts = history['sentiment_count']
+
+    elements.append(Paragraph("Sentiment Analysis Summary", HEADING_STYLE))
+    sentiment_data = [['Category', 'Count', 'Percentage']]
+    for label, key in [('Positive', 'positive'), ('Neutral', 'neutral'), ('Negative', 'negative')]:
+        sentiment_data.append([label, str(counts[key]), f"{(counts[key] / total_messages * 100):.1f}%"])
+    sentiment_table = Table(sentiment_data, colWidths=[200, 100, 100])
+    sentiment_table.setStyle(SENTIMENT_TABLE_STYLE)
+    elements.append(sentiment_table)
+    elements.append(Spacer(1, 20))
+
+    # AI summary
+    elements.append(Paragraph("Analysis Summary", HEADING_STYLE))
+    elements.append(Paragraph(history.get('summary') or 'Summary is still being generated', NORMAL_STYLE))
+    elements.append(Spacer(1, 20))
+
+    # Top contributors
+    elements.append(Paragraph("Top Contributors Analysis", HEADING_STYLE))
+    for title, field in [("Most Positive Contributors", 'top_positive'),
+                         ("Most Neutral Contributors", 'top_neutral'),
+                         ("Most Negative Contributors", 'top_negative')]:
+        if field != 'top_positive':
+            elements.append(Spacer(1, 10))
+        elements.append(Paragraph(title, NORMAL_STYLE))
+        elements.append(contributor_table(history[field]))
+    return elements
+
+def render_analysis_pdf(history, output=None):
+    # Writes into output when given (a file or buffer), otherwise returns the PDF bytes
+    buffer = output if output is not None else BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+    doc.build(report_elements(history))
+    if output is None:
+        return buffer.getvalue()
+    return None
@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+import itertools
+from collections import OrderedDict
+from bson.objectid import ObjectId
+
+PRINCIPAL_FIELDS = ['email', 'first_name', 'last_name', 'role', 'status', 'profile_image']
+
+# Small per-process TTL cache of the user fields routes need for role checks and
+# for echoing the signed-in user back. Writes to a user invalidate its entry in
+# this process; other processes see the change within ttl seconds.
+# ttl=0 disables caching.
+class PrincipalCache:
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        # Version of the load in flight per user; invalidate() drops it so a
+        # load that read the user before the change doesn't cache it afterwards
+        self._loading = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, mongo, user_id):
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self._loading[key] = next(self._versions)
+
+        try:
+            user = mongo.db.users.find_one({'_id': ObjectId(key)}, {field: 1 for field in PRINCIPAL_FIELDS})
+        except Exception:
+            user = None
+
+        with self._lock:
+            if self._loading.get(key) != version:
+                # Invalidated (or superseded by a newer load) while reading
+                return user
+            del self._loading[key]
+            if user is not None and self.ttl > 0:
+                self._entries[key] = (now + self.ttl, user)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+            self._loading.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+principal_cache = PrincipalCache(
+    ttl=float(os.getenv('PRINCIPAL_CACHE_TTL', 30)),
+    max_size=int(os.getenv('PRINCIPAL_CACHE_SIZE', 10000))
+)
@@ -1,44 +1,299 @@
-from transformers import pipeline
-import torch
-import warnings
-from transformers import logging
+import threading
+import queue
+import time
+import os
+from collections import OrderedDict
+from concurrent.futures import Future
+from .sentiment_backends import load_backend, TRANSPORT_ERRORS
 
-logging.set_verbosity_error()
-warnings.filterwarnings('ignore', message='Some weights of the model checkpoint')
+SENTIMENT_MAP = {
+    'LABEL_0': 'negative',
+    'LABEL_1': 'neutral',
+    'LABEL_2': 'positive'
+}
 
+# The model is loaded on first use (or by warm_up) so importing this module
+# stays cheap and the web tier can serve requests while inference warms up.
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, backend=None, fallback_backend=None, breaker_seconds=None):
 
-        self.analyzer = pipeline(
-            "sentiment-analysis",
-            model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-            device=0 if torch.cuda.is_available() else -1 
-        )
+        # SENTIMENT_BACKEND selects torch (default), onnx, onnx-int8 or remote
+        self.backend_name = backend if isinstance(backend, str) else os.getenv('SENTIMENT_BACKEND', 'torch')
+        self._backend = None
+        # Optional in-process backend used while the primary one is failing (e.g. a remote outage)
+        self.fallback_name = fallback_backend or os.getenv('SENTIMENT_FALLBACK_BACKEND') or None
+        self._fallback = None
+        # After the remote backend fails to answer it is skipped for breaker_seconds, then tried again
+        self.breaker_seconds = float(breaker_seconds if breaker_seconds is not None else os.getenv('SENTIMENT_BREAKER_SECONDS', 15))
+        self._breaker_open_until = 0.0
+        self._breaker_trips = 0
+        self._batch_errors = 0
+        self._state = 'not_loaded'
+        self._error = None
+        self._load_seconds = None
+        self._load_lock = threading.Lock()
 
-    def analyze_text(self, text):
+        # An already constructed backend instance can be passed in directly
+        if backend is not None and not isinstance(backend, str):
+            self.backend_name = backend.name
+            self._backend = backend
+            self._state = 'ready'
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self.load()
+        return self._backend
+
+    def load(self):
+        with self._load_lock:
+            if self._backend is not None:
+                return self._backend
+            self._state = 'loading'
+            start = time.perf_counter()
+            try:
+                self._backend = load_backend(self.backend_name)
+            except Exception as e:
+                self._state = 'error'
+                self._error = str(e)
+                raise
+            self._load_seconds = time.perf_counter() - start
+            self._state = 'ready'
+            self._error = None
+            print(f"Sentiment model ready ({self.backend_name}) in {self._load_seconds:.1f}s")
+            return self._backend
+
+    def warm_up(self, background=True):
+        def run():
+            try:
+                self.load()
+                self.analyze_batch(["warm up"])
+            except Exception as e:
+                print(f"Sentiment model warm-up failed: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name='sentiment-warmup')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    @property
+    def is_ready(self):
+        return self._state == 'ready'
+
+    def status(self):
+        return {
+            'state': self._state,
+            'backend': self.backend_name,
+            'load_seconds': self._load_seconds,
+            'error': self._error,
+            'fallback': self.fallback_name,
+            'circuit': 'open' if time.monotonic() < self._breaker_open_until else 'closed',
+            'breaker_trips': self._breaker_trips,
+            'batch_errors': self._batch_errors
+        }
+
+    def _format_result(self, text, result):
+        label = result['label']
+        return {
+            'sentiment': SENTIMENT_MAP.get(label, label),
+            'confidence': result['score'],
+            'text': text
+        }
+
+    def _fallback_result(self, text):
+        return {
+            'sentiment': 'neutral',
+            'confidence': 0.0,
+            'text': text
+        }
+
+    def _fallback_backend(self):
+        if self.fallback_name is None:
+            return None
+        with self._load_lock:
+            if self._fallback is None:
+                self._fallback = load_backend(self.fallback_name)
+                print(f"Sentiment fallback backend ready ({self.fallback_name})")
+            return self._fallback
+
+    def _predict_fallback(self, texts):
         try:
-            
-            result = self.analyzer(text)[0]
-            label = result['label']
-            score = result['score']
-
-            sentiment_map = {
-                'LABEL_0': 'negative',
-                'LABEL_1': 'neutral',
-                'LABEL_2': 'positive'
-            }
+            backend = self._fallback_backend()
+            if backend is not None:
+                results = backend.predict(texts)
+                return [self._format_result(text, result) for text, result in zip(texts, results)]
+        except Exception as e:
+            print(f"Error analyzing sentiment with fallback backend: {e}")
+        return [self._fallback_result(text) for text in texts]
 
-            return {
-                'sentiment': sentiment_map.get(label, label),
-                'confidence': score,
-                'text': text
-            }
+    def analyze_text(self, text):
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        # While the breaker is open, don't wait on a backend that just failed
+        if time.monotonic() < self._breaker_open_until:
+            return self._predict_fallback(texts)
+        try:
+            # One padded forward pass for the whole batch
+            results = self.backend.predict(texts)
+            return [self._format_result(text, result) for text, result in zip(texts, results)]
         except Exception as e:
-            print(f"Error analyzing sentiment: {e}")
+            self._batch_errors += 1
+            if self._trips_breaker(e):
+                print(f"Error analyzing sentiment batch, skipping {self.backend_name} for {self.breaker_seconds:g}s: {e}")
+                self._breaker_open_until = time.monotonic() + self.breaker_seconds
+                self._breaker_trips += 1
+            else:
+                print(f"Error analyzing sentiment batch: {e}")
+            return self._predict_fallback(texts)
+
+    def _trips_breaker(self, error):
+        # Only an unreachable or slow inference server is worth routing around;
+        # a local backend failure is specific to the batch it happened in
+        return self.backend_name == 'remote' and isinstance(error, TRANSPORT_ERRORS)
+
+def normalize_text(text):
+    # Collapse whitespace only; the model is case-sensitive so casing is kept
+    return ' '.join(text.split())
+
+# Bounded LRU cache of sentiment results keyed on normalized message text,
+# shared by every channel. Entries older than ttl seconds are treated as misses.
+class SentimentCache:
+    def __init__(self, max_size=50000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
             return {
-                'sentiment': 'neutral',
-                'confidence': 0.0,
-                'text': text
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
             }
 
+# Gathers messages from every chat bot into micro-batches. A batch is flushed
+# once it holds max_batch_size messages or its oldest message has waited max_wait_ms.
+class BatchCollector:
+    def __init__(self, analyzer, max_batch_size=32, max_wait_ms=20, cache=None, concurrency=1):
+        self.analyzer = analyzer
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # More than one batch in flight only helps when inference runs out of process
+        self.concurrency = concurrency
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if not self._threads:
+                for i in range(self.concurrency):
+                    thread = threading.Thread(target=self._run, name=f'sentiment-batcher-{i}')
+                    thread.daemon = True
+                    thread.start()
+                    self._threads.append(thread)
+
+    def submit(self, text):
+        future = Future()
+        if self.cache is not None:
+            cached = self.cache.get(normalize_text(text))
+            if cached is not None:
+                # Repeated messages and emotes skip the model entirely
+                future.set_result(dict(cached, text=text))
+                return future
+        self._ensure_started()
+        self._queue.put((text, future))
+        return future
+
+    def analyze(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Duplicates inside one batch share a single inference
+            keys = [normalize_text(text) for text, _ in batch]
+            unique = list(dict.fromkeys(keys))
+            try:
+                results = dict(zip(unique, self.analyzer.analyze_batch(unique)))
+            except Exception as e:
+                print(f"Error in sentiment batch worker: {e}")
+                results = {key: self.analyzer._fallback_result(key) for key in unique}
+            if self.cache is not None:
+                for key, result in results.items():
+                    if result['confidence'] > 0.0:
+                        self.cache.put(key, result)
+            for (text, future), key in zip(batch, keys):
+                future.set_result(dict(results[key], text=text))
+
 sentiment_analyzer = SentimentAnalyzer()
+sentiment_cache = SentimentCache(
+    max_size=int(os.getenv('SENTIMENT_CACHE_SIZE', 50000)),
+    ttl=float(os.getenv('SENTIMENT_CACHE_TTL', 3600))
+)
+batch_collector = BatchCollector(
+    sentiment_analyzer,
+    cache=sentiment_cache,
+    max_batch_size=int(os.getenv('SENTIMENT_BATCH_SIZE', 32)),
+    max_wait_ms=float(os.getenv('SENTIMENT_BATCH_WAIT_MS', 20)),
+    concurrency=int(os.getenv('SENTIMENT_BATCH_CONCURRENCY', 1))
+)
@@ -0,0 +1,213 @@
+import os
+import warnings
+import threading
+import itertools
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+ONNX_DIR = os.getenv('SENTIMENT_ONNX_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'onnx_models'))
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'remote')
+INFERENCE_SERVER_ADDRESS = os.getenv('INFERENCE_SERVER_ADDRESS', '127.0.0.1:6001')
+# Raised by RemoteBackend when the inference server is unreachable, drops the
+# connection or does not answer in time (ConnectionError and TimeoutError are OSErrors)
+TRANSPORT_ERRORS = (OSError, EOFError)
+
+def inference_authkey():
+    # multiprocessing.connection unpickles what it receives, so the key is what
+    # stands between the listener and arbitrary code; there is no default
+    key = os.getenv('INFERENCE_AUTHKEY')
+    if not key:
+        raise RuntimeError('INFERENCE_AUTHKEY must be set to use the inference server '
+                           '(e.g. python -c "import secrets; print(secrets.token_hex(32))")')
+    return key.encode('utf-8')
+
+def is_local_address(address):
+    # Unix socket paths and loopback TCP addresses
+    return not isinstance(address, tuple) or address[0] in ('127.0.0.1', 'localhost', '::1')
+
+def _quiet_transformers():
+    from transformers import logging
+    logging.set_verbosity_error()
+    warnings.filterwarnings('ignore', message='Some weights of the model checkpoint')
+
+# fp32 PyTorch through the transformers pipeline (the original behaviour)
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model_name=MODEL_NAME):
+        _quiet_transformers()
+        from transformers import pipeline
+        import torch
+
+        self.pipeline = pipeline(
+            "sentiment-analysis",
+            model=model_name,
+            device=0 if torch.cuda.is_available() else -1
+        )
+
+    def predict(self, texts):
+        return self.pipeline(texts, batch_size=len(texts), truncation=True)
+
+def export_onnx(model_name=MODEL_NAME, output_dir=ONNX_DIR, quantize=False):
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+    int8_path = os.path.join(output_dir, 'model.int8.onnx')
+
+    if not os.path.exists(fp32_path):
+        _quiet_transformers()
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        print(f"Exporting {model_name} to ONNX at {fp32_path}...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        sample = tokenizer(["export sample"], return_tensors='pt')
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample['input_ids'], sample['attention_mask']),
+                fp32_path,
+                input_names=['input_ids', 'attention_mask'],
+                output_names=['logits'],
+                dynamic_axes={
+                    'input_ids': {0: 'batch', 1: 'sequence'},
+                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                    'logits': {0: 'batch'}
+                },
+                opset_version=14
+            )
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        print(f"Quantizing ONNX model to int8 at {int8_path}...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+# ONNX Runtime on CPU, optionally with dynamically quantized int8 weights.
+# Labels come from the same model config as the pipeline, so the mapping is unchanged.
+class OnnxBackend:
+    def __init__(self, model_name=MODEL_NAME, output_dir=ONNX_DIR, quantize=False):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("The onnx backends require onnxruntime and onnx: pip install onnxruntime onnx")
+        import numpy
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.name = 'onnx-int8' if quantize else 'onnx'
+        self.numpy = numpy
+        path = export_onnx(model_name, output_dir, quantize=quantize)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = os.getenv('SENTIMENT_INTRA_OP_THREADS')
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.id2label = AutoConfig.from_pretrained(model_name).id2label
+
+    def predict(self, texts):
+        encoded = self.tokenizer(list(texts), padding=True, truncation=True, return_tensors='np')
+        inputs = {name: encoded[name].astype(self.numpy.int64) for name in self.input_names}
+        logits = self.session.run(['logits'], inputs)[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = self.numpy.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [
+            {'label': self.id2label[int(index)], 'score': float(probs[row, index])}
+            for row, index in enumerate(best)
+        ]
+
+def parse_address(address):
+    # "host:port" for TCP, anything else is a unix socket path
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+# Thin client for inference_server.py. Requests are pipelined over one local
+# connection and matched to responses by id; a request that takes longer than
+# timeout seconds raises so the caller can fall back instead of stalling chat.
+class RemoteBackend:
+    name = 'remote'
+
+    def __init__(self, address=INFERENCE_SERVER_ADDRESS, timeout=None, authkey=None):
+        self.address = parse_address(address)
+        self.timeout = float(timeout or os.getenv('INFERENCE_TIMEOUT', 5))
+        self.authkey = authkey or inference_authkey()
+        self._conn = None
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        from multiprocessing.connection import Client
+
+        conn = Client(self.address, authkey=self.authkey)
+        self._conn = conn
+        thread = threading.Thread(target=self._receive, args=(conn,), name='inference-client')
+        thread.daemon = True
+        thread.start()
+
+    def _receive(self, conn):
+        while True:
+            try:
+                request_id, results, error = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(results)
+
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError('Inference server connection lost'))
+
+    def predict(self, texts):
+        future = Future()
+        with self._lock:
+            if self._conn is None:
+                self._connect()
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send((request_id, list(texts)))
+            except (OSError, ValueError):
+                self._pending.pop(request_id, None)
+                self._conn = None
+                raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._pending.pop(request_id, None)
+            raise TimeoutError(f'Inference server did not answer within {self.timeout}s')
+
+def load_backend(name=None, model_name=MODEL_NAME):
+    name = name or os.getenv('SENTIMENT_BACKEND', 'torch')
+    if name == 'torch':
+        return TorchBackend(model_name)
+    if name == 'onnx':
+        return OnnxBackend(model_name, quantize=False)
+    if name == 'onnx-int8':
+        return OnnxBackend(model_name, quantize=True)
+    if name == 'remote':
+        return RemoteBackend()
+    raise ValueError(f'Sentiment backend must be one of: {", ".join(BACKENDS)}')
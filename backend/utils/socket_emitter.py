@@ -0,0 +1,169 @@
+import threading
+import time
+import json
+import zlib
+import msgspec
+
+FLUSH_INTERVALS_MS = (0, 50, 100, 250, 500, 1000)
+ENCODINGS = ('json', 'msgpack', 'deflate')
+
+def channel_room(channel):
+    return f"channel:{channel.lower()}"
+
+def subscription_room(channel, flush_ms, encoding):
+    return f"{channel_room(channel)}|{flush_ms}|{encoding}"
+
+def encode_batch(messages, encoding):
+    if encoding == 'msgpack':
+        return msgspec.msgpack.encode(messages)
+    if encoding == 'deflate':
+        return zlib.compress(json.dumps(messages, separators=(',', ':')).encode('utf-8'))
+    return messages
+
+# Coalesces chat messages per channel and emits them as one chat_batch event
+# every flush_ms or every max_messages, whichever comes first. Each client picks
+# its flush interval and encoding, and clients with the same choice for the same
+# channel share a room and therefore a single encoded frame.
+class CoalescingEmitter:
+    def __init__(self, socketio, default_flush_ms=250, max_messages=100):
+        self.socketio = socketio
+        self.default_flush_ms = default_flush_ms
+        self.max_messages = max_messages
+
+        self._buffers = {}
+        self._channel_rooms = {}
+        self._members = {}
+        self._sid_rooms = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def normalize(self, flush_ms, encoding):
+        try:
+            flush_ms = int(flush_ms if flush_ms is not None else self.default_flush_ms)
+        except (TypeError, ValueError):
+            flush_ms = self.default_flush_ms
+        # Snap to the closest supported interval so rooms stay shareable
+        flush_ms = min(FLUSH_INTERVALS_MS, key=lambda interval: abs(interval - flush_ms))
+        if encoding not in ENCODINGS or flush_ms == 0:
+            encoding = 'json'
+        return flush_ms, encoding
+
+    def subscribe(self, sid, channel, flush_ms=None, encoding='json'):
+        channel = channel.lower()
+        flush_ms, encoding = self.normalize(flush_ms, encoding)
+        room = subscription_room(channel, flush_ms, encoding)
+        with self._lock:
+            if room not in self._sid_rooms.setdefault(sid, set()):
+                self._sid_rooms[sid].add(room)
+                self._members[room] = self._members.get(room, 0) + 1
+                self._channel_rooms.setdefault(channel, set()).add(room)
+                if flush_ms and room not in self._buffers:
+                    self._buffers[room] = {
+                        'channel': channel,
+                        'interval': flush_ms / 1000.0,
+                        'encoding': encoding,
+                        'messages': [],
+                        'next_flush': time.monotonic() + flush_ms / 1000.0
+                    }
+        self._ensure_started()
+        return room
+
+    def unsubscribe(self, sid, channel=None):
+        with self._lock:
+            rooms = self._sid_rooms.get(sid, set())
+            if channel is not None:
+                prefix = channel_room(channel) + '|'
+                rooms_to_leave = {room for room in rooms if room.startswith(prefix)}
+            else:
+                rooms_to_leave = set(rooms)
+            for room in rooms_to_leave:
+                rooms.discard(room)
+                self._members[room] -= 1
+                if self._members[room] <= 0:
+                    self._remove_room(room)
+            if not rooms:
+                self._sid_rooms.pop(sid, None)
+        return rooms_to_leave
+
+    def _remove_room(self, room):
+        self._members.pop(room, None)
+        self._buffers.pop(room, None)
+        channel = room.split('|', 1)[0][len('channel:'):]
+        channel_rooms = self._channel_rooms.get(channel)
+        if channel_rooms is not None:
+            channel_rooms.discard(room)
+            if not channel_rooms:
+                self._channel_rooms.pop(channel, None)
+
+    def emit(self, message_data):
+        channel = message_data['channel']
+        ready = []
+        immediate = False
+        with self._lock:
+            for room in self._channel_rooms.get(channel, ()):
+                buffer = self._buffers.get(room)
+                if buffer is None:
+                    immediate = True
+                    continue
+                buffer['messages'].append(message_data)
+                if len(buffer['messages']) >= self.max_messages:
+                    ready.append((room, self._drain(buffer)))
+
+        if immediate:
+            self.socketio.emit('chat_message', message_data, to=subscription_room(channel, 0, 'json'))
+        for room, batch in ready:
+            self._send(room, batch)
+
+    def _drain(self, buffer):
+        messages = buffer['messages']
+        buffer['messages'] = []
+        buffer['next_flush'] = time.monotonic() + buffer['interval']
+        return buffer['channel'], buffer['encoding'], messages
+
+    def _send(self, room, batch):
+        channel, encoding, messages = batch
+        try:
+            self.socketio.emit('chat_batch', {
+                'channel': channel,
+                'encoding': encoding,
+                'count': len(messages),
+                'messages': encode_batch(messages, encoding)
+            }, to=room)
+        except Exception as e:
+            print(f"Error emitting chat batch to {room}: {e}")
+
+    def flush_due(self):
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for room, buffer in self._buffers.items():
+                if buffer['next_flush'] <= now:
+                    if buffer['messages']:
+                        ready.append((room, self._drain(buffer)))
+                    else:
+                        buffer['next_flush'] = now + buffer['interval']
+        for room, batch in ready:
+            self._send(room, batch)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chat-batch-emitter')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        tick = min(interval for interval in FLUSH_INTERVALS_MS if interval) / 2000.0
+        while True:
+            time.sleep(tick)
+            self.flush_due()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._members),
+                'subscribers': sum(self._members.values()),
+                'buffered_messages': sum(len(b['messages']) for b in self._buffers.values())
+            }
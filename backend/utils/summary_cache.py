@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from .gemini_analyzer import SUMMARY_LLM, GEMINI_MODEL
+
+# Bump when the prompt changes so summaries written for the old prompt stop matching
+PROMPT_VERSION = 1
+
+# Content-addressed summaries in Mongo. The key hashes exactly the inputs the
+# prompt is built from, with the duration rounded to a bucket, so saving the same
+# analysis again reuses the stored summary instead of calling the LLM.
+class SummaryCache:
+    def __init__(self, ttl=7 * 24 * 3600, duration_bucket=300, collection='summary_cache'):
+        self.ttl = ttl
+        self.duration_bucket = max(1, duration_bucket)
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    def create_schema(self, mongo):
+        try:
+            mongo.db[self.collection].create_index([('created_at', 1)], expireAfterSeconds=self.ttl)
+        except Exception as e:
+            print(f"Summary cache index creation failed: {str(e)}")
+
+    def key(self, analysis_data):
+        counts = analysis_data.get('sentiment_count') or {}
+        content = {
+            'version': PROMPT_VERSION,
+            'model': GEMINI_MODEL if SUMMARY_LLM != 'stub' else 'stub',
+            'streamer': (analysis_data.get('streamer_name') or '').lower(),
+            'total_chats': analysis_data.get('total_chats', 0),
+            'counts': [counts.get('positive', 0), counts.get('neutral', 0), counts.get('negative', 0)],
+            'top': [
+                [c['username'] for c in (analysis_data.get(field) or [])[:5]]
+                for field in ('top_positive', 'top_neutral', 'top_negative')
+            ],
+            'duration': int(analysis_data.get('duration') or 0) // self.duration_bucket
+        }
+        encoded = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, mongo, analysis_data):
+        try:
+            cached = mongo.db[self.collection].find_one({'_id': self.key(analysis_data)}, {'summary': 1})
+        except Exception as e:
+            print(f"Error reading summary cache: {str(e)}")
+            cached = None
+
+        with self._lock:
+            if cached:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return cached['summary'] if cached else None
+
+    def put(self, mongo, analysis_data, summary):
+        try:
+            mongo.db[self.collection].update_one(
+                {'_id': self.key(analysis_data)},
+                {'$set': {'summary': summary, 'created_at': datetime.utcnow()}},
+                upsert=True
+            )
+            with self._lock:
+                self._stores += 1
+        except Exception as e:
+            print(f"Error writing summary cache: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'stores': self._stores,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'ttl': self.ttl,
+                'duration_bucket': self.duration_bucket
+            }
+
+summary_cache = SummaryCache(
+    ttl=int(os.getenv('SUMMARY_CACHE_TTL', 7 * 24 * 3600)),
+    duration_bucket=int(os.getenv('SUMMARY_DURATION_BUCKET', 300))
+)
@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from .gemini_analyzer import request_summary, SummaryQuotaError, QUOTA_EXCEEDED_SUMMARY
+from .summary_cache import summary_cache
+from .pdf_cache import pdf_cache
+
+SUMMARY_FIELDS = ['streamer_name', 'total_chats', 'sentiment_count',
+                  'top_positive', 'top_negative', 'top_neutral', 'duration']
+
+# Generates analysis summaries off the request thread. Quota errors are retried
+# with exponential backoff and full jitter; the retry is scheduled on a timer so
+# a waiting job does not hold one of the pool's threads.
+class SummaryWorker:
+    def __init__(self, workers=4, max_retries=4, base_delay=2.0, max_delay=60.0):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = None
+        self._lock = threading.Lock()
+        self._notifier = None
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'retries': 0, 'in_flight': 0}
+
+    def set_notifier(self, notifier):
+        # notifier(user_id, payload) is called once a summary is stored
+        self._notifier = notifier
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='summary')
+            return self._executor
+
+    def submit(self, mongo, history):
+        job = {field: history.get(field) for field in SUMMARY_FIELDS}
+        job['history_id'] = history['_id']
+        job['user_id'] = history['user_id']
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['in_flight'] += 1
+        self._pool().submit(self._run, mongo, job, 0)
+
+    def _retry_delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _run(self, mongo, job, attempt):
+        try:
+            summary = request_summary(job)
+            status = 'completed'
+        except SummaryQuotaError as e:
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt)
+                print(f"Summary for {job['history_id']} hit the Gemini quota, retrying in {delay:.1f}s: {e}")
+                with self._lock:
+                    self._stats['retries'] += 1
+                timer = threading.Timer(delay, lambda: self._pool().submit(self._run, mongo, job, attempt + 1))
+                timer.daemon = True
+                timer.start()
+                return
+            summary = QUOTA_EXCEEDED_SUMMARY
+            status = 'failed'
+        except Exception as e:
+            print(f"Error generating summary for {job['history_id']}: {e}")
+            summary = f"Unable to generate summary. Error: {str(e)}"
+            status = 'failed'
+
+        if status == 'completed':
+            summary_cache.put(mongo, job, summary)
+        self._finish(mongo, job, summary, status)
+
+    def _finish(self, mongo, job, summary, status):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+            self._stats['completed' if status == 'completed' else 'failed'] += 1
+
+        try:
+            # Only fill in a summary that is still pending, so a resumed job can't overwrite a finished one
+            result = mongo.db.history.update_one(
+                {'_id': job['history_id'], 'summary_status': 'pending'},
+                {'$set': {
+                    'summary': summary,
+                    'summary_status': status,
+                    'updated_at': datetime.utcnow()
+                }}
+            )
+        except Exception as e:
+            print(f"Error storing summary for {job['history_id']}: {e}")
+            return
+
+        if result.modified_count:
+            # The cached report still says the summary is being generated
+            pdf_cache.invalidate(job['history_id'])
+
+        if result.modified_count and self._notifier:
+            try:
+                self._notifier(str(job['user_id']), {
+                    'history_id': str(job['history_id']),
+                    'summary_status': status,
+                    'summary': summary
+                })
+            except Exception as e:
+                print(f"Error sending summary notification: {e}")
+
+    def resume(self, mongo):
+        # Jobs are kept in memory, so pick up summaries left pending by a restart
+        resumed = 0
+        for history in mongo.db.history.find({'summary_status': 'pending', 'status': 'active'}):
+            self.submit(mongo, history)
+            resumed += 1
+        return resumed
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=self.workers)
+
+summary_worker = SummaryWorker(
+    workers=int(os.getenv('SUMMARY_WORKERS', 4)),
+    max_retries=int(os.getenv('SUMMARY_MAX_RETRIES', 4)),
+    base_delay=float(os.getenv('SUMMARY_RETRY_BASE_SECONDS', 2)),
+    max_delay=float(os.getenv('SUMMARY_RETRY_MAX_SECONDS', 60))
+)
@@ -1,68 +1,215 @@
-import irc.bot
-import socket
+import irc.client
+import threading
+import random
+import time
+import os
 import re
-from .sentiment_analyzer import sentiment_analyzer
-
-class TwitchChatBot(irc.bot.SingleServerIRCBot):
-    def __init__(self, token, username, channel, socket_handler):
-        if not token.startswith('oauth:'):
-            token = 'oauth:' + token
-            
-        self.token = token
-        self.channel = '#' + channel.lower()
-        self.socket_handler = socket_handler
-        self._should_disconnect = False
-        
-        # Create IRC bot connection
-        server = 'irc.chat.twitch.tv'
-        port = 6667
-
-        nickname = username.lower()
-        super().__init__([(server, port, token)], nickname, nickname)
-        
-    def on_welcome(self, connection, event):
+from collections import deque
+from .chat_pipeline import chat_pipeline
+
+TWITCH_SERVER = os.getenv('TWITCH_IRC_HOST', 'irc.chat.twitch.tv')
+TWITCH_PORT = int(os.getenv('TWITCH_IRC_PORT', 6667))
+
+# A single pooled anonymous (justinfan) connection. Channels are assigned to it
+# by TwitchConnectionPool and joined at Twitch's rate limit.
+class PooledConnection:
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.nickname = f"justinfan{random.randint(1000, 999999)}"
+        self.channels = set()
+        self.pending_joins = deque()
+        self.join_times = deque()
+        self.closing = False
+        self.connection = pool.reactor.server()
+
+    def connect(self):
+        self.connection.connect(TWITCH_SERVER, TWITCH_PORT, self.nickname, password='SCHMOOPIIE')
+
+    def queue_join(self, channel):
+        if channel not in self.pending_joins:
+            self.pending_joins.append(channel)
+
+    def flush_joins(self, now):
+        if not self.connection.is_connected():
+            return
+        window = self.pool.join_window
+        while self.join_times and now - self.join_times[0] > window:
+            self.join_times.popleft()
+        while self.pending_joins and len(self.join_times) < self.pool.joins_per_window:
+            channel = self.pending_joins.popleft()
+            if channel in self.channels:
+                self.connection.join('#' + channel)
+                self.join_times.append(now)
+
+# Multiplexes every monitored channel over a small number of IRC connections
+# driven by one reactor thread. Connecting to a channel is a JOIN and
+# disconnecting is a PART; PRIVMSGs are dispatched to the channel's handler.
+class TwitchConnectionPool:
+    def __init__(self, max_channels_per_connection=100, joins_per_window=20, join_window=10):
+        self.max_channels_per_connection = max_channels_per_connection
+        self.joins_per_window = joins_per_window
+        self.join_window = join_window
+
+        self.reactor = irc.client.Reactor()
+        self.reactor.add_global_handler('welcome', self._on_welcome)
+        self.reactor.add_global_handler('pubmsg', self._on_pubmsg)
+        self.reactor.add_global_handler('disconnect', self._on_disconnect)
+        self.reactor.add_global_handler('error', self._on_error)
+        self.reactor.scheduler.execute_every(0.5, self._flush_joins)
+
+        self._connections = []
+        self._handlers = {}
+        self._assignments = {}
+        self._next_index = 0
+        self._thread = None
+        # Share the reactor's lock so handlers and API calls never deadlock on lock order
+        self._lock = self.reactor.mutex
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.reactor.process_forever, name='twitch-irc-reactor')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _find(self, connection):
+        for pooled in self._connections:
+            if pooled.connection is connection:
+                return pooled
+        return None
+
+    def _acquire_connection(self):
+        available = [c for c in self._connections
+                     if not c.closing and len(c.channels) < self.max_channels_per_connection]
+        if available:
+            pooled = min(available, key=lambda c: len(c.channels))
+            # An idle connection is not reconnected after a drop, so bring it back now
+            if not pooled.channels and not pooled.connection.is_connected():
+                pooled.connect()
+            return pooled
+
+        pooled = PooledConnection(self, self._next_index)
+        self._next_index += 1
+        self._connections.append(pooled)
+        pooled.connect()
+        return pooled
+
+    def join(self, channel, handler):
+        channel = channel.lower()
+        with self._lock:
+            self._handlers[channel] = handler
+            if channel in self._assignments:
+                return False
+            pooled = self._acquire_connection()
+            pooled.channels.add(channel)
+            pooled.queue_join(channel)
+            self._assignments[channel] = pooled
+            self._ensure_started()
+        print(f"Queued JOIN for #{channel} on connection {pooled.index}")
+        return True
+
+    def part(self, channel):
+        channel = channel.lower()
+        with self._lock:
+            self._handlers.pop(channel, None)
+            pooled = self._assignments.pop(channel, None)
+            if pooled is None:
+                return False
+            pooled.channels.discard(channel)
+            try:
+                if pooled.connection.is_connected():
+                    pooled.connection.part('#' + channel)
+            except Exception as e:
+                print(f"Error during PART of #{channel}: {e}")
+
+            # Keep one warm connection around; close the rest once empty
+            if not pooled.channels and len(self._connections) > 1:
+                pooled.closing = True
+                self._connections.remove(pooled)
+                try:
+                    pooled.connection.disconnect("Goodbye!")
+                except Exception as e:
+                    print(f"Error closing pooled connection: {e}")
+        return True
+
+    def is_joined(self, channel):
+        return channel.lower() in self._assignments
+
+    def channels(self):
+        return list(self._assignments)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': 'irc',
+                'connections': len(self._connections),
+                'channels': len(self._assignments),
+                'pending_joins': sum(len(c.pending_joins) for c in self._connections),
+                'channels_per_connection': [len(c.channels) for c in self._connections]
+            }
+
+    def _flush_joins(self):
+        now = time.monotonic()
+        with self._lock:
+            for pooled in list(self._connections):
+                try:
+                    pooled.flush_joins(now)
+                except Exception as e:
+                    print(f"Error joining channels on connection {pooled.index}: {e}")
+
+    def _on_welcome(self, connection, event):
         connection.cap('REQ', ':twitch.tv/membership')
         connection.cap('REQ', ':twitch.tv/tags')
         connection.cap('REQ', ':twitch.tv/commands')
-        
-        # Join the channel
-        connection.join(self.channel)
-        print(f"Successfully joined channel {self.channel}")
-        
-    def on_error(self, connection, event):
-        print(f"Error: {event.arguments[0] if event.arguments else 'Unknown error'}")
-        self._should_disconnect = True
-        
-    def on_disconnect(self, connection, event):
-        print("Disconnected from server")
-        if not self._should_disconnect:
-            connection.reconnect()
-
-    def disconnect(self):
-        try:
-            if self.connection.is_connected():
-                self.connection.part(self.channel)
-                self.connection.disconnect("Goodbye!")
-        except Exception as e:
-            print(f"Error during disconnect: {e}")
-        finally:
-            self._should_disconnect = True
-
-    def on_pubmsg(self, connection, event):
+
+        with self._lock:
+            pooled = self._find(connection)
+            if pooled is None:
+                return
+            # (Re)join everything assigned to this connection
+            pooled.join_times.clear()
+            for channel in pooled.channels:
+                pooled.queue_join(channel)
+        print(f"Pooled connection {pooled.index} ready with {len(pooled.channels)} channel(s)")
+
+    def _on_pubmsg(self, connection, event):
+        channel = event.target.lstrip('#').lower()
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
 
         message = event.arguments[0]
         username = event.source.split('!')[0]
 
-        sentiment_result = sentiment_analyzer.analyze_text(message)
-        
-        message_data = {
-            'username': username,
-            'message': message,
-            'sentiment': sentiment_result['sentiment'],
-            'confidence': sentiment_result['confidence']
-        }
-        
-        self.socket_handler(message_data)
+        # Only enqueue here; inference runs on the pipeline workers so the reactor keeps answering PINGs
+        chat_pipeline.submit(channel, username, message, handler)
+
+    def _on_error(self, connection, event):
+        print(f"Error: {event.arguments[0] if event.arguments else 'Unknown error'}")
+
+    def _on_disconnect(self, connection, event):
+        with self._lock:
+            pooled = self._find(connection)
+            if pooled is None or pooled.closing or not pooled.channels:
+                return
+        print(f"Pooled connection {pooled.index} disconnected, reconnecting")
+        self.reactor.scheduler.execute_after(5, self._reconnect(pooled))
+
+    def _reconnect(self, pooled):
+        def reconnect():
+            if pooled.closing or pooled.connection.is_connected():
+                return
+            try:
+                pooled.connect()
+            except Exception as e:
+                print(f"Reconnect failed on connection {pooled.index}: {e}")
+                self.reactor.scheduler.execute_after(30, self._reconnect(pooled))
+        return reconnect
+
+twitch_pool = TwitchConnectionPool(
+    max_channels_per_connection=int(os.getenv('TWITCH_CHANNELS_PER_CONNECTION', 100)),
+    joins_per_window=int(os.getenv('TWITCH_JOINS_PER_WINDOW', 20))
+)
 
 def extract_channel_name(url):
     pattern = r'(?:https?:\/\/)?(?:www\.)?twitch\.tv\/([a-zA-Z0-9_]+)'
@@ -15,14 +15,16 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    const fetchUserStats = async () => {
+    const fetchStats = async () => {
       try {
-        const response = await axios.get(`${API_URL}/api/admin/users/count`, {
+        const response = await axios.get(`${API_URL}/api/admin/stats`, {
           withCredentials: true
         });
-        setUserStats(response.data);
+        setUserStats(response.data.users);
+        setCommentsStats(response.data.comments);
+        setUsageStats(response.data.usage);
       } catch (error) {
-        console.error('Error fetching user stats:', error);
+        console.error('Error fetching dashboard stats:', error);
         let errorMessage = 'Failed to load user statistics';
         if (error.response) {
           if (error.response.status === 401) {
@@ -46,32 +48,7 @@ const Dashboard = () => {
       }
     };
 
-    const fetchCommentsStats = async () => {
-      try {
-        const response = await axios.get(`${API_URL}/api/admin/comments/count`, {
-          withCredentials: true
-        });
-        setCommentsStats(response.data);
-      } catch (error) {
-        console.error('Error fetching comments stats:', error);
-      }
-    };
-
-
-    const fetchUsageStats = async () => {
-      try {
-        const response = await axios.get(`${API_URL}/api/admin/usage/count`, {
-          withCredentials: true
-        });
-        setUsageStats(response.data);
-      } catch (error) {
-        console.error('Error fetching usage stats:', error);
-      }
-    };
-
-    fetchUserStats();
-    fetchCommentsStats();
-    fetchUsageStats();
+    fetchStats();
   }, []);
 
   return (
@@ -15,10 +15,15 @@ const Logs = () => {
   const [totalItems, setTotalItems] = useState(0);
   const [searchTerm, setSearchTerm] = useState('');
   const [sortConfig, setSortConfig] = useState({ key: 'created_at', direction: 'desc' });
+  const [totalExact, setTotalExact] = useState(true);
+  // Keyset pagination: pageCursors[i] is the cursor that loads page i + 1
+  const [pageCursors, setPageCursors] = useState([null]);
+  const knownPages = pageCursors.length;
 
   // Handle items per page change
   const handleItemsPerPageChange = (newItemsPerPage) => {
     setItemsPerPage(Number(newItemsPerPage));
+    setPageCursors([null]);
     setCurrentPage(1);
   };
 
@@ -28,7 +33,7 @@ const Logs = () => {
     try {
       const response = await axios.get(`${API_URL}/api/admin/logs`, {
         params: {
-          page: currentPage,
+          cursor: pageCursors[currentPage - 1] || undefined,
           limit: itemsPerPage,
           search: searchTerm,
           sortField: sortConfig.key,
@@ -39,6 +44,12 @@ const Logs = () => {
 
       setLogs(response.data.logs || []);
       setTotalItems(response.data.totalItems || 0);
+      setTotalExact(response.data.totalExact !== false);
+      setPageCursors(prev => {
+        const cursors = prev.slice(0, currentPage);
+        if (response.data.nextCursor) cursors.push(response.data.nextCursor);
+        return cursors;
+      });
     } catch (error) {
       console.error('Error fetching logs:', error);
       setLogs([]);
@@ -54,11 +65,14 @@ const Logs = () => {
       key,
       direction: sortConfig.key === key && sortConfig.direction === 'asc' ? 'desc' : 'asc'
     });
+    setPageCursors([null]);
+    setCurrentPage(1);
   };
 
   // Handle search
   const handleSearch = (e) => {
     setSearchTerm(e.target.value);
+    setPageCursors([null]);
     setCurrentPage(1);
   };
 
@@ -74,7 +88,7 @@ const Logs = () => {
 
   // Pagination
   const paginate = (pageNumber) => {
-    if (pageNumber > 0 && pageNumber <= Math.ceil(totalItems / itemsPerPage)) {
+    if (pageNumber > 0 && pageNumber <= knownPages) {
       setCurrentPage(pageNumber);
     }
   };
@@ -282,8 +296,8 @@ const Logs = () => {
                     </button>
                     <button
                       onClick={() => paginate(currentPage + 1)}
-                      disabled={currentPage === Math.ceil(totalItems / itemsPerPage)}
-                      className={`relative inline-flex items-center px-4 py-2 text-sm font-medium rounded-md ${currentPage === Math.ceil(totalItems / itemsPerPage)
+                      disabled={currentPage === knownPages}
+                      className={`relative inline-flex items-center px-4 py-2 text-sm font-medium rounded-md ${currentPage === knownPages
                         ? 'bg-gray-800 text-gray-400 cursor-not-allowed'
                         : 'text-white bg-twitch hover:bg-twitch/80'
                         }`}
@@ -297,7 +311,7 @@ const Logs = () => {
                         Showing <span className="font-medium text-white">
                           {Math.min(itemsPerPage, totalItems)}
                         </span> of{' '}
-                        <span className="font-medium text-white">{totalItems}</span> logs
+                        <span className="font-medium text-white">{totalItems}{totalExact ? '' : '+'}</span> logs
                       </p>
                     </div>
                     <div>
@@ -315,16 +329,16 @@ const Logs = () => {
                             <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M15 19l-7-7 7-7" />
                           </svg>
                         </button>
-                        {[...Array(Math.ceil(totalItems / itemsPerPage))].map((_, index) => {
+                        {[...Array(knownPages)].map((_, index) => {
                           const pageNumber = index + 1;
                           const isCurrentPage = pageNumber === currentPage;
                           const isNearCurrentPage =
                             Math.abs(pageNumber - currentPage) <= 1 ||
                             pageNumber === 1 ||
-                            pageNumber === Math.ceil(totalItems / itemsPerPage);
+                            pageNumber === knownPages;
 
                           if (!isNearCurrentPage) {
-                            if (pageNumber === 2 || pageNumber === Math.ceil(totalItems / itemsPerPage) - 1) {
+                            if (pageNumber === 2 || pageNumber === knownPages - 1) {
                               return (
                                 <span
                                   key={pageNumber}
@@ -352,8 +366,8 @@ const Logs = () => {
                         })}
                         <button
                           onClick={() => paginate(currentPage + 1)}
-                          disabled={currentPage === Math.ceil(totalItems / itemsPerPage)}
-                          className={`relative inline-flex items-center px-2 py-2 rounded-r-md border border-gray-700 text-sm font-medium ${currentPage === Math.ceil(totalItems / itemsPerPage)
+                          disabled={currentPage === knownPages}
+                          className={`relative inline-flex items-center px-2 py-2 rounded-r-md border border-gray-700 text-sm font-medium ${currentPage === knownPages
                             ? 'bg-gray-800 text-gray-400 cursor-not-allowed'
                             : 'text-gray-300 hover:bg-gray-800'
                             }`}
@@ -117,7 +117,7 @@ const Navbar = () => {
                   <div className="w-8 h-8 rounded-full bg-twitch flex items-center justify-center overflow-hidden">
                     {user.profile_image ? (
                       <img 
-                        src={user.profile_image} 
+                        src={`${user.profile_image}?size=64`}
                         alt={`${user.first_name}'s profile`}
                         className="w-full h-full object-cover"
                       />
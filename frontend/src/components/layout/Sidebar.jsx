@@ -174,7 +174,7 @@ const Sidebar = ({ isOpen, onClose }) => {
                 <div className="w-10 h-10 rounded-full bg-twitch flex items-center justify-center overflow-hidden">
                   {user.profile_image ? (
                     <img 
-                      src={user.profile_image} 
+                      src={`${user.profile_image}?size=128`}
                       alt={`${user.first_name}'s profile`}
                       className="w-full h-full object-cover"
                     />
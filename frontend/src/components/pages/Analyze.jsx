@@ -140,20 +140,9 @@ const Analyze = () => {
 
   const saveAnalysis = async () => {
     try {
-      const getTopContributors = (sentimentType, limit = 5) => {
-        const contributors = Object.entries(userSentiments[sentimentType])
-          .map(([username, count]) => ({ username, count }))
-          .sort((a, b) => b.count - a.count)
-          .slice(0, limit);
-        return contributors;
-      };
+      // Counts and top contributors come from the server-side channel aggregate
       const analysisData = {
         streamer_name: currentChannel,
-        total_chats: messages.length,
-        sentiment_count: sentimentCounts,
-        top_positive: getTopContributors('positive'),
-        top_negative: getTopContributors('negative'),
-        top_neutral: getTopContributors('neutral'),
         duration: elapsed
       };
       const response = await fetch(`${API_URL}/api/history/save`, {
@@ -5,6 +5,8 @@ import { ClipLoader } from 'react-spinners';
 
 // API URL
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+const SUMMARY_POLL_MS = 3000;
+const HISTORY_PAGE_SIZE = 50;
 
 const formatNumber = (num) => {
   if (typeof num !== 'number') return num;
@@ -106,7 +108,9 @@ const AnalysisModal = ({ analysis, onClose }) => {
                 </div>
               </div>
               <p className="text-gray-300 whitespace-pre-line text-justify">
-                {analysis.summary || "No summary available"}
+                {analysis.summary_status === 'pending'
+                  ? "Generating summary... this usually takes a few seconds."
+                  : analysis.summary || "No summary available"}
               </p>
             </div>
 
@@ -157,14 +161,47 @@ const History = () => {
   const [currentPage, setCurrentPage] = useState(1);
   const [itemsPerPage, setItemsPerPage] = useState(10);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAnalyses();
   }, []);
 
-  const fetchAnalyses = async () => {
+  // Summaries are generated in the background; poll until the open one is ready
+  useEffect(() => {
+    if (selectedAnalysis?.summary_status !== 'pending') return;
+
+    const analysisId = selectedAnalysis._id;
+    const interval = setInterval(async () => {
+      try {
+        const response = await fetch(`${API_URL}/api/history/${analysisId}/summary`, {
+          credentials: 'include'
+        });
+        if (!response.ok) return;
+
+        const data = await response.json();
+        if (data.summary_status === 'pending') return;
+
+        const update = { summary: data.summary, summary_status: data.summary_status };
+        setAnalyses(prevAnalyses => prevAnalyses.map(analysis =>
+          analysis._id === analysisId ? { ...analysis, ...update } : analysis
+        ));
+        setSelectedAnalysis(prev => (prev?._id === analysisId ? { ...prev, ...update } : prev));
+      } catch (error) {
+        console.error('Error polling summary:', error);
+      }
+    }, SUMMARY_POLL_MS);
+
+    return () => clearInterval(interval);
+  }, [selectedAnalysis?._id, selectedAnalysis?.summary_status]);
+
+  // The list is paged with a keyset cursor; each page only carries the list-view fields
+  const fetchAnalyses = async (cursor = null) => {
     try {
-      const response = await fetch(`${API_URL}/api/history`, {
+      const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE });
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`${API_URL}/api/history?${params}`, {
         credentials: 'include'
       });
 
@@ -173,7 +210,8 @@ const History = () => {
       }
 
       const data = await response.json();
-      setAnalyses(data);
+      setAnalyses(prevAnalyses => (cursor ? [...prevAnalyses, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error fetching analyses:', error);
       Swal.fire({
@@ -186,6 +224,38 @@ const History = () => {
       });
     } finally {
       setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    fetchAnalyses(nextCursor);
+  };
+
+  // Summaries, contributors and time series only come with the full document
+  const openAnalysis = async (analysisId) => {
+    try {
+      const response = await fetch(`${API_URL}/api/history/${analysisId}`, {
+        credentials: 'include'
+      });
+
+      if (!response.ok) {
+        throw new Error('Failed to load analysis');
+      }
+
+      setSelectedAnalysis(await response.json());
+    } catch (error) {
+      console.error('Error loading analysis:', error);
+      Swal.fire({
+        title: 'Error',
+        text: 'Failed to load analysis',
+        icon: 'error',
+        background: '#18181b',
+        color: '#fff',
+        confirmButtonColor: '#9147ff'
+      });
     }
   };
 
@@ -355,7 +425,14 @@ const History = () => {
                       </svg>
                     </div>
                   </div>
-                  <div className="w-full md:w-auto">
+                  <div className="w-full md:w-auto flex gap-4">
+                    {/* A plain link lets the browser stream the archive to disk as it is built */}
+                    <a
+                      href={`${API_URL}/api/history/export`}
+                      className="whitespace-nowrap bg-twitch hover:bg-twitch/80 text-white rounded-lg px-6 py-3 transition-colors"
+                    >
+                      Export all
+                    </a>
                     <select
                       value={itemsPerPage}
                       onChange={(e) => handleItemsPerPageChange(e.target.value)}
@@ -429,7 +506,7 @@ const History = () => {
                           <div className="flex items-center justify-center space-x-3">
                             <button
                               className="text-twitch hover:text-twitch/80 transition-colors p-1.5 rounded-full hover:bg-twitch/10"
-                              onClick={() => setSelectedAnalysis(analysis)}
+                              onClick={() => openAnalysis(analysis._id)}
                               title="View Analysis"
                             >
                               <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -474,8 +551,17 @@ const History = () => {
                       <span className="font-medium text-white">
                         {Math.min(indexOfLastItem, filteredAnalyses.length)}
                       </span> of{' '}
-                      <span className="font-medium text-white">{formatNumber(filteredAnalyses.length)}</span> results
+                      <span className="font-medium text-white">{formatNumber(filteredAnalyses.length)}{nextCursor ? '+' : ''}</span> results
                     </p>
+                    {nextCursor && (
+                      <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="mt-2 text-sm text-twitch hover:text-twitch/80 transition-colors"
+                      >
+                        {loadingMore ? 'Loading...' : 'Load older analyses'}
+                      </button>
+                    )}
                   </div>
                   <div>
                     <nav className="relative z-0 inline-flex rounded-md shadow-sm -space-x-px">
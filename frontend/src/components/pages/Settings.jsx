@@ -482,7 +482,7 @@ const Settings = () => {
                     type="file"
                     ref={fileInputRef}
                     onChange={handleImageChange}
-                    accept="image/*"
+                    accept="image/png,image/jpeg,image/gif,image/webp"
                     className="hidden"
                     disabled={isSaving || isRemoving}
                   />
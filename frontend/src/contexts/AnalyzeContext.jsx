@@ -3,6 +3,8 @@ import io from 'socket.io-client';
 import { useAuth } from './AuthContext';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+// How often the server flushes batched chat to this client
+const CHAT_FLUSH_MS = 250;
 
 const AnalyzeContext = createContext();
 
@@ -27,30 +29,6 @@ export const AnalyzeProvider = ({ children }) => {
       const newMessages = [...messageQueue.current];
       messageQueue.current = [];
       setMessages((prev) => [...prev, ...newMessages]);
-      const newSentimentCounts = { positive: 0, neutral: 0, negative: 0 };
-      const newUserSentiments = {};
-      newMessages.forEach((msg) => {
-        newSentimentCounts[msg.sentiment] += 1;
-        if (!newUserSentiments[msg.sentiment]) newUserSentiments[msg.sentiment] = {};
-        if (!newUserSentiments[msg.sentiment][msg.username]) newUserSentiments[msg.sentiment][msg.username] = 0;
-        newUserSentiments[msg.sentiment][msg.username] += 1;
-      });
-      setSentimentCounts((prev) => ({
-        positive: prev.positive + newSentimentCounts.positive,
-        neutral: prev.neutral + newSentimentCounts.neutral,
-        negative: prev.negative + newSentimentCounts.negative
-      }));
-      setUserSentiments((prev) => {
-        const updated = JSON.parse(JSON.stringify(prev));
-        for (const sentiment in newUserSentiments) {
-          for (const username in newUserSentiments[sentiment]) {
-            if (!updated[sentiment]) updated[sentiment] = {};
-            if (!updated[sentiment][username]) updated[sentiment][username] = 0;
-            updated[sentiment][username] += newUserSentiments[sentiment][username];
-          }
-        }
-        return updated;
-      });
     };
     const intervalId = setInterval(processQueue, 1000);
     return () => clearInterval(intervalId);
@@ -99,14 +77,35 @@ export const AnalyzeProvider = ({ children }) => {
       } catch (e) {  }
     }
     // Setup socket listeners
-    socketRef.current.on('connect', () => {
-    });
-    socketRef.current.on('chat_message', (msg) => {
+    // Chat is emitted to a per-channel room, so (re)join it on every connect
+    const joinChannelRoom = () => {
+      socketRef.current?.emit('join_channel', { channel: data.channel, flush_ms: CHAT_FLUSH_MS });
+    };
+    socketRef.current.on('connect', joinChannelRoom);
+    if (socketRef.current.connected) joinChannelRoom();
+    const queueMessage = (msg) => {
       const messageId = `${msg.username}-${msg.message}`;
       if (!processedMessages.current.has(messageId)) {
         processedMessages.current.add(messageId);
         messageQueue.current.push({ ...msg, id: messageId });
       }
+    };
+    socketRef.current.on('chat_message', queueMessage);
+    socketRef.current.on('chat_batch', (batch) => {
+      batch.messages.forEach(queueMessage);
+    });
+    // Counts and top chatters are aggregated server-side and pushed as snapshots
+    socketRef.current.on('channel_stats', (stats) => {
+      if (stats.streamer_name !== data.channel) return;
+      setSentimentCounts(stats.sentiment_count);
+      const toUserCounts = (contributors) => Object.fromEntries(
+        contributors.map(({ username, count }) => [username, count])
+      );
+      setUserSentiments({
+        positive: toUserCounts(stats.top_positive),
+        neutral: toUserCounts(stats.top_neutral),
+        negative: toUserCounts(stats.top_negative)
+      });
     });
     socketRef.current.on('disconnect', () => {
       setIsConnected(false);